@@ -0,0 +1,340 @@
+import argparse
+import gzip
+import hashlib
+import json
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from analytics import (
+    CITIES, FOCUS_AREAS, TIME_PERIODS, archive_version, build_alerts, build_zones_df, climate_projections,
+    get_city_metrics, metrics_cache, metrics_summary_row, nasa_analyzer
+)
+from archive import CITY_WIDE
+from correlation import POOLED_ZONES, correlation_engine
+from prioritization import default_weights
+from refresh import refresh_scheduler
+from session_memory import shared_store
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow output is optional
+    pa = None
+
+DEFAULT_FOCUS = FOCUS_AREAS[0]
+DEFAULT_PERIOD = TIME_PERIODS[0]
+GZIP_MIN_BYTES = 1024
+MAX_BATCH_SIZE = 500
+# Request bodies (batch requests) larger than this are rejected with 413 without being read
+MAX_BODY_BYTES = 1 << 20
+# Idle keep-alive connections hold a pool worker, so they are closed quickly
+KEEP_ALIVE_TIMEOUT = 5
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _param(query, name, default=None, choices=None):
+    value = query.get(name, [default])[0]
+    if value is None:
+        raise ApiError(400, f"Missing query parameter: {name}")
+    if choices is not None and value not in choices:
+        raise ApiError(404, f"Unknown {name}: {value}")
+    return value
+
+
+def _batch_items(query, body):
+    """Batch requests come either as a JSON body or as repeated ?city= parameters"""
+    if body:
+        try:
+            items = json.loads(body)['requests']
+        except (ValueError, KeyError, TypeError):
+            raise ApiError(400, "Batch body must be {\"requests\": [{\"city\": ..., \"focus\": ..., \"period\": ...}]}")
+    else:
+        focus = query.get('focus', [DEFAULT_FOCUS])[0]
+        period = query.get('period', [DEFAULT_PERIOD])[0]
+        items = [{'city': city, 'focus': focus, 'period': period} for city in query.get('city', CITIES)]
+
+    if not isinstance(items, list):
+        raise ApiError(400, "Batch \"requests\" must be a list")
+    if len(items) > MAX_BATCH_SIZE:
+        raise ApiError(413, f"Batch too large ({len(items)} > {MAX_BATCH_SIZE})")
+
+    resolved = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise ApiError(400, f"Batch items must be objects, got: {json.dumps(item, default=str)}")
+        city = item.get('city')
+        focus = item.get('focus', DEFAULT_FOCUS)
+        period = item.get('period', DEFAULT_PERIOD)
+        if city not in CITIES or focus not in FOCUS_AREAS or period not in TIME_PERIODS:
+            raise ApiError(404, f"Unknown city/focus/period in batch item: {item}")
+        resolved.append((city, focus, period))
+    return resolved
+
+
+def _city_metrics_content(city, focus, period):
+    # Same content keys as app.py's dataflow artifacts, so the API and the dashboard share entries
+    data_version = (refresh_scheduler.version, archive_version())
+    return (('selected_city', city), ('focus_area', focus), ('analysis_period', period), ('data_version', data_version))
+
+
+def handle_metrics(query, body):
+    city = _param(query, 'city', choices=CITIES)
+    focus = _param(query, 'focus', DEFAULT_FOCUS, FOCUS_AREAS)
+    period = _param(query, 'period', DEFAULT_PERIOD, TIME_PERIODS)
+    return get_city_metrics(city, focus, period).to_dict()
+
+
+def handle_zones(query, body):
+    focus = _param(query, 'focus', DEFAULT_FOCUS, FOCUS_AREAS)
+    period = _param(query, 'period', DEFAULT_PERIOD, TIME_PERIODS)
+    city = _param(query, 'city', '', [''] + CITIES) or None
+    data_version = (refresh_scheduler.version, archive_version())
+    zone_metrics = (('focus_area', focus), ('analysis_period', period), ('selected_city', city),
+                    ('data_version', data_version))
+    # The dashboard's zones_df at the default slider weights
+    key = ('zones_df', (('zone_metrics', zone_metrics), ('focus_area', focus),
+                        ('priority_weights', tuple(sorted(default_weights(focus).items()))),
+                        ('priority_method', 'topsis')))
+    zones = shared_store.get_or_compute(key, lambda: build_zones_df(focus, period, city))
+    return zones.to_dict(orient='records')
+
+
+def handle_alerts(query, body):
+    city = _param(query, 'city', choices=CITIES)
+    focus = _param(query, 'focus', DEFAULT_FOCUS, FOCUS_AREAS)
+    period = _param(query, 'period', DEFAULT_PERIOD, TIME_PERIODS)
+    key = ('alerts', (('city_metrics', _city_metrics_content(city, focus, period)), ('analysis_period', period)))
+    return shared_store.get_or_compute(key, lambda: build_alerts(get_city_metrics(city, focus, period), period))
+
+
+def handle_projections(query, body):
+    city = _param(query, 'city', choices=CITIES)
+    focus = _param(query, 'focus', DEFAULT_FOCUS, FOCUS_AREAS)
+    period = _param(query, 'period', DEFAULT_PERIOD, TIME_PERIODS)
+    return climate_projections(city, focus, period)
+
+
+def handle_correlations(query, body):
+    city = _param(query, 'city', choices=CITIES)
+    zone = _param(query, 'zone', CITY_WIDE)
+    correlation_engine.update_city(city)
+    if zone not in [CITY_WIDE, POOLED_ZONES] + correlation_engine.zones(city):
+        raise ApiError(404, f"Unknown zone: {zone}")
+    return correlation_engine.summary(city, zone)
+
+
+def handle_batch_metrics(query, body):
+    rows = []
+    for city, focus, period in _batch_items(query, body):
+        rows.append(metrics_summary_row(city, focus, get_city_metrics(city, focus, period)))
+    return rows
+
+
+def handle_catalog(query, body):
+    return {'cities': CITIES, 'focus_areas': FOCUS_AREAS, 'time_periods': TIME_PERIODS}
+
+
+def handle_health(query, body):
+    return {'status': 'ok', 'cache': metrics_cache.stats(), 'refresh': refresh_scheduler.stats(),
+            'archive': nasa_analyzer.nasa_fetcher.archive.stats()}
+
+
+ROUTES = {
+    '/health': handle_health,
+    '/v1/catalog': handle_catalog,
+    '/v1/metrics': handle_metrics,
+    '/v1/zones': handle_zones,
+    '/v1/alerts': handle_alerts,
+    '/v1/projections': handle_projections,
+    '/v1/correlations': handle_correlations,
+    '/v1/batch/metrics': handle_batch_metrics
+}
+
+# Endpoints whose payload is a list of flat rows and can be served as an Arrow table
+TABULAR_ROUTES = {'/v1/zones', '/v1/batch/metrics'}
+
+
+def json_safe(value):
+    """Payload with NaN / infinite numbers as null and NumPy values as plain Python ones"""
+    if isinstance(value, dict):
+        return {key: json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [json_safe(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def encode_arrow(rows):
+    table = pa.Table.from_pylist(rows)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+class UrbanPulseApiHandler(BaseHTTPRequestHandler):
+    server_version = "UrbanPulseAPI/1.0"
+    protocol_version = "HTTP/1.1"
+    timeout = KEEP_ALIVE_TIMEOUT
+
+    def do_GET(self):
+        self._dispatch(b"")
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_BODY_BYTES:
+            # The unread body would be parsed as the next request, so drop the connection
+            self.close_connection = True
+            if length < 0:
+                return self._send_error(400, "Invalid Content-Length")
+            return self._send_error(413, f"Request body too large ({length} > {MAX_BODY_BYTES} bytes)")
+        self._dispatch(self.rfile.read(length) if length else b"")
+
+    def _dispatch(self, body):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        path = url.path.rstrip('/') or '/'
+        handler = ROUTES.get(path)
+        if handler is None:
+            return self._send_error(404, f"Unknown endpoint: {url.path}")
+
+        wants_arrow = query.get('format', ['json'])[0] == 'arrow'
+        try:
+            if wants_arrow:
+                if path not in TABULAR_ROUTES:
+                    raise ApiError(406, "Arrow output is only available for tabular endpoints")
+                if pa is None:
+                    raise ApiError(406, "Arrow output requires pyarrow")
+            payload = handler(query, body)
+            if wants_arrow:
+                content = encode_arrow(payload)
+                content_type = 'application/vnd.apache.arrow.stream'
+            else:
+                content = json.dumps(json_safe(payload), default=str, allow_nan=False,
+                                     separators=(',', ':')).encode('utf-8')
+                content_type = 'application/json'
+        except ApiError as exc:
+            return self._send_error(exc.status, exc.message)
+        except Exception as exc:  # Always answer, so the client is not left with a dropped socket
+            return self._send_error(500, f"Internal error: {type(exc).__name__}: {exc}")
+
+        self._send_body(200, content, content_type)
+
+    def _send_body(self, status, content, content_type):
+        digest = hashlib.sha256(content).hexdigest()[:32]
+        use_gzip = len(content) >= GZIP_MIN_BYTES and 'gzip' in self.headers.get('Accept-Encoding', '')
+        # Each representation gets its own strong validator
+        etag = f'"{digest}-gz"' if use_gzip else f'"{digest}"'
+
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match:
+            tags = [tag.strip()[2:] if tag.strip().startswith('W/') else tag.strip() for tag in if_none_match.split(',')]
+            if '*' in tags or any(tag.strip('"').replace('-gz', '') == digest for tag in tags):
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Vary', 'Accept-Encoding')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+        encoding = None
+        if use_gzip:
+            content = gzip.compress(content, compresslevel=5)
+            encoding = 'gzip'
+
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(content)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'public, max-age=60')
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _send_error(self, status, message):
+        content = json.dumps({'error': message}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        # Keep the dashboard / worker logs quiet
+        pass
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTP server that hands each connection to a bounded worker pool"""
+    daemon_threads = True
+
+    def __init__(self, address, handler, workers=8):
+        super().__init__(address, handler)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='urbanpulse-api')
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False)
+
+
+def start_api_server(host="127.0.0.1", port=8600, workers=8):
+    """Run the API on a daemon thread of the current process (shares metrics_cache with the dashboard)"""
+    server = PooledHTTPServer((host, port), UrbanPulseApiHandler, workers=workers)
+    thread = threading.Thread(target=server.serve_forever, name='urbanpulse-api', daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UrbanPulse AI JSON/Arrow analytics API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--no-refresh', action='store_true', help="Do not refresh data layers in the background")
+    args = parser.parse_args()
+
+    if not args.no_refresh:
+        refresh_scheduler.start()
+    server = PooledHTTPServer((args.host, args.port), UrbanPulseApiHandler, workers=args.workers)
+    print(f"UrbanPulse API listening on http://{args.host}:{args.port} ({args.workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,14 +4,41 @@ import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
 import requests
+import io
 import json
+import os
+import time
 from datetime import datetime, timedelta
 import folium
-from streamlit_folium import folium_static
+import streamlit.components.v1 as components
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import geopandas as gpd
 from shapely.geometry import Point
 import matplotlib.pyplot as plt
 
+from analytics import (
+    CITIES, CITY_COORDINATES, CLIMATE_PROJECTIONS, FOCUS_AREAS, MAP_ZONES, SOLUTIONS, TIME_PERIODS,
+    build_alerts, get_city_metrics, get_trend_projections, groundwater_storage, nasa_analyzer, prioritized_zones,
+    zone_metrics_df
+)
+from api_server import start_api_server
+from archive import CITY_WIDE
+from city_records import memory_report
+from correlation import POOLED_ZONES, correlation_engine
+from export_reports import ZipSink, build_report, slugify
+from firms import DEFAULT_STORE as FIRMS_STORE, FirmsAggregateStore
+from hexgrid import BASE_EDGE_KM, RESOLUTIONS as HEX_RESOLUTIONS, zone_rollup
+from refresh import refresh_scheduler
+from scenarios import (
+    project_built_up, project_heat, project_population, project_transit, project_vegetation, scenario_baseline,
+    summarize
+)
+from timeline import timeline_html
+from session_memory import DEFAULT_SESSION_CAP_MB, session_registry, shared_store
+from dataflow import Dataflow
+from prioritization import METHODS as PRIORITY_METHODS, criteria_for, rank_zones
+from downsample import DEFAULT_CHART_WIDTH, cached_downsample
+
 # Page configuration
 st.set_page_config(
     page_title="UrbanPulse AI - NASA Powered Urban Analytics",
@@ -89,204 +116,28 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-class NASADataFetcher:
-    def __init__(self):
-        self.base_urls = {
-            'worldview': 'https://wvs.earthdata.nasa.gov/api/v1/snapshot',
-            'fires': 'https://firms.modaps.eosdis.nasa.gov/api/area/csv/',
-            'air_quality': 'https://airquality.googleapis.com/v1/currentConditions:lookup'
-        }
-        
-    def get_urban_growth_data(self, city_name, time_range):
-        """Get urban growth data based on selected time range"""
-        # Define time ranges
-        time_ranges = {
-            "2014-2024 (Recent Decade)": (2014, 2024),
-            "2000-2024 (Long-term)": (2000, 2024),
-            "2019-2024 (Recent Years)": (2019, 2024)
-        }
-        
-        start_year, end_year = time_ranges.get(time_range, (2014, 2024))
-        years = list(range(start_year, end_year + 1))
-        
-        city_growth_rates = {
-            'Bangalore, India': {'rate': 5.2, 'built_up_increase': 28},
-            'Mumbai, India': {'rate': 3.8, 'built_up_increase': 22},
-            'Delhi, India': {'rate': 4.1, 'built_up_increase': 25},
-            'Chennai, India': {'rate': 3.5, 'built_up_increase': 20},
-            'Hyderabad, India': {'rate': 4.8, 'built_up_increase': 26}
-        }
-        
-        city_data = city_growth_rates.get(city_name, {'rate': 4.0, 'built_up_increase': 23})
-        
-        # Adjust base values based on time range
-        if time_range == "2000-2024 (Long-term)":
-            base_pop = {
-                'Bangalore, India': 5.0, 'Mumbai, India': 8.5, 'Delhi, India': 7.2,
-                'Chennai, India': 4.2, 'Hyderabad, India': 3.5
-            }
-            built_up_base = 50
-            growth_factor = (end_year - start_year) / 10  # Normalize for longer period
-        elif time_range == "2019-2024 (Recent Years)":
-            base_pop = {
-                'Bangalore, India': 10.0, 'Mumbai, India': 14.0, 'Delhi, India': 12.5,
-                'Chennai, India': 7.5, 'Hyderabad, India': 6.5
-            }
-            built_up_base = 180
-            growth_factor = 1.5  # Accelerated recent growth
-        else:  # Recent Decade
-            base_pop = {
-                'Bangalore, India': 8.5, 'Mumbai, India': 12.5, 'Delhi, India': 11.2,
-                'Chennai, India': 6.8, 'Hyderabad, India': 5.8
-            }
-            built_up_base = 100
-            growth_factor = 1.0
-        
-        pop_base = base_pop.get(city_name, 7.0)
-        
-        return {
-            'years': years,
-            'population': [pop_base * (1 + city_data['rate']/100 * growth_factor)**(i) for i in range(len(years))],
-            'built_up_area': [built_up_base + city_data['built_up_increase'] * growth_factor * i for i in range(len(years))],
-            'growth_rate': city_data['rate'] * growth_factor,
-            'vegetation_loss': [-(city_data['built_up_increase'] * 0.3 * growth_factor) * i for i in range(len(years))],
-            'time_range': time_range
-        }
-    
-    def get_temperature_data(self, city_name, time_range):
-        """Get temperature data based on time range"""
-        time_ranges = {
-            "2014-2024 (Recent Decade)": (2014, 2024),
-            "2000-2024 (Long-term)": (2000, 2024),
-            "2019-2024 (Recent Years)": (2019, 2024)
-        }
-        
-        start_year, end_year = time_ranges.get(time_range, (2014, 2024))
-        years = list(range(start_year, end_year + 1))
-        
-        base_temps = {
-            'Bangalore, India': 23.5, 'Mumbai, India': 26.0, 'Delhi, India': 25.0,
-            'Chennai, India': 28.0, 'Hyderabad, India': 27.0
-        }
-        
-        base_temp = base_temps.get(city_name, 25.0)
-        
-        # Adjust temperature trend based on time range
-        if time_range == "2000-2024 (Long-term)":
-            temp_increase = 0.12  # Slower long-term trend
-            years_span = len(years)
-        elif time_range == "2019-2024 (Recent Years)":
-            temp_increase = 0.25  # Accelerated recent warming
-            years_span = 6
-        else:  # Recent Decade
-            temp_increase = 0.15
-            years_span = 11
-        
-        temperatures = [base_temp + temp_increase * i + np.random.normal(0, 0.3) for i in range(len(years))]
-        
-        return {
-            'years': years,
-            'temperatures': temperatures,
-            'trend': 'increasing',
-            'heat_island_intensity': round((temperatures[-1] - temperatures[0]) / years_span, 2),
-            'time_range': time_range
-        }
-    
-    def get_air_quality_data(self, city_name, time_range):
-        """Get air quality data with time range context"""
-        # Show trend based on time range
-        if time_range == "2000-2024 (Long-term)":
-            trend_note = "significant improvement since 2000"
-        elif time_range == "2019-2024 (Recent Years)":
-            trend_note = "recent stabilization"
-        else:
-            trend_note = "moderate improvement"
-            
-        aqi_data = {
-            'Bangalore, India': {'aqi': 145, 'pm25': 65, 'trend': trend_note},
-            'Mumbai, India': {'aqi': 168, 'pm25': 78, 'trend': trend_note},
-            'Delhi, India': {'aqi': 285, 'pm25': 125, 'trend': trend_note},
-            'Chennai, India': {'aqi': 132, 'pm25': 58, 'trend': trend_note},
-            'Hyderabad, India': {'aqi': 156, 'pm25': 72, 'trend': trend_note}
-        }
-        
-        return aqi_data.get(city_name, {'aqi': 150, 'pm25': 68, 'trend': trend_note})
-    
-    def get_water_stress_data(self, city_name, time_range):
-        """Get water stress data with time range context"""
-        if time_range == "2000-2024 (Long-term)":
-            trend = "gradual worsening over decades"
-            decline_rate = 1.2
-        elif time_range == "2019-2024 (Recent Years)":
-            trend = "rapid recent decline"
-            decline_rate = 3.5
-        else:
-            trend = "consistent pressure"
-            decline_rate = 2.1
-            
-        water_data = {
-            'Bangalore, India': {'stress_level': 65, 'groundwater_decline': decline_rate, 'trend': trend},
-            'Mumbai, India': {'stress_level': 72, 'groundwater_decline': decline_rate, 'trend': trend},
-            'Delhi, India': {'stress_level': 78, 'groundwater_decline': decline_rate, 'trend': trend},
-            'Chennai, India': {'stress_level': 82, 'groundwater_decline': decline_rate, 'trend': trend},
-            'Hyderabad, India': {'stress_level': 58, 'groundwater_decline': decline_rate, 'trend': trend}
-        }
-        
-        return water_data.get(city_name, {'stress_level': 65, 'groundwater_decline': decline_rate, 'trend': trend})
+# Optional machine-facing API served from this process so it shares the metrics cache
+@st.cache_resource
+def start_shared_api():
+    port = os.environ.get('URBANPULSE_API_PORT')
+    if not port:
+        return None
+    return start_api_server(
+        host=os.environ.get('URBANPULSE_API_HOST', '127.0.0.1'),
+        port=int(port),
+        workers=int(os.environ.get('URBANPULSE_API_WORKERS', 8))
+    )
 
-class UrbanDataAnalyzer:
-    def __init__(self):
-        self.nasa_fetcher = NASADataFetcher()
-        
-    def generate_city_metrics(self, city_name, focus_area, time_range):
-        """Generate comprehensive city metrics based on focus area and time range"""
-        # Get all data sources with time range
-        growth_data = self.nasa_fetcher.get_urban_growth_data(city_name, time_range)
-        temp_data = self.nasa_fetcher.get_temperature_data(city_name, time_range)
-        air_data = self.nasa_fetcher.get_air_quality_data(city_name, time_range)
-        water_data = self.nasa_fetcher.get_water_stress_data(city_name, time_range)
-        
-        # Focus-specific metrics
-        if focus_area == "Housing & Urban Growth":
-            primary_metric = growth_data['built_up_area'][-1]
-            metric_label = "Built-up Area (km²)"
-            risk_level = "high" if growth_data['growth_rate'] > 4.5 else "medium"
-            
-        elif focus_area == "Public Health & Heat":
-            primary_metric = temp_data['heat_island_intensity']
-            metric_label = "Heat Island Intensity (°C/yr)"
-            risk_level = "high" if temp_data['heat_island_intensity'] > 0.12 else "medium"
-            
-        elif focus_area == "Water & Resources":
-            primary_metric = water_data['stress_level']
-            metric_label = "Water Stress Level (%)"
-            risk_level = "high" if water_data['stress_level'] > 70 else "medium"
-            
-        elif focus_area == "Transportation":
-            primary_metric = 65  # Transit coverage %
-            metric_label = "Transit Coverage (%)"
-            risk_level = "medium"
-            
-        else:  # Green Spaces
-            primary_metric = -growth_data['vegetation_loss'][-1]
-            metric_label = "Vegetation Index"
-            risk_level = "high" if growth_data['vegetation_loss'][-1] < -15 else "medium"
-        
-        return {
-            'primary_metric': primary_metric,
-            'metric_label': metric_label,
-            'risk_level': risk_level,
-            'growth_data': growth_data,
-            'temperature_data': temp_data,
-            'air_quality_data': air_data,
-            'water_data': water_data,
-            'population': growth_data['population'][-1],
-            'growth_rate': growth_data['growth_rate'],
-            'time_range': time_range
-        }
+start_shared_api()
+
+# Data layers refresh on their own cadence in the background; reruns never wait for a fetch
+@st.cache_resource
+def start_refresh_scheduler():
+    if os.environ.get('URBANPULSE_REFRESH', '1') == '0':
+        return refresh_scheduler
+    return refresh_scheduler.start()
 
-# Initialize components
-nasa_analyzer = UrbanDataAnalyzer()
+start_refresh_scheduler()
 
 # Header
 st.markdown('<h1 class="main-header">🏙️ UrbanPulse AI</h1>', unsafe_allow_html=True)
@@ -299,13 +150,13 @@ with st.sidebar:
     
     focus_area = st.selectbox(
         "Primary Infrastructure Focus",
-        ["Housing & Urban Growth", "Public Health & Heat", "Water & Resources", "Transportation", "Green Spaces"],
+        FOCUS_AREAS,
         index=0
     )
     
     selected_city = st.selectbox(
         "Select City",
-        ["Bangalore, India", "Mumbai, India", "Delhi, India", "Chennai, India", "Hyderabad, India"],
+        CITIES,
         index=0
     )
     
@@ -314,7 +165,7 @@ with st.sidebar:
     
     analysis_period = st.selectbox(
         "Analysis Period",
-        ["2014-2024 (Recent Decade)", "2000-2024 (Long-term)", "2019-2024 (Recent Years)"],
+        TIME_PERIODS,
         index=0
     )
     
@@ -339,8 +190,69 @@ with st.sidebar:
     st.success("✅ Connected to NASA Data Sources")
     st.info("🛰️ Real satellite data analysis active")
 
+# Incremental recomputation: every computed artifact declares the inputs it depends on
+# and is only rebuilt when one of them changed since the previous rerun of this session
+# Pure artifacts live once per process in the shared store; the session memo only references them
+flow = Dataflow(st.session_state.setdefault('dataflow_memo', {}), shared_store=shared_store)
+# Changes after every background refresh and every archive write so metric-derived artifacts pick up new data
+data_version = (refresh_scheduler.version, nasa_analyzer.nasa_fetcher.archive.version())
+flow.set_inputs(
+    selected_city=selected_city,
+    focus_area=focus_area,
+    analysis_period=analysis_period,
+    nasa_sources=nasa_sources,
+    data_version=data_version
+)
+
 # Get city metrics based on ALL selections (city, focus, AND time range)
-city_metrics = nasa_analyzer.generate_city_metrics(selected_city, focus_area, analysis_period)
+@flow.artifact('city_metrics', deps=['selected_city', 'focus_area', 'analysis_period', 'data_version'], shared=True)
+def build_city_metrics(selected_city, focus_area, analysis_period, data_version):
+    return get_city_metrics(selected_city, focus_area, analysis_period)
+
+city_metrics = flow.get('city_metrics')
+
+# Chart payloads are downsampled to what the plot width can show; zooming re-fetches detail
+with st.sidebar:
+    with st.expander("📉 Chart Detail"):
+        chart_width = st.select_slider(
+            "Chart width (px)", [400, 800, 1200, 1600],
+            value=min([400, 800, 1200, 1600], key=lambda width: abs(width - DEFAULT_CHART_WIDTH))
+        )
+        chart_method = st.radio(
+            "Downsampling", ['lttb', 'minmax'],
+            format_func=lambda method: {'lttb': "Shape-preserving (LTTB)", 'minmax': "Min/max per pixel"}[method]
+        )
+        chart_years = city_metrics['growth_data']['years']
+        chart_zoom = st.slider("Zoom to years", int(chart_years[0]), int(chart_years[-1]), (int(chart_years[0]), int(chart_years[-1])))
+
+flow.set_inputs(chart_width=chart_width, chart_method=chart_method, chart_zoom=chart_zoom)
+
+
+def chart_points(series, x, y, focus_area, chart_width, chart_method, chart_zoom):
+    """Downsampled (x, y) for one city series, cached per resolution and zoom range"""
+    key = (selected_city, focus_area, analysis_period, series, data_version)
+    return cached_downsample(key, x, y, chart_width, chart_method, chart_zoom)
+
+# Memory footprint of the compact metric records for every city/focus/period combination.
+# It computes every combination, so it only runs on request (and is not counted as user traffic)
+@flow.artifact('metrics_memory_report', deps=['data_version'], shared=True)
+def build_metrics_memory_report(data_version):
+    rows = [
+        (city, focus, get_city_metrics(city, focus, period, track=False))
+        for city in CITIES for focus in FOCUS_AREAS for period in TIME_PERIODS
+    ]
+    return memory_report(rows)
+
+with st.sidebar:
+    with st.expander("🧮 Metrics Memory Footprint"):
+        if st.button("Measure", key="measure_memory"):
+            st.session_state['memory_report_version'] = data_version
+        if st.session_state.get('memory_report_version') == data_version:
+            report = flow.get('metrics_memory_report')
+            st.write(f"**City-periods held:** {report['rows']}")
+            st.write(f"**Nested dicts of lists:** {report['dict_of_lists_bytes'] / 1024:.1f} KB")
+            st.write(f"**Typed records:** {report['records_bytes'] / 1024:.1f} KB ({report['records_reduction']}x smaller)")
+            st.write(f"**Struct-of-arrays table:** {report['table_bytes'] / 1024:.1f} KB ({report['table_reduction']}x smaller)")
 
 # Main tabs - ALL CONNECTED TO SIDEBAR INCLUDING TIME RANGE
 tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
@@ -366,11 +278,16 @@ with tab1:
     
     # Active NASA sources
     st.markdown("### 🛰️ Active NASA Data Streams")
+    @flow.artifact('source_badges', deps=['nasa_sources'])
+    def build_source_badges(nasa_sources):
+        return [source.split(" - ")[0] for source in nasa_sources]
+    
     if nasa_sources:
-        cols = st.columns(len(nasa_sources))
-        for i, source in enumerate(nasa_sources):
+        source_badges = flow.get('source_badges')
+        cols = st.columns(len(source_badges))
+        for i, badge in enumerate(source_badges):
             with cols[i]:
-                st.markdown(f'<div style="text-align: center; padding: 0.5rem; background: #0B3D91; color: white; border-radius: 10px; font-weight: bold;">{source.split(" - ")[0]}</div>', unsafe_allow_html=True)
+                st.markdown(f'<div style="text-align: center; padding: 0.5rem; background: #0B3D91; color: white; border-radius: 10px; font-weight: bold;">{badge}</div>', unsafe_allow_html=True)
     
     st.markdown("---")
     
@@ -439,68 +356,101 @@ with tab1:
     st.markdown(f"### 📈 {focus_area} - {analysis_period} Analysis")
     
     # Create interactive chart based on focus and time range
-    if focus_area == "Housing & Urban Growth":
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=city_metrics['growth_data']['years'],
-            y=city_metrics['growth_data']['built_up_area'],
-            name='Built-up Area (km²)',
-            line=dict(color='#FC3D21', width=4),
-            fill='tozeroy'
-        ))
-        fig.add_trace(go.Scatter(
-            x=city_metrics['growth_data']['years'],
-            y=city_metrics['growth_data']['population'],
-            name='Population (Millions)',
-            line=dict(color='#0B3D91', width=4),
-            yaxis='y2'
-        ))
-        fig.update_layout(
-            title=f"Urban Expansion & Population Growth - {selected_city} ({analysis_period})",
-            yaxis=dict(title="Built-up Area (km²)"),
-            yaxis2=dict(title="Population (Millions)", overlaying='y', side='right')
-        )
+    @flow.artifact('focus_chart', deps=['city_metrics', 'selected_city', 'focus_area', 'analysis_period',
+                                        'chart_width', 'chart_method', 'chart_zoom'], shared=True)
+    def build_focus_chart(city_metrics, selected_city, focus_area, analysis_period, chart_width, chart_method, chart_zoom):
+        if focus_area == "Housing & Urban Growth":
+            growth = city_metrics['growth_data']
+            area_years, built_up_area = chart_points(
+                'built_up_area', growth['years'], growth['built_up_area'], focus_area, chart_width, chart_method, chart_zoom
+            )
+            population_years, population = chart_points(
+                'population', growth['years'], growth['population'], focus_area, chart_width, chart_method, chart_zoom
+            )
+            fig = go.Figure()
+            fig.add_trace(go.Scatter(
+                x=area_years,
+                y=built_up_area,
+                name='Built-up Area (km²)',
+                line=dict(color='#FC3D21', width=4),
+                fill='tozeroy'
+            ))
+            fig.add_trace(go.Scatter(
+                x=population_years,
+                y=population,
+                name='Population (Millions)',
+                line=dict(color='#0B3D91', width=4),
+                yaxis='y2'
+            ))
+            fig.update_layout(
+                title=f"Urban Expansion & Population Growth - {selected_city} ({analysis_period})",
+                yaxis=dict(title="Built-up Area (km²)"),
+                yaxis2=dict(title="Population (Millions)", overlaying='y', side='right')
+            )
         
-    elif focus_area == "Public Health & Heat":
-        fig = px.line(
-            x=city_metrics['temperature_data']['years'],
-            y=city_metrics['temperature_data']['temperatures'],
-            title=f"Urban Temperature Trend - {selected_city} ({analysis_period})",
-            labels={'x': 'Year', 'y': 'Temperature (°C)'}
-        )
-        fig.update_traces(line=dict(color='#FF6B6B', width=4))
+        elif focus_area == "Public Health & Heat":
+            years, temperatures = chart_points(
+                'temperature', city_metrics['temperature_data']['years'], city_metrics['temperature_data']['temperatures'],
+                focus_area, chart_width, chart_method, chart_zoom
+            )
+            fig = px.line(
+                x=years,
+                y=temperatures,
+                title=f"Urban Temperature Trend - {selected_city} ({analysis_period})",
+                labels={'x': 'Year', 'y': 'Temperature (°C)'}
+            )
+            fig.update_traces(line=dict(color='#FF6B6B', width=4))
         
-    elif focus_area == "Water & Resources":
-        years = city_metrics['growth_data']['years']
-        water_levels = [100 - city_metrics['water_data']['groundwater_decline'] * i for i in range(len(years))]
+        elif focus_area == "Water & Resources":
+            storage = groundwater_storage(selected_city, analysis_period)
+            if storage is not None:
+                # Decomposed GRACE storage: seasonal cycle around the long-term trend
+                fig = go.Figure()
+                fig.add_trace(go.Scatter(
+                    x=storage['months'], y=storage['storage'], name='Storage (trend + seasonal)',
+                    line=dict(color='#87CEEB', width=2), fill='tozeroy'
+                ))
+                fig.add_trace(go.Scatter(
+                    x=storage['months'], y=storage['trend'], name='Trend',
+                    line=dict(color='#4682B4', width=4)
+                ))
+                fig.update_layout(
+                    title=f"Groundwater Storage Anomaly (GRACE) - {selected_city} ({analysis_period})",
+                    xaxis_title='Month', yaxis_title='Water Storage Anomaly (cm)'
+                )
+            else:
+                years = city_metrics['growth_data']['years']
+                water_levels = [100 - city_metrics['water_data']['groundwater_decline'] * i for i in range(len(years))]
+            
+                fig = px.area(
+                    x=years, y=water_levels,
+                    title=f"Groundwater Resource Trend - {selected_city} ({analysis_period})",
+                    labels={'x': 'Year', 'y': 'Groundwater Index'}
+                )
+                fig.update_traces(line=dict(color='#4682B4', width=4))
         
-        fig = px.area(
-            x=years, y=water_levels,
-            title=f"Groundwater Resource Trend - {selected_city} ({analysis_period})",
-            labels={'x': 'Year', 'y': 'Groundwater Index'}
-        )
-        fig.update_traces(line=dict(color='#4682B4', width=4))
+        elif focus_area == "Green Spaces":
+            fig = px.line(
+                x=city_metrics['growth_data']['years'],
+                y=city_metrics['growth_data']['vegetation_loss'],
+                title=f"Vegetation Cover Change - {selected_city} ({analysis_period})",
+                labels={'x': 'Year', 'y': 'Vegetation Index Change'}
+            )
+            fig.update_traces(line=dict(color='#2E8B57', width=4))
         
-    elif focus_area == "Green Spaces":
-        fig = px.line(
-            x=city_metrics['growth_data']['years'],
-            y=city_metrics['growth_data']['vegetation_loss'],
-            title=f"Vegetation Cover Change - {selected_city} ({analysis_period})",
-            labels={'x': 'Year', 'y': 'Vegetation Index Change'}
-        )
-        fig.update_traces(line=dict(color='#2E8B57', width=4))
+        else:  # Transportation
+            years = city_metrics['growth_data']['years']
+            transit_data = [45 + 2.5*i for i in range(len(years))]
         
-    else:  # Transportation
-        years = city_metrics['growth_data']['years']
-        transit_data = [45 + 2.5*i for i in range(len(years))]
+            fig = px.bar(
+                x=years, y=transit_data,
+                title=f"Public Transit Coverage - {selected_city} ({analysis_period})",
+                labels={'x': 'Year', 'y': 'Transit Coverage (%)'}
+            )
         
-        fig = px.bar(
-            x=years, y=transit_data,
-            title=f"Public Transit Coverage - {selected_city} ({analysis_period})",
-            labels={'x': 'Year', 'y': 'Transit Coverage (%)'}
-        )
+        return fig
     
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(flow.get('focus_chart'), use_container_width=True)
     
     # Time-range specific insights
     st.markdown("### 💡 Time-based Insights")
@@ -516,39 +466,11 @@ with tab1:
     # Real-time alerts based on NASA data AND time range
     st.markdown("### ⚠️ Time-based Data Alerts")
     
-    alerts = []
-    
-    # Different thresholds based on time range
-    if "Long-term" in analysis_period:
-        heat_threshold = 0.10
-        growth_threshold = 3.5
-    elif "Recent Years" in analysis_period:
-        heat_threshold = 0.20
-        growth_threshold = 6.0
-    else:  # Recent Decade
-        heat_threshold = 0.12
-        growth_threshold = 4.5
-    
-    if city_metrics['temperature_data']['heat_island_intensity'] > heat_threshold:
-        alerts.append({
-            'type': '🌡️ Heat Alert',
-            'message': f'High urban heat island intensity detected: +{city_metrics["temperature_data"]["heat_island_intensity"]}°C/year ({analysis_period})',
-            'priority': 'High'
-        })
+    @flow.artifact('alerts', deps=['city_metrics', 'analysis_period'], shared=True)
+    def build_alert_list(city_metrics, analysis_period):
+        return build_alerts(city_metrics, analysis_period)
     
-    if city_metrics['water_data']['stress_level'] > 70:
-        alerts.append({
-            'type': '💧 Water Stress Alert',
-            'message': f'Critical water stress level: {city_metrics["water_data"]["stress_level"]}% ({analysis_period})',
-            'priority': 'High'
-        })
-    
-    if city_metrics['growth_data']['growth_rate'] > growth_threshold:
-        alerts.append({
-            'type': '🏗️ Rapid Growth Alert',
-            'message': f'Very high urban growth rate: {city_metrics["growth_data"]["growth_rate"]:.1f}% annually ({analysis_period})',
-            'priority': 'Medium'
-        })
+    alerts = flow.get('alerts')
     
     for alert in alerts:
         color = "#FC3D21" if alert['priority'] == 'High' else "#FFA726"
@@ -571,109 +493,168 @@ with tab2:
     # Time range context for tab 2
     st.info(f"**Trend Analysis Period**: {analysis_period} - Comparing urban development patterns across time")
     
+    # Client-side explorer: every period's series ship once (cached HTML per city); scrubbing
+    # years or switching periods then runs in the browser without a server rerun
+    if st.checkbox("🎞️ Explore all years in the browser (no reruns)", key="timeline_mode"):
+        @flow.artifact('timeline_html', deps=['selected_city', 'data_version'], shared=True)
+        def build_timeline_html(selected_city, data_version):
+            return timeline_html(selected_city)
+        
+        components.html(flow.get('timeline_html'), height=600)
+    
     col1, col2 = st.columns(2)
     
     with col1:
         # Urban expansion analysis WITH TIME RANGE
         st.subheader(f"🏗️ Urban Expansion ({analysis_period})")
         
-        expansion_data = pd.DataFrame({
-            'Year': city_metrics['growth_data']['years'],
-            'Built_up_Area': city_metrics['growth_data']['built_up_area'],
-            'Population': [p * 10 for p in city_metrics['growth_data']['population']]  # Scale for visualization
-        })
+        @flow.artifact('expansion_chart', deps=['city_metrics', 'selected_city', 'focus_area', 'analysis_period',
+                                                'chart_width', 'chart_method', 'chart_zoom'], shared=True)
+        def build_expansion_chart(city_metrics, selected_city, focus_area, analysis_period, chart_width, chart_method, chart_zoom):
+            growth = city_metrics['growth_data']
+            # Each series is downsampled on its own, so they are stacked in long format
+            frames = []
+            for name, values in (('Built_up_Area', growth['built_up_area']), ('Population', growth['population'] * 10)):  # Population scaled for visualization
+                years, points = chart_points(name, growth['years'], values, focus_area, chart_width, chart_method, chart_zoom)
+                frames.append(pd.DataFrame({'Year': years, 'value': points, 'variable': name}))
+            expansion_data = pd.concat(frames, ignore_index=True)
+            
+            return px.line(
+                expansion_data, x='Year', y='value', color='variable',
+                title=f"Urban Development Trend - {selected_city} ({analysis_period})",
+                labels={'value': 'Index Value', 'variable': 'Metric'}
+            )
         
-        fig_expansion = px.line(
-            expansion_data, x='Year', y=['Built_up_Area', 'Population'],
-            title=f"Urban Development Trend - {selected_city} ({analysis_period})",
-            labels={'value': 'Index Value', 'variable': 'Metric'}
-        )
-        st.plotly_chart(fig_expansion, use_container_width=True)
+        st.plotly_chart(flow.get('expansion_chart'), use_container_width=True)
         
         # Air Quality Analysis WITH TIME CONTEXT
         st.subheader("🌫️ Air Quality Trends")
         
-        aqi_data = pd.DataFrame({
-            'City': ['Bangalore', 'Mumbai', 'Delhi', 'Chennai', 'Hyderabad'],
-            'AQI': [145, 168, 285, 132, 156],
-            'PM2.5': [65, 78, 125, 58, 72],
-            'Trend': ['Stable', 'Worsening', 'Improving', 'Stable', 'Worsening']
-        })
+        @flow.artifact('aqi_chart', deps=['analysis_period'], shared=True)
+        def build_aqi_chart(analysis_period):
+            aqi_data = pd.DataFrame({
+                'City': ['Bangalore', 'Mumbai', 'Delhi', 'Chennai', 'Hyderabad'],
+                'AQI': [145, 168, 285, 132, 156],
+                'PM2.5': [65, 78, 125, 58, 72],
+                'Trend': ['Stable', 'Worsening', 'Improving', 'Stable', 'Worsening']
+            })
+            
+            return px.bar(
+                aqi_data, x='City', y='AQI',
+                title=f"Comparative Air Quality ({analysis_period})",
+                color='Trend',
+                color_discrete_map={'Improving': '#1A936F', 'Stable': '#FFA726', 'Worsening': '#FC3D21'}
+            )
         
-        fig_aqi = px.bar(
-            aqi_data, x='City', y='AQI',
-            title=f"Comparative Air Quality ({analysis_period})",
-            color='Trend',
-            color_discrete_map={'Improving': '#1A936F', 'Stable': '#FFA726', 'Worsening': '#FC3D21'}
-        )
-        st.plotly_chart(fig_aqi, use_container_width=True)
+        st.plotly_chart(flow.get('aqi_chart'), use_container_width=True)
     
     with col2:
         # Temperature trend analysis WITH TIME RANGE
         st.subheader(f"🌡️ Urban Heat Island ({analysis_period})")
         
-        temp_data = pd.DataFrame({
-            'Year': city_metrics['temperature_data']['years'],
-            'Temperature': city_metrics['temperature_data']['temperatures']
-        })
+        @flow.artifact('temperature_chart', deps=['city_metrics', 'selected_city', 'focus_area', 'analysis_period',
+                                                  'chart_width', 'chart_method', 'chart_zoom'], shared=True)
+        def build_temperature_chart(city_metrics, selected_city, focus_area, analysis_period, chart_width, chart_method, chart_zoom):
+            years, temperatures = chart_points(
+                'temperature', city_metrics['temperature_data']['years'], city_metrics['temperature_data']['temperatures'],
+                focus_area, chart_width, chart_method, chart_zoom
+            )
+            temp_data = pd.DataFrame({
+                'Year': years,
+                'Temperature': temperatures
+            })
+            
+            fig_temp = px.line(
+                temp_data, x='Year', y='Temperature',
+                title=f"Surface Temperature Trend - {selected_city} ({analysis_period})",
+                labels={'Temperature': 'Temperature (°C)'}
+            )
+            fig_temp.update_traces(line=dict(color='red', width=4))
+            return fig_temp
         
-        fig_temp = px.line(
-            temp_data, x='Year', y='Temperature',
-            title=f"Surface Temperature Trend - {selected_city} ({analysis_period})",
-            labels={'Temperature': 'Temperature (°C)'}
-        )
-        fig_temp.update_traces(line=dict(color='red', width=4))
-        st.plotly_chart(fig_temp, use_container_width=True)
+        st.plotly_chart(flow.get('temperature_chart'), use_container_width=True)
         
         # Water resources analysis WITH TIME CONTEXT
         st.subheader("💧 Water Stress Analysis")
         
-        water_indicators = pd.DataFrame({
-            'Indicator': ['Current Stress Level', 'Groundwater Decline', 'Reservoir Levels', 'Consumption Rate'],
-            'Value': [
-                city_metrics['water_data']['stress_level'],
-                city_metrics['water_data']['groundwater_decline'],
-                65,  # Reservoir levels %
-                78   # Consumption rate %
-            ],
-            'Status': ['Critical', 'High', 'Medium', 'High'],
-            'Period': [analysis_period, analysis_period, analysis_period, analysis_period]
-        })
+        @flow.artifact('water_chart', deps=['city_metrics', 'analysis_period'], shared=True)
+        def build_water_chart(city_metrics, analysis_period):
+            water_indicators = pd.DataFrame({
+                'Indicator': ['Current Stress Level', 'Groundwater Decline', 'Reservoir Levels', 'Consumption Rate'],
+                'Value': [
+                    city_metrics['water_data']['stress_level'],
+                    city_metrics['water_data']['groundwater_decline'],
+                    65,  # Reservoir levels %
+                    78   # Consumption rate %
+                ],
+                'Status': ['Critical', 'High', 'Medium', 'High'],
+                'Period': [analysis_period, analysis_period, analysis_period, analysis_period]
+            })
+            
+            return px.bar(
+                water_indicators, x='Indicator', y='Value',
+                title=f"Water Resource Indicators ({analysis_period})",
+                color='Status',
+                color_discrete_map={'Critical': '#FC3D21', 'High': '#FFA726', 'Medium': '#FFD700'}
+            )
         
-        fig_water = px.bar(
-            water_indicators, x='Indicator', y='Value',
-            title=f"Water Resource Indicators ({analysis_period})",
-            color='Status',
-            color_discrete_map={'Critical': '#FC3D21', 'High': '#FFA726', 'Medium': '#FFD700'}
-        )
-        st.plotly_chart(fig_water, use_container_width=True)
+        st.plotly_chart(flow.get('water_chart'), use_container_width=True)
     
     # Multi-time period comparison
     st.subheader("⏰ Historical Trend Comparison")
     
     # Compare different time periods
-    time_periods = ["2014-2024 (Recent Decade)", "2000-2024 (Long-term)", "2019-2024 (Recent Years)"]
-    comparison_metrics = []
-    
-    for period in time_periods:
-        period_data = nasa_analyzer.generate_city_metrics(selected_city, focus_area, period)
-        comparison_metrics.append({
-            'Period': period,
-            'Growth_Rate': period_data['growth_rate'],
-            'Heat_Intensity': period_data['temperature_data']['heat_island_intensity'],
-            'Water_Stress': period_data['water_data']['stress_level'],
-            'Population': period_data['population']
-        })
+    @flow.artifact('comparison_df', deps=['selected_city', 'focus_area', 'data_version'], shared=True)
+    def build_comparison_df(selected_city, focus_area, data_version):
+        comparison_metrics = []
+        
+        for period in TIME_PERIODS:
+            period_data = get_city_metrics(selected_city, focus_area, period)
+            comparison_metrics.append({
+                'Period': period,
+                'Growth_Rate': period_data['growth_rate'],
+                'Heat_Intensity': period_data['temperature_data']['heat_island_intensity'],
+                'Water_Stress': period_data['water_data']['stress_level'],
+                'Population': period_data['population']
+            })
+        
+        return pd.DataFrame(comparison_metrics)
+    
+    @flow.artifact('comparison_chart', deps=['comparison_df'], shared=True)
+    def build_comparison_chart(comparison_df):
+        return px.scatter(
+            comparison_df, x='Growth_Rate', y='Heat_Intensity',
+            size='Population', color='Period',
+            title="Urban Growth vs Heat Island Intensity Across Time Periods",
+            hover_data=['Water_Stress']
+        )
     
-    comp_df = pd.DataFrame(comparison_metrics)
+    comp_df = flow.get('comparison_df')
+    st.plotly_chart(flow.get('comparison_chart'), use_container_width=True)
     
-    fig_comparison = px.scatter(
-        comp_df, x='Growth_Rate', y='Heat_Intensity',
-        size='Population', color='Period',
-        title="Urban Growth vs Heat Island Intensity Across Time Periods",
-        hover_data=['Water_Stress']
-    )
-    st.plotly_chart(fig_comparison, use_container_width=True)
+    # Cross-layer correlations, updated incrementally as new observations arrive
+    st.subheader("🔗 Cross-Sensor Correlations")
+    
+    @flow.artifact('correlation_zones', deps=['selected_city', 'data_version'], shared=True)
+    def build_correlation_zones(selected_city, data_version):
+        correlation_engine.update_city(selected_city)
+        return [CITY_WIDE, POOLED_ZONES] + [zone for zone in correlation_engine.zones(selected_city) if zone != CITY_WIDE]
+    
+    correlation_zone = st.selectbox("Correlation scope", flow.get('correlation_zones'), key="correlation_zone")
+    flow.set_inputs(correlation_zone=correlation_zone)
+    
+    @flow.artifact('correlation_chart', deps=['correlation_zones', 'selected_city', 'correlation_zone'], shared=True)
+    def build_correlation_chart(correlation_zones, selected_city, correlation_zone):
+        summary = correlation_engine.summary(selected_city, correlation_zone)
+        matrix = pd.DataFrame(summary['correlation'], index=summary['layers'], columns=summary['layers'], dtype=float)
+        fig = px.imshow(
+            matrix, zmin=-1, zmax=1, color_continuous_scale='RdBu_r', text_auto='.2f',
+            title=f"Layer Correlations - {selected_city} ({correlation_zone})"
+        )
+        fig.update_traces(customdata=summary['count'], hovertemplate="%{y} vs %{x}: %{z:.2f} (n=%{customdata})<extra></extra>")
+        return fig
+    
+    st.plotly_chart(flow.get('correlation_chart'), use_container_width=True)
 
 with tab3:
     st.header("🗺️ Interactive Zone Analytics")
@@ -681,142 +662,162 @@ with tab3:
     # Time context for zone analysis
     st.info(f"**Zone Analysis Period**: {analysis_period} - Spatial patterns over time")
     
-    # City coordinates for mapping
-    city_coordinates = {
-        'Bangalore, India': (12.9716, 77.5946),
-        'Mumbai, India': (19.0760, 72.8777),
-        'Delhi, India': (28.7041, 77.1025),
-        'Chennai, India': (13.0827, 80.2707),
-        'Hyderabad, India': (17.3850, 78.4867)
-    }
+    # Criteria weights for the derived Priority column; moving a slider only reruns the scoring
+    with st.expander("⚖️ Priority Weights"):
+        priority_method = st.radio(
+            "Scoring method", list(PRIORITY_METHODS), horizontal=True,
+            format_func=lambda method: {'topsis': "TOPSIS", 'weighted_sum': "Weighted sum"}[method]
+        )
+        priority_weights = {
+            column: st.slider(
+                f"{column.replace('_', ' ')} ({'higher = more need' if direction > 0 else 'higher = less need'})",
+                0.0, 1.0, float(weight), 0.05, key=f"priority_weight_{focus_area}_{column}"
+            )
+            for column, (direction, weight) in criteria_for(focus_area).items()
+        }
+    flow.set_inputs(priority_weights=priority_weights, priority_method=priority_method)
+    
+    # Generate zone data based on focus and time range
+    # data_version: the raster summaries behind the Activity/Heat/Water columns are re-read after a refresh
+    @flow.artifact('zone_metrics', deps=['focus_area', 'analysis_period', 'selected_city', 'data_version'], shared=True)
+    def build_zone_metrics(focus_area, analysis_period, selected_city, data_version):
+        return zone_metrics_df(focus_area, analysis_period, selected_city)
+    
+    # Scored once, with the slider weights
+    @flow.artifact('zones_df', deps=['zone_metrics', 'focus_area', 'priority_weights', 'priority_method'], shared=True)
+    def build_prioritized_zones(zone_metrics, focus_area, priority_weights, priority_method):
+        return prioritized_zones(zone_metrics, focus_area, dict(priority_weights), priority_method)
     
     # Create interactive map
     st.subheader(f"🎯 Urban Infrastructure Heatmap ({analysis_period})")
     
-    # Get city coordinates
-    city_lat, city_lng = city_coordinates.get(selected_city, (12.9716, 77.5946))
-    
-    # Create Folium map
-    m = folium.Map(location=[city_lat, city_lng], zoom_start=11)
+    @flow.artifact('zone_map_html', deps=['selected_city', 'focus_area', 'analysis_period'], shared=True)
+    def build_zone_map_html(selected_city, focus_area, analysis_period):
+        # Get city coordinates
+        city_lat, city_lng = CITY_COORDINATES.get(selected_city, (12.9716, 77.5946))
     
-    # Add zones based on focus area AND time range
-    zones_data = {
-        'Central Business District': {'coords': [city_lat, city_lng], 'radius': 2000, 'color': 'red'},
-        'Residential Zones': {'coords': [city_lat + 0.05, city_lng + 0.05], 'radius': 2500, 'color': 'blue'},
-        'Industrial Areas': {'coords': [city_lat - 0.05, city_lng - 0.05], 'radius': 1800, 'color': 'orange'},
-        'Green Spaces': {'coords': [city_lat + 0.03, city_lng - 0.03], 'radius': 1500, 'color': 'green'}
-    }
+        # Create Folium map
+        m = folium.Map(location=[city_lat, city_lng], zoom_start=11)
     
-    for zone, data in zones_data.items():
-        folium.Circle(
-            location=data['coords'],
-            radius=data['radius'],
-            popup=f"{zone} - {focus_area} - {analysis_period}",
-            color=data['color'],
-            fill=True,
-            fillOpacity=0.6
-        ).add_to(m)
+        # Add zones based on focus area AND time range
+        zones_data = {
+            zone: {'coords': [city_lat + spec['offset'][0], city_lng + spec['offset'][1]], 'radius': spec['radius'], 'color': spec['color']}
+            for zone, spec in MAP_ZONES.items()
+        }
     
-    # Display map
-    folium_static(m, width=800, height=400)
+        for zone, data in zones_data.items():
+            folium.Circle(
+                location=data['coords'],
+                radius=data['radius'],
+                popup=f"{zone} - {focus_area} - {analysis_period}",
+                color=data['color'],
+                fill=True,
+                fillOpacity=0.6
+            ).add_to(m)
+        
+        return m.get_root().render()
+    
+    # Hex grid: zone metrics rolled up at every resolution once; the slider only picks a level
+    map_layer = st.radio("Map layer", ["Named zones", "Hex grid"], horizontal=True)
+    if map_layer == "Hex grid":
+        hex_col1, hex_col2 = st.columns(2)
+        with hex_col1:
+            hex_resolution = st.select_slider(
+                "Hex resolution", options=list(range(HEX_RESOLUTIONS)), value=HEX_RESOLUTIONS - 2,
+                format_func=lambda res: f"{BASE_EDGE_KM / 2 ** res:g} km edge"
+            )
+        with hex_col2:
+            hex_metrics = list(flow.get('zones_df').select_dtypes(include=[np.number]).columns)
+            hex_metric = st.selectbox("Hex metric", hex_metrics, index=hex_metrics.index('Priority_Score'))
+        flow.set_inputs(hex_resolution=hex_resolution, hex_metric=hex_metric)
+
+        @flow.artifact('zone_hex_rollup', deps=['selected_city', 'zones_df', 'focus_area'], shared=True)
+        def build_zone_hex_rollup(selected_city, zones_df, focus_area):
+            return zone_rollup(selected_city, zones_df, focus_area)
+
+        @flow.artifact('hex_map_html', deps=['zone_hex_rollup', 'hex_resolution', 'hex_metric', 'selected_city'], shared=True)
+        def build_hex_map_html(zone_hex_rollup, hex_resolution, hex_metric, selected_city):
+            city_lat, city_lng = CITY_COORDINATES.get(selected_city, (12.9716, 77.5946))
+            m = folium.Map(location=[city_lat, city_lng], zoom_start=10)
+            folium.GeoJson(
+                zone_hex_rollup.geojson(hex_resolution, hex_metric),
+                style_function=lambda feature: {
+                    'fillColor': feature['properties']['color'], 'color': '#555555',
+                    'weight': 0.5, 'fillOpacity': 0.55
+                },
+                tooltip=folium.GeoJsonTooltip(fields=['value', 'points'], aliases=[hex_metric, 'Samples'])
+            ).add_to(m)
+            return m.get_root().render()
+
+        components.html(flow.get('hex_map_html'), width=800, height=400)
+    else:
+        # Display map
+        components.html(flow.get('zone_map_html'), width=800, height=400)
     
     # Zone analysis based on focus AND time range
     st.subheader(f"🏘️ {focus_area} - Zone-wise Analysis ({analysis_period})")
     
-    # Generate zone data based on focus and time range
-    if focus_area == "Housing & Urban Growth":
-        # Adjust values based on time range
-        if "Long-term" in analysis_period:
-            growth_factor = 0.8
-        elif "Recent Years" in analysis_period:
-            growth_factor = 1.5
-        else:
-            growth_factor = 1.0
-            
-        zones_df = pd.DataFrame({
-            'Zone': ['CBD', 'Residential North', 'Residential South', 'Industrial East', 'Suburban West'],
-            'Housing_Density': ['Very High', 'High', 'Medium', 'Low', 'Medium'],
-            'Growth_Rate': [8.2 * growth_factor, 6.5 * growth_factor, 4.8 * growth_factor, 2.1 * growth_factor, 5.3 * growth_factor],
-            'Infrastructure_Score': [72, 65, 58, 45, 62],
-            'Priority': ['Immediate', 'High', 'Medium', 'Low', 'Medium'],
-            'Time_Period': [analysis_period] * 5
-        })
-        
-    elif focus_area == "Water & Resources":
-        zones_df = pd.DataFrame({
-            'Zone': ['Central Zone', 'Northern Suburbs', 'Southern Hills', 'Eastern Plains', 'Western Coast'],
-            'Water_Stress': [85, 72, 45, 68, 55],
-            'Groundwater_Level': [35, 42, 78, 38, 65],
-            'Consumption_Rate': [88, 75, 52, 72, 58],
-            'Priority': ['Critical', 'High', 'Low', 'Medium', 'Medium'],
-            'Time_Period': [analysis_period] * 5
-        })
-        
-    elif focus_area == "Public Health & Heat":
-        # Adjust heat index based on time range
-        if "Recent Years" in analysis_period:
-            heat_factor = 1.3
-        else:
-            heat_factor = 1.0
-            
-        zones_df = pd.DataFrame({
-            'Zone': ['Urban Core', 'Dense Residential', 'Industrial Belt', 'Green Zones', 'Mixed Use'],
-            'Heat_Index': [4.2 * heat_factor, 3.8 * heat_factor, 4.5 * heat_factor, 2.1 * heat_factor, 3.2 * heat_factor],
-            'Air_Quality': [165, 142, 235, 85, 128],
-            'Healthcare_Access': [65, 58, 45, 82, 72],
-            'Priority': ['High', 'Medium', 'Critical', 'Low', 'Medium'],
-            'Time_Period': [analysis_period] * 5
-        })
-        
-    else:  # Default zones
-        zones_df = pd.DataFrame({
-            'Zone': ['Zone A', 'Zone B', 'Zone C', 'Zone D', 'Zone E'],
-            'Development_Index': [78, 65, 72, 58, 68],
-            'Infrastructure_Score': [72, 65, 58, 45, 62],
-            'Growth_Pressure': ['High', 'Medium', 'Very High', 'Low', 'Medium'],
-            'Priority': ['High', 'Medium', 'Immediate', 'Low', 'Medium'],
-            'Time_Period': [analysis_period] * 5
-        })
+    zones_df = flow.get('zones_df')
     
     # Display zone data
     st.dataframe(zones_df, use_container_width=True)
     
+    # Every city's zones scored together in one pass; only the top k are sorted
+    # rank_zones scores the stacked tables itself
+    @flow.artifact('all_zone_tables', deps=['focus_area', 'analysis_period', 'data_version'], shared=True)
+    def build_all_zone_tables(focus_area, analysis_period, data_version):
+        return {city: zone_metrics_df(focus_area, analysis_period, city) for city in CITIES}
+    
+    @flow.artifact('zone_ranking', deps=['all_zone_tables', 'focus_area', 'priority_weights', 'priority_method'], shared=True)
+    def build_zone_ranking(all_zone_tables, focus_area, priority_weights, priority_method):
+        return rank_zones(all_zone_tables, focus_area, dict(priority_weights), priority_method, k=10)
+    
+    with st.expander("🏆 Top-Priority Zones Across Cities"):
+        st.dataframe(flow.get('zone_ranking'), use_container_width=True, hide_index=True)
+    
     # Zone comparison charts
     col1, col2 = st.columns(2)
     
     with col1:
         # Zone priority distribution
-        priority_counts = zones_df['Priority'].value_counts()
-        fig_priority = px.pie(
-            values=priority_counts.values,
-            names=priority_counts.index,
-            title=f"Zone Priority Distribution ({analysis_period})"
-        )
-        st.plotly_chart(fig_priority, use_container_width=True)
+        @flow.artifact('priority_chart', deps=['zones_df', 'analysis_period'], shared=True)
+        def build_priority_chart(zones_df, analysis_period):
+            priority_counts = zones_df['Priority'].value_counts()
+            return px.pie(
+                values=priority_counts.values,
+                names=priority_counts.index,
+                title=f"Zone Priority Distribution ({analysis_period})"
+            )
+        
+        st.plotly_chart(flow.get('priority_chart'), use_container_width=True)
     
     with col2:
         # Zone development scores
-        if 'Development_Index' in zones_df.columns:
-            fig_dev = px.bar(
-                zones_df, x='Zone', y='Development_Index',
-                title=f"Zone Development Scores ({analysis_period})",
-                color='Development_Index'
-            )
-        else:
-            # Use first numeric column
-            numeric_cols = zones_df.select_dtypes(include=[np.number]).columns
-            if len(numeric_cols) > 0:
+        @flow.artifact('development_chart', deps=['zones_df', 'analysis_period'], shared=True)
+        def build_development_chart(zones_df, analysis_period):
+            if 'Development_Index' in zones_df.columns:
                 fig_dev = px.bar(
-                    zones_df, x='Zone', y=numeric_cols[0],
-                    title=f"Zone {numeric_cols[0]} Analysis ({analysis_period})",
-                    color=numeric_cols[0]
+                    zones_df, x='Zone', y='Development_Index',
+                    title=f"Zone Development Scores ({analysis_period})",
+                    color='Development_Index'
                 )
             else:
-                fig_dev = px.bar(
-                    zones_df, x='Zone', y=zones_df.index,
-                    title=f"Zone Analysis ({analysis_period})"
-                )
-        st.plotly_chart(fig_dev, use_container_width=True)
+                # Use first numeric column
+                numeric_cols = zones_df.select_dtypes(include=[np.number]).columns
+                if len(numeric_cols) > 0:
+                    fig_dev = px.bar(
+                        zones_df, x='Zone', y=numeric_cols[0],
+                        title=f"Zone {numeric_cols[0]} Analysis ({analysis_period})",
+                        color=numeric_cols[0]
+                    )
+                else:
+                    fig_dev = px.bar(
+                        zones_df, x='Zone', y=zones_df.index,
+                        title=f"Zone Analysis ({analysis_period})"
+                    )
+            return fig_dev
+        
+        st.plotly_chart(flow.get('development_chart'), use_container_width=True)
 
 with tab4:
     st.header("💡 AI-Powered Urban Insights")
@@ -903,28 +904,34 @@ with tab4:
     # Time-based Cost-Benefit Analysis
     st.subheader(f"💰 Cost-Benefit Analysis ({analysis_period})")
     
-    # Adjust costs based on time range
-    if "Long-term" in analysis_period:
-        cost_factor = 1.2  # Higher for long-term projects
-    elif "Recent Years" in analysis_period:
-        cost_factor = 0.9  # Lower for recent focused projects
-    else:
-        cost_factor = 1.0
-    
-    cost_data = pd.DataFrame({
-        'Initiative': ['Housing Development', 'Water Infrastructure', 'Transit Expansion', 'Green Spaces'],
-        'Estimated_Cost': [450 * cost_factor, 320 * cost_factor, 580 * cost_factor, 280 * cost_factor],
-        'Expected_Benefit': [780, 550, 920, 450],
-        'ROI_Percentage': [73, 72, 59, 61],
-        'Timeframe': [analysis_period] * 4
-    })
-    
-    fig_roi = px.bar(
-        cost_data, x='Initiative', y=['Estimated_Cost', 'Expected_Benefit'],
-        title=f"Infrastructure Investment Analysis - {analysis_period} (in Millions USD)",
-        barmode='group'
-    )
-    st.plotly_chart(fig_roi, use_container_width=True)
+    @flow.artifact('cost_data', deps=['analysis_period'], shared=True)
+    def build_cost_data(analysis_period):
+        # Adjust costs based on time range
+        if "Long-term" in analysis_period:
+            cost_factor = 1.2  # Higher for long-term projects
+        elif "Recent Years" in analysis_period:
+            cost_factor = 0.9  # Lower for recent focused projects
+        else:
+            cost_factor = 1.0
+        
+        return pd.DataFrame({
+            'Initiative': ['Housing Development', 'Water Infrastructure', 'Transit Expansion', 'Green Spaces'],
+            'Estimated_Cost': [450 * cost_factor, 320 * cost_factor, 580 * cost_factor, 280 * cost_factor],
+            'Expected_Benefit': [780, 550, 920, 450],
+            'ROI_Percentage': [73, 72, 59, 61],
+            'Timeframe': [analysis_period] * 4
+        })
+    
+    @flow.artifact('roi_chart', deps=['cost_data', 'analysis_period'], shared=True)
+    def build_roi_chart(cost_data, analysis_period):
+        return px.bar(
+            cost_data, x='Initiative', y=['Estimated_Cost', 'Expected_Benefit'],
+            title=f"Infrastructure Investment Analysis - {analysis_period} (in Millions USD)",
+            barmode='group'
+        )
+    
+    cost_data = flow.get('cost_data')
+    st.plotly_chart(flow.get('roi_chart'), use_container_width=True)
 
 with tab5:
     st.header("🔍 Live Satellite Data Analysis")
@@ -957,9 +964,13 @@ with tab5:
         st.subheader("📊 Time-based Urban Indicators")
         
         # Live data simulation with time context
+        activity_growth = city_metrics['growth_data']['activity_growth']
+        surface_uhi = city_metrics['temperature_data']['surface_uhi']
         indicators = {
             "Urban Expansion Rate": f"{city_metrics['growth_data']['growth_rate']:.1f}%",
+            "Nighttime Activity Growth": "No VIIRS stack processed" if np.isnan(activity_growth) else f"{activity_growth:+.1f}%/yr",
             "Heat Island Intensity": f"+{city_metrics['temperature_data']['heat_island_intensity']}°C/yr",
+            "Surface UHI (urban − rural)": "No LST grids processed" if np.isnan(surface_uhi) else f"{surface_uhi:+.1f}°C",
             "Water Stress Level": f"{city_metrics['water_data']['stress_level']}%",
             "Air Quality Index": f"{city_metrics['air_quality_data']['aqi']}",
             "Analysis Period": analysis_period
@@ -973,8 +984,50 @@ with tab5:
         st.write(f"**Analysis Period:** {analysis_period}")
         st.write(f"**Data Range:** {city_metrics['growth_data']['years'][0]} - {city_metrics['growth_data']['years'][-1]}")
         st.write(f"**Update Frequency:** Daily (MODIS/VIIRS), 16 days (Landsat)")
+        
+        # Background refresh status: values shown are the last good refresh, even while one is running
+        with st.expander("🔄 Layer Refresh Status"):
+            refresh_stats = refresh_scheduler.stats()
+            if not refresh_stats['running']:
+                st.warning("Background refresh is not running (URBANPULSE_REFRESH=0)")
+            st.dataframe(pd.DataFrame([
+                {
+                    'Layer': name,
+                    'Cadence (h)': round(layer['cadence_s'] / 3600, 1),
+                    'Age (h)': None if layer['age_s'] is None else round(layer['age_s'] / 3600, 2),
+                    'Lag (h)': None if layer['lag_s'] is None else round(layer['lag_s'] / 3600, 2),
+                    'Refreshing': layer['in_flight'],
+                    'Errors': layer['errors']
+                }
+                for name, layer in refresh_stats['layers'].items()
+            ]), use_container_width=True, hide_index=True)
         st.write(f"**Historical Context:** {len(city_metrics['growth_data']['years'])} years of urban analysis")
     
+    # FIRMS fire hotspots from the pre-aggregated (city, zone, day) store
+    st.subheader("🔥 FIRMS Fire Hotspots")
+    flow.set_inputs(firms_store_version=os.path.getmtime(FIRMS_STORE) if os.path.exists(FIRMS_STORE) else None)
+    
+    @flow.artifact('firms_store', deps=['firms_store_version'], shared=True)
+    def load_firms_store(firms_store_version):
+        return FirmsAggregateStore(FIRMS_STORE) if firms_store_version is not None else None
+    
+    @flow.artifact('firms_summary', deps=['firms_store', 'selected_city'], shared=True)
+    def build_firms_summary(firms_store, selected_city):
+        if firms_store is None:
+            return None
+        daily = firms_store.query(selected_city).groupby('date', as_index=False)['detections'].sum()
+        return firms_store.zone_summary(selected_city), daily
+    
+    firms_summary = flow.get('firms_summary')
+    if firms_summary is None:
+        st.info(f"No FIRMS aggregate found at `{FIRMS_STORE}`. Ingest FIRMS CSVs with `python firms.py <csv or url> ...`")
+    elif firms_summary[0].empty:
+        st.success(f"✅ No fire detections recorded within {selected_city}")
+    else:
+        zone_summary, daily = firms_summary
+        st.dataframe(zone_summary, use_container_width=True, hide_index=True)
+        st.plotly_chart(px.bar(daily, x='date', y='detections', title=f"Daily Fire Detections - {selected_city}"), use_container_width=True)
+    
     # Time-based NASA Data Access Information
     st.subheader("🚀 Historical Data Access")
     
@@ -1014,63 +1067,143 @@ with tab6:
     
     with col1:
         st.subheader("Sea Level Rise Projection")
-        st.metric("Projected Rise", "0.5m", "0.3m since 2000")
-        st.progress(0.7)
+        sea_level = CLIMATE_PROJECTIONS['sea_level_rise']
+        st.metric("Projected Rise", sea_level['projected'], sea_level['since_2000'])
+        st.progress(sea_level['progress'])
         
     with col2:
         st.subheader("Extreme Heat Days")
-        st.metric("Additional Days >35°C", "+45 days/year", "+150%")
-        st.progress(0.8)
+        heat_days = CLIMATE_PROJECTIONS['extreme_heat_days']
+        st.metric("Additional Days >35°C", heat_days['projected'], heat_days['change'])
+        st.progress(heat_days['progress'])
+
+    # Fitted trends (robust slopes, compound growth) projected to 2050 with 95% prediction intervals
+    st.subheader(f"📈 Trend Projections to 2050 - {selected_city}")
+    
+    @flow.artifact('trend_projection_chart', deps=['selected_city', 'focus_area', 'analysis_period', 'data_version'], shared=True)
+    def build_trend_projection_chart(selected_city, focus_area, analysis_period, data_version):
+        trends = get_trend_projections(selected_city, focus_area, analysis_period)
+        years = trends['years']
+        fig = go.Figure()
+        for name, label, color, axis in [
+            ('population', 'Population (Millions)', '#0B3D91', 'y'),
+            ('temperature', 'Temperature (°C)', '#FC3D21', 'y2')
+        ]:
+            projection = trends[name]
+            fig.add_trace(go.Scatter(x=years, y=projection['upper'], line=dict(width=0), showlegend=False, yaxis=axis, hoverinfo='skip'))
+            fig.add_trace(go.Scatter(
+                x=years, y=projection['lower'], line=dict(width=0), fill='tonexty',
+                fillcolor='rgba(11,61,145,0.15)' if name == 'population' else 'rgba(252,61,33,0.15)',
+                name=f"{label} 95% interval", yaxis=axis, hoverinfo='skip'
+            ))
+            fig.add_trace(go.Scatter(x=years, y=projection['mean'], name=label, line=dict(color=color, width=3), yaxis=axis))
+        fig.update_layout(
+            title=f"Projected Population & Temperature - {selected_city} (fitted on {analysis_period})",
+            yaxis=dict(title="Population (Millions)"),
+            yaxis2=dict(title="Temperature (°C)", overlaying='y', side='right')
+        )
+        return fig, trends
+    
+    trend_fig, trends = flow.get('trend_projection_chart')
+    st.plotly_chart(trend_fig, use_container_width=True)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Population 2050", f"{trends['population']['mean'][-1]:.1f}M", f"{np.expm1(trends['population']['slope']) * 100:.1f}%/yr fitted")
+    with col2:
+        st.metric("Built-up Area 2050", f"{trends['built_up_area']['mean'][-1]:,.0f} km²", f"+{trends['built_up_area']['slope']:.1f} km²/yr")
+    with col3:
+        st.metric("Temperature 2050", f"{trends['temperature']['mean'][-1]:.1f}°C", f"+{trends['temperature']['slope']:.2f}°C/yr (Theil-Sen)")
+
+    # What-if growth scenarios: each stage is its own artifact, so a slider only recomputes
+    # the stages downstream of it (adoption leaves population and built-up area untouched)
+    st.subheader(f"🧪 What-if Growth Scenario to 2050 - {selected_city}")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        base_growth = round(float(city_metrics['growth_rate']), 1)
+        scenario_growth = st.slider("Annual population growth (%)", 0.0, max(10.0, float(np.ceil(base_growth))), base_growth, 0.1)
+    with col2:
+        scenario_densification = st.slider("Densification (share of new residents without new land)", 0.0, 1.0, 0.3, 0.05)
+    with col3:
+        scenario_adoption = st.slider("Intervention adoption (%)", 0, 100, 0, 5)
+    flow.set_inputs(scenario_growth=scenario_growth, scenario_densification=scenario_densification,
+                    scenario_adoption=scenario_adoption)
+    
+    @flow.artifact('scenario_baseline', deps=['city_metrics'], shared=True)
+    def build_scenario_baseline(city_metrics):
+        return scenario_baseline(city_metrics)
+    
+    @flow.artifact('scenario_population', deps=['scenario_baseline', 'scenario_growth'], shared=True)
+    def build_scenario_population(scenario_baseline, scenario_growth):
+        return project_population(scenario_baseline, scenario_growth)
+    
+    @flow.artifact('scenario_built_up', deps=['scenario_baseline', 'scenario_population', 'scenario_densification'], shared=True)
+    def build_scenario_built_up(scenario_baseline, scenario_population, scenario_densification):
+        return project_built_up(scenario_baseline, scenario_population, scenario_densification)
+    
+    @flow.artifact('scenario_vegetation', deps=['scenario_baseline', 'scenario_built_up', 'scenario_adoption'], shared=True)
+    def build_scenario_vegetation(scenario_baseline, scenario_built_up, scenario_adoption):
+        return project_vegetation(scenario_baseline, scenario_built_up, scenario_adoption)
+    
+    @flow.artifact('scenario_heat', deps=['scenario_baseline', 'scenario_built_up', 'scenario_adoption'], shared=True)
+    def build_scenario_heat(scenario_baseline, scenario_built_up, scenario_adoption):
+        return project_heat(scenario_baseline, scenario_built_up, scenario_adoption)
+    
+    @flow.artifact('scenario_transit', deps=['scenario_baseline', 'scenario_densification'], shared=True)
+    def build_scenario_transit(scenario_baseline, scenario_densification):
+        return project_transit(scenario_baseline, scenario_densification)
+    
+    @flow.artifact('scenario_summary', deps=['scenario_baseline', 'scenario_population', 'scenario_built_up',
+                                             'scenario_vegetation', 'scenario_heat', 'scenario_transit'], shared=True)
+    def build_scenario_summary(scenario_baseline, scenario_population, scenario_built_up, scenario_vegetation,
+                               scenario_heat, scenario_transit):
+        return summarize(scenario_baseline, scenario_population, scenario_built_up, scenario_vegetation,
+                         scenario_heat, scenario_transit)
+    
+    scenario_started = time.perf_counter()
+    scenario = flow.get('scenario_summary')
+    scenario_ms = (time.perf_counter() - scenario_started) * 1000
+    
+    fig_scenario = go.Figure()
+    fig_scenario.add_trace(go.Scatter(x=scenario['years'], y=scenario['built_up'], name='Built-up Area (km²)',
+                                      line=dict(color='#FC3D21', width=3)))
+    fig_scenario.add_trace(go.Scatter(x=scenario['years'], y=scenario['population'], name='Population (Millions)',
+                                      line=dict(color='#0B3D91', width=3), yaxis='y2'))
+    fig_scenario.update_layout(
+        title=f"Scenario: {scenario_growth:.1f}%/yr growth, {scenario_densification:.0%} densification, {scenario_adoption}% adoption",
+        yaxis=dict(title="Built-up Area (km²)"),
+        yaxis2=dict(title="Population (Millions)", overlaying='y', side='right')
+    )
+    st.plotly_chart(fig_scenario, use_container_width=True)
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Population 2050", f"{scenario['population'][-1]:.1f}M")
+    with col2:
+        st.metric("Vegetation Change 2050", f"{scenario['vegetation'][-1]:.1f}")
+    with col3:
+        st.metric("Surface Temperature 2050", f"{scenario['temperature'][-1]:.1f}°C",
+                  f"{scenario['temperature'][-1] - scenario['temperature'][0]:+.1f}°C", delta_color="inverse")
+    with col4:
+        st.metric("Transit Coverage 2050", f"{scenario['transit'][-1]:.0f}%")
+    
+    st.plotly_chart(px.bar(
+        pd.DataFrame([{'Zone': zone, 'Temperature': values['temperature']} for zone, values in scenario['zones'].items()]),
+        x='Zone', y='Temperature', title="Zone Surface Temperature in 2050 (°C)", color='Temperature',
+        color_continuous_scale='YlOrRd'
+    ), use_container_width=True)
+    st.caption(f"Scenario updated in {scenario_ms:.1f} ms")
 
     st.header("👥 Community Impact Analysis")
     # Show how it affects real people
     st.subheader("Vulnerable Populations")
-    vulnerable_data = {
-        'Population at Risk': '2.5M people',
-        'Economic Impact': '$15B annually', 
-        'Infrastructure at Risk': '45% of city area',
-        'Timeframe': 'By 2050'
-    }
+    vulnerable_data = CLIMATE_PROJECTIONS['vulnerable_populations']
     
     for metric, value in vulnerable_data.items():
         st.metric(metric, value)
 
     st.header("💡 Implementable Solutions")
     
-    solutions = [
-        {
-            'name': 'Green Roof Initiative',
-            'cost': '$2.5M', 
-            'impact': 'Reduce heat by 2-3°C',
-            'timeline': '3 years',
-            'nasa_data': 'MODIS Thermal Analysis',
-            'description': 'Install green roofs on public buildings to combat urban heat island effect'
-        },
-        {
-            'name': 'Smart Water Management',
-            'cost': '$8M',
-            'impact': 'Reduce water stress 25%',
-            'timeline': '5 years', 
-            'nasa_data': 'GRACE Groundwater',
-            'description': 'AI-powered water distribution system with real-time monitoring'
-        },
-        {
-            'name': 'Urban Forest Expansion',
-            'cost': '$4.2M',
-            'impact': 'Improve air quality 30%',
-            'timeline': '4 years',
-            'nasa_data': 'Landsat Vegetation',
-            'description': 'Plant 100,000 native trees in urban corridors'
-        },
-        {
-            'name': 'Coastal Protection Infrastructure',
-            'cost': '$12M', 
-            'impact': 'Protect 85% of coastline',
-            'timeline': '6 years',
-            'nasa_data': 'ICESat-2 Elevation',
-            'description': 'Build sea walls and mangrove restoration for flood protection'
-        }
-    ]
+    solutions = SOLUTIONS
 
     st.subheader("🎯 NASA-Powered Urban Solutions")
     
@@ -1105,10 +1238,18 @@ with tab6:
         default=[sol['name'] for sol in solutions[:2]]
     )
     
-    if selected_solutions:
+    # The calculator is the only artifact that depends on this widget
+    flow.set_inputs(selected_solutions=selected_solutions)
+    
+    @flow.artifact('solution_totals', deps=['selected_solutions'])
+    def build_solution_totals(selected_solutions):
         total_cost = sum(float(sol['cost'].replace('$', '').replace('M', '')) 
                         for sol in solutions if sol['name'] in selected_solutions)
         total_impact = len(selected_solutions) * 25  # Simplified impact metric
+        return total_cost, total_impact
+    
+    if selected_solutions:
+        total_cost, total_impact = flow.get('solution_totals')
         
         col1, col2 = st.columns(2)
         with col1:
@@ -1118,8 +1259,29 @@ with tab6:
         
         st.info(f"💡 Implementing {len(selected_solutions)} solutions will transform urban resilience by 2050")
 
-    # Add call to action
+    # Implementation plan export (same report bundle as export_reports.py, for the current city/period)
+    @flow.artifact('report_zip', deps=['selected_city', 'analysis_period', 'data_version'], shared=True)
+    def build_report_zip(selected_city, analysis_period, data_version):
+        buffer = io.BytesIO()
+        sink = ZipSink(buffer)
+        sink.write(build_report(selected_city, analysis_period))
+        sink.close()
+        return buffer.getvalue()
+
     st.markdown("---")
+    # The bundle renders every focus area, so it is only built once asked for (per city/period/data version)
+    report_request = (selected_city, analysis_period, data_version)
+    if st.button("📦 Prepare the detailed implementation plan"):
+        st.session_state['report_request'] = report_request
+    if st.session_state.get('report_request') == report_request:
+        st.download_button(
+            "📥 Download the detailed implementation plan",
+            data=flow.get('report_zip'),
+            file_name=f"urbanpulse_{slugify(selected_city)}_{slugify(analysis_period)}.zip",
+            mime="application/zip"
+        )
+
+    # Add call to action
     st.success("""
     🌟 **Next Steps:** 
     - Download the detailed implementation plan
@@ -1127,3 +1289,23 @@ with tab6:
     - Apply for climate resilience grants
     - Schedule NASA data consultation
     """)
+
+# Per-session memory accounting and cap enforcement (runs after every artifact of this rerun)
+session_bytes = flow.enforce_cap(DEFAULT_SESSION_CAP_MB * 1e6)
+run_ctx = get_script_run_ctx()
+if run_ctx is not None:
+    session_registry.update(run_ctx.session_id, session_bytes)
+
+with st.sidebar:
+    with st.expander("🧠 Session Memory"):
+        st.write(f"**This session:** {session_bytes / 1024:.1f} KB (cap {DEFAULT_SESSION_CAP_MB:.0f} MB)")
+        store_stats = shared_store.stats()
+        st.write(f"**Shared store:** {store_stats['bytes'] / 1e6:.2f} MB in {store_stats['entries']} artifacts")
+        sessions = session_registry.report()
+        st.write(f"**Active sessions:** {len(sessions)} · {sum(sessions.values()) / 1e6:.2f} MB private in total")
+        if flow.evicted:
+            st.caption(f"Evicted to stay under cap: {', '.join(flow.evicted)}")
+        st.dataframe(
+            pd.DataFrame(flow.memory_report(), columns=['artifact', 'session_bytes', 'shared_bytes', 'shared']),
+            use_container_width=True, hide_index=True
+        )
@@ -0,0 +1,233 @@
+import argparse
+import functools
+import json
+import operator
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:  # Without pyarrow the fetchers keep their catalogue values
+    pa = None
+    ds = None
+
+DEFAULT_ARCHIVE = os.environ.get('URBANPULSE_ARCHIVE', os.path.join('data', 'archive'))
+# Zone label of city-wide observations
+CITY_WIDE = 'City'
+ROW_GROUP_ROWS = 64_000
+# Written after every ingest; the leading underscore keeps it out of dataset discovery
+MANIFEST = '_manifest.json'
+
+
+def _file_options():
+    # Repetitive strings as dictionaries; sorted dates and smooth values compress best
+    # with delta / byte-stream-split encodings
+    return ds.ParquetFileFormat().make_write_options(
+        compression='zstd',
+        use_dictionary=['layer', 'zone'],
+        column_encoding={'date': 'DELTA_BINARY_PACKED', 'value': 'BYTE_STREAM_SPLIT'},
+        write_statistics=True
+    )
+
+
+class ObservationArchive:
+    """Partitioned Parquet store of city x layer x zone x date observations
+
+    Files live under <root>/city=<name>/year=<yyyy>/. Queries push the city and year
+    predicates down to partition pruning and the layer/zone predicates down to Parquet
+    row-group statistics (rows are sorted by layer), so only the needed bytes are read.
+    """
+
+    def __init__(self, root=DEFAULT_ARCHIVE):
+        self.root = root
+        self.lock = threading.RLock()
+        self._dataset = None
+        self._dataset_version = None
+
+    @staticmethod
+    def available():
+        return ds is not None
+
+    def _partitioning(self):
+        return ds.partitioning(pa.schema([('city', pa.string()), ('year', pa.int16())]), flavor='hive')
+
+    def version(self):
+        """Changes after every ingest (manifest mtime); None when the archive does not exist"""
+        path = os.path.join(self.root, MANIFEST)
+        return os.path.getmtime(path) if os.path.exists(path) else None
+
+    def dataset(self):
+        """Discovered dataset, re-scanned only when the archive changed"""
+        if not self.available():
+            return None
+        version = self.version()
+        if version is None:
+            return None
+        with self.lock:
+            if self._dataset is None or self._dataset_version != version:
+                self._dataset = ds.dataset(self.root, format='parquet', partitioning=self._partitioning())
+                self._dataset_version = version
+            return self._dataset
+
+    def query(self, city_name=None, layers=None, start_year=None, end_year=None, zone=CITY_WIDE, columns=None):
+        """Arrow table of the matching observations, or None without an archive"""
+        dataset = self.dataset()
+        if dataset is None:
+            return None
+        predicates = []
+        if city_name is not None:
+            predicates.append(ds.field('city') == city_name)
+        if start_year is not None:
+            predicates.append(ds.field('year') >= start_year)
+        if end_year is not None:
+            predicates.append(ds.field('year') <= end_year)
+        if layers is not None:
+            predicates.append(ds.field('layer').isin(list(layers)))
+        if zone is not None:
+            predicates.append(ds.field('zone') == zone)
+        predicate = functools.reduce(operator.and_, predicates) if predicates else None
+        return dataset.to_table(filter=predicate, columns=columns)
+
+    def annual(self, city_name, layers, start_year, end_year, zone=CITY_WIDE):
+        """(year x layer) DataFrame of annual means; empty when nothing is archived"""
+        table = self.query(city_name, layers, start_year, end_year, zone, columns=['layer', 'year', 'value'])
+        if table is None or table.num_rows == 0:
+            return pd.DataFrame()
+        means = table.group_by(['layer', 'year']).aggregate([('value', 'mean')]).to_pandas()
+        means['layer'] = means['layer'].astype(str)
+        return means.pivot(index='year', columns='layer', values='value_mean').sort_index()
+
+    def write(self, frame):
+        """Upsert observations (city, layer, zone, date, value columns)
+
+        Each touched (city, year) partition is rewritten as a whole: existing rows are merged
+        with the new ones, which win on (city, layer, zone, date).
+        """
+        frame = frame.copy()
+        frame['date'] = pd.to_datetime(frame['date']).dt.date
+        frame['year'] = pd.to_datetime(frame['date']).dt.year.astype(np.int16)
+        if 'zone' not in frame:
+            frame['zone'] = CITY_WIDE
+        frame['zone'] = frame['zone'].fillna(CITY_WIDE)
+
+        with self.lock:
+            existing = self._existing(frame)
+            if existing is not None and len(existing):
+                frame = pd.concat([existing, frame], ignore_index=True)
+                frame = frame.drop_duplicates(['city', 'layer', 'zone', 'date'], keep='last')
+            frame = frame.sort_values(['city', 'year', 'layer', 'zone', 'date'], ignore_index=True)
+
+            table = pa.table({
+                'city': pa.array(frame['city'].astype(str), pa.string()),
+                'year': pa.array(frame['year'], pa.int16()),
+                'layer': pa.array(frame['layer'].astype(str)).dictionary_encode(),
+                'zone': pa.array(frame['zone'].astype(str)).dictionary_encode(),
+                'date': pa.array(frame['date'], pa.date32()),
+                'value': pa.array(frame['value'].astype(np.float32), pa.float32())
+            })
+            os.makedirs(self.root, exist_ok=True)
+            ds.write_dataset(
+                table, self.root, format='parquet', partitioning=self._partitioning(),
+                file_options=_file_options(), basename_template='part-{i}.parquet',
+                max_rows_per_group=ROW_GROUP_ROWS, existing_data_behavior='delete_matching'
+            )
+            self._write_manifest()
+            self._dataset = None
+        return len(frame)
+
+    def _existing(self, frame):
+        dataset = self.dataset()
+        if dataset is None:
+            return None
+        keys = frame[['city', 'year']].drop_duplicates()
+        predicate = functools.reduce(operator.or_, [
+            (ds.field('city') == city) & (ds.field('year') == int(year))
+            for city, year in keys.itertuples(index=False)
+        ])
+        existing = dataset.to_table(filter=predicate).to_pandas()
+        for column in ('layer', 'zone'):
+            existing[column] = existing[column].astype(str)
+        return existing
+
+    def _write_manifest(self):
+        files = [os.path.join(folder, name) for folder, _, names in os.walk(self.root)
+                 for name in names if name.endswith('.parquet')]
+        dataset = ds.dataset(self.root, format='parquet', partitioning=self._partitioning())
+        manifest = {
+            'rows': dataset.count_rows(),
+            'files': len(files),
+            'bytes': sum(os.path.getsize(path) for path in files)
+        }
+        tmp_path = os.path.join(self.root, MANIFEST + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            json.dump(manifest, handle)
+        os.replace(tmp_path, os.path.join(self.root, MANIFEST))
+
+    def stats(self):
+        path = os.path.join(self.root, MANIFEST)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as handle:
+            return json.load(handle)
+
+
+def catalogue_frame(fetcher, cities, time_range="2000-2024 (Long-term)"):
+    """Observations from the fetcher's built-in catalogue (one mid-year value per layer and year)"""
+    rows = []
+    for city in cities:
+        growth = fetcher.get_urban_growth_data(city, time_range)
+        temperature = fetcher.get_temperature_data(city, time_range)
+        air = fetcher.get_air_quality_data(city, time_range)
+        water = fetcher.get_water_stress_data(city, time_range)
+        years = np.asarray(growth.years)
+        series = {
+            'population': growth.population,
+            'built_up_area': growth.built_up_area,
+            'vegetation_loss': growth.vegetation_loss,
+            'temperature': temperature.temperatures,
+            # Groundwater depth change (m) accumulated at the catalogue decline rate
+            'groundwater_level': -water.groundwater_decline * (years - years[0])
+        }
+        for layer, values in series.items():
+            rows.extend((city, layer, f"{year}-07-01", float(value)) for year, value in zip(years, values))
+        last = f"{years[-1]}-07-01"
+        rows.extend([(city, 'aqi', last, float(air.aqi)), (city, 'pm25', last, float(air.pm25)),
+                     (city, 'water_stress', last, float(water.stress_level))])
+    return pd.DataFrame(rows, columns=['city', 'layer', 'date', 'value'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the partitioned observation archive")
+    parser.add_argument('--root', default=DEFAULT_ARCHIVE, help="Archive directory")
+    parser.add_argument('--seed', action='store_true', help="Write the built-in catalogue for every city")
+    parser.add_argument('--ingest', nargs='*', default=[], help="CSV files with city, layer, date, value[, zone] columns")
+    parser.add_argument('--query', help="City to query")
+    parser.add_argument('--layers', nargs='*', help="Layers to query")
+    parser.add_argument('--years', nargs=2, type=int, metavar=('START', 'END'), help="Year range to query")
+    args = parser.parse_args()
+
+    if not ObservationArchive.available():
+        parser.error("pyarrow is required for the archive")
+    archive = ObservationArchive(args.root)
+
+    if args.seed:
+        # Imported here: analytics reads the archive, so it cannot be imported at module level
+        from analytics import CITIES, NASADataFetcher
+        fetcher = NASADataFetcher()
+        fetcher.archive = None  # Catalogue values, not a read-back of the archive
+        print(f"Seeded {archive.write(catalogue_frame(fetcher, CITIES))} observations")
+    for path in args.ingest:
+        print(f"{path}: {archive.write(pd.read_csv(path))} observations in touched partitions")
+    if args.query:
+        start, end = args.years or (None, None)
+        table = archive.query(args.query, args.layers, start, end, zone=None)
+        print(table.to_pandas() if table is not None else "No archive")
+    print(json.dumps(archive.stats()))
+
+
+if __name__ == "__main__":
+    main()
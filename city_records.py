@@ -0,0 +1,352 @@
+import sys
+from collections.abc import Mapping
+from dataclasses import dataclass, fields
+
+import numpy as np
+
+
+def _frozen_array(values, dtype):
+    """Compact read-only NumPy copy of a series (the caller's array stays writeable)"""
+    array = np.array(values, dtype=dtype)
+    array.flags.writeable = False
+    return array
+
+
+def _field_equal(a, b):
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return np.array_equal(a, b, equal_nan=True)
+    if isinstance(a, float) and isinstance(b, float) and a != a and b != b:
+        # NaN marks the same missing measurement on both sides
+        return True
+    return a == b
+
+
+class RecordMapping(Mapping):
+    """Read-only dict-style access (record['years']) on top of slotted record fields"""
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __eq__(self, other):
+        # Mapping.__eq__ compares dict(self) == dict(other), which is ambiguous for array fields
+        if type(self) is not type(other):
+            return NotImplemented
+        return all(_field_equal(getattr(self, name), getattr(other, name)) for name in self.__slots__)
+
+    # Records hold mutable-typed (if read-only) arrays
+    __hash__ = None
+
+    def to_dict(self):
+        """Plain Python (JSON-friendly) copy of the record"""
+        result = {}
+        for field in fields(self):
+            value = getattr(self, field.name)
+            if isinstance(value, RecordMapping):
+                value = value.to_dict()
+            elif isinstance(value, np.ndarray):
+                value = value.tolist()
+            elif isinstance(value, np.generic):
+                value = value.item()
+            if isinstance(value, float) and value != value:
+                # NaN marks a missing measurement; null keeps the JSON strict
+                value = None
+            result[field.name] = value
+        return result
+
+
+@dataclass(frozen=True, eq=False)
+class GrowthSeries(RecordMapping):
+    """Landsat/SEDAC urban growth series for one city and period
+
+    activity_growth is the VIIRS nighttime-radiance growth (%/yr), NaN when no stack
+    has been processed for the city.
+    """
+    __slots__ = ('years', 'population', 'built_up_area', 'growth_rate', 'vegetation_loss', 'time_range',
+                 'activity_growth')
+    years: np.ndarray
+    population: np.ndarray
+    built_up_area: np.ndarray
+    growth_rate: float
+    vegetation_loss: np.ndarray
+    time_range: str
+    activity_growth: float
+
+    @classmethod
+    def build(cls, years, population, built_up_area, growth_rate, vegetation_loss, time_range,
+              activity_growth=float('nan')):
+        return cls(
+            _frozen_array(years, np.int16),
+            _frozen_array(population, np.float32),
+            _frozen_array(built_up_area, np.float32),
+            float(growth_rate),
+            _frozen_array(vegetation_loss, np.float32),
+            time_range,
+            float(activity_growth)
+        )
+
+
+@dataclass(frozen=True, eq=False)
+class TemperatureSeries(RecordMapping):
+    """MODIS surface temperature series for one city and period
+
+    surface_uhi is the mean urban-core minus rural-ring LST (°C) from processed grids,
+    NaN when the series is modelled.
+    """
+    __slots__ = ('years', 'temperatures', 'trend', 'heat_island_intensity', 'time_range', 'surface_uhi')
+    years: np.ndarray
+    temperatures: np.ndarray
+    trend: str
+    heat_island_intensity: float
+    time_range: str
+    surface_uhi: float
+
+    @classmethod
+    def build(cls, years, temperatures, trend, heat_island_intensity, time_range, surface_uhi=float('nan')):
+        return cls(
+            _frozen_array(years, np.int16),
+            _frozen_array(temperatures, np.float32),
+            trend,
+            float(heat_island_intensity),
+            time_range,
+            float(surface_uhi)
+        )
+
+
+@dataclass(frozen=True, eq=False)
+class AirQuality(RecordMapping):
+    __slots__ = ('aqi', 'pm25', 'trend')
+    aqi: int
+    pm25: int
+    trend: str
+
+
+@dataclass(frozen=True, eq=False)
+class WaterStress(RecordMapping):
+    __slots__ = ('stress_level', 'groundwater_decline', 'trend')
+    stress_level: int
+    groundwater_decline: float
+    trend: str
+
+
+@dataclass(frozen=True, eq=False)
+class CityMetrics(RecordMapping):
+    """Everything the dashboard shows for one city, focus area and period"""
+    __slots__ = (
+        'primary_metric', 'metric_label', 'risk_level', 'growth_data', 'temperature_data',
+        'air_quality_data', 'water_data', 'population', 'growth_rate', 'time_range'
+    )
+    primary_metric: float
+    metric_label: str
+    risk_level: str
+    growth_data: GrowthSeries
+    temperature_data: TemperatureSeries
+    air_quality_data: AirQuality
+    water_data: WaterStress
+    population: float
+    growth_rate: float
+    time_range: str
+
+
+class _Categories:
+    """Dictionary-encoded string column (int16 codes + one list of labels)"""
+    __slots__ = ('labels', 'index', 'codes')
+
+    def __init__(self):
+        self.labels = []
+        self.index = {}
+        self.codes = []
+
+    def add(self, label):
+        code = self.index.get(label)
+        if code is None:
+            code = self.index[label] = len(self.labels)
+            self.labels.append(label)
+        self.codes.append(code)
+
+
+class CityMetricsTable:
+    """Struct-of-arrays container holding CityMetrics for many city/focus/period rows
+
+    Scalars are stored as one typed column each, strings are dictionary encoded and
+    the variable-length series are concatenated into flat arrays addressed by offsets.
+    """
+
+    STRING_COLUMNS = ('city', 'focus_area', 'time_range', 'metric_label', 'risk_level',
+                      'temperature_trend', 'air_trend', 'water_trend')
+    SCALAR_COLUMNS = {
+        'primary_metric': np.float32, 'population': np.float32, 'growth_rate': np.float32,
+        'activity_growth': np.float32, 'heat_island_intensity': np.float32, 'surface_uhi': np.float32,
+        'aqi': np.int16, 'pm25': np.int16, 'stress_level': np.int16, 'groundwater_decline': np.float32
+    }
+    SERIES_COLUMNS = {
+        'years': np.int16, 'population_series': np.float32, 'built_up_area': np.float32,
+        'vegetation_loss': np.float32, 'temperatures': np.float32
+    }
+
+    def __init__(self, strings, scalars, series, offsets):
+        self.strings = strings
+        self.scalars = scalars
+        self.series = series
+        self.offsets = offsets
+
+    @classmethod
+    def from_records(cls, rows):
+        """Build a table from an iterable of (city, focus_area, CityMetrics) tuples"""
+        strings = {name: _Categories() for name in cls.STRING_COLUMNS}
+        scalars = {name: [] for name in cls.SCALAR_COLUMNS}
+        series = {name: [] for name in cls.SERIES_COLUMNS}
+        lengths = []
+
+        for city, focus_area, metrics in rows:
+            growth = metrics.growth_data
+            temp = metrics.temperature_data
+            for name, value in (
+                ('city', city), ('focus_area', focus_area), ('time_range', metrics.time_range),
+                ('metric_label', metrics.metric_label), ('risk_level', metrics.risk_level),
+                ('temperature_trend', temp.trend), ('air_trend', metrics.air_quality_data.trend),
+                ('water_trend', metrics.water_data.trend)
+            ):
+                strings[name].add(value)
+
+            scalars['primary_metric'].append(metrics.primary_metric)
+            scalars['population'].append(metrics.population)
+            scalars['growth_rate'].append(metrics.growth_rate)
+            scalars['activity_growth'].append(growth.activity_growth)
+            scalars['heat_island_intensity'].append(temp.heat_island_intensity)
+            scalars['surface_uhi'].append(temp.surface_uhi)
+            scalars['aqi'].append(metrics.air_quality_data.aqi)
+            scalars['pm25'].append(metrics.air_quality_data.pm25)
+            scalars['stress_level'].append(metrics.water_data.stress_level)
+            scalars['groundwater_decline'].append(metrics.water_data.groundwater_decline)
+
+            series['years'].append(growth.years)
+            series['population_series'].append(growth.population)
+            series['built_up_area'].append(growth.built_up_area)
+            series['vegetation_loss'].append(growth.vegetation_loss)
+            series['temperatures'].append(temp.temperatures)
+            lengths.append(len(growth.years))
+
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int32)
+        np.cumsum(lengths, out=offsets[1:])
+
+        return cls(
+            {name: (cat.labels, np.asarray(cat.codes, dtype=np.int16)) for name, cat in strings.items()},
+            {name: np.asarray(values, dtype=cls.SCALAR_COLUMNS[name]) for name, values in scalars.items()},
+            {
+                name: np.concatenate(chunks).astype(cls.SERIES_COLUMNS[name], copy=False)
+                if chunks else np.empty(0, dtype=cls.SERIES_COLUMNS[name])
+                for name, chunks in series.items()
+            },
+            offsets
+        )
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def label(self, column, i):
+        labels, codes = self.strings[column]
+        return labels[codes[i]]
+
+    def rows_for(self, city=None, focus_area=None, time_range=None):
+        """Indices of rows matching the given labels (vectorized code comparison)"""
+        mask = np.ones(len(self), dtype=bool)
+        for column, value in (('city', city), ('focus_area', focus_area), ('time_range', time_range)):
+            if value is None:
+                continue
+            labels, codes = self.strings[column]
+            if value not in labels:
+                return np.empty(0, dtype=np.intp)
+            mask &= codes == labels.index(value)
+        return np.flatnonzero(mask)
+
+    def row(self, i):
+        """Rebuild the CityMetrics record for row i (series are zero-copy slices)"""
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        years = self.series['years'][start:stop]
+        time_range = self.label('time_range', i)
+        growth_rate = float(self.scalars['growth_rate'][i])
+
+        growth = GrowthSeries(
+            years, self.series['population_series'][start:stop], self.series['built_up_area'][start:stop],
+            growth_rate, self.series['vegetation_loss'][start:stop], time_range,
+            float(self.scalars['activity_growth'][i])
+        )
+        temp = TemperatureSeries(
+            years, self.series['temperatures'][start:stop], self.label('temperature_trend', i),
+            float(self.scalars['heat_island_intensity'][i]), time_range, float(self.scalars['surface_uhi'][i])
+        )
+        return CityMetrics(
+            primary_metric=float(self.scalars['primary_metric'][i]),
+            metric_label=self.label('metric_label', i),
+            risk_level=self.label('risk_level', i),
+            growth_data=growth,
+            temperature_data=temp,
+            air_quality_data=AirQuality(int(self.scalars['aqi'][i]), int(self.scalars['pm25'][i]), self.label('air_trend', i)),
+            water_data=WaterStress(int(self.scalars['stress_level'][i]), float(self.scalars['groundwater_decline'][i]), self.label('water_trend', i)),
+            population=float(self.scalars['population'][i]),
+            growth_rate=growth_rate,
+            time_range=time_range
+        )
+
+    def __getitem__(self, i):
+        return self.row(i)
+
+    @property
+    def nbytes(self):
+        total = self.offsets.nbytes
+        for labels, codes in self.strings.values():
+            total += codes.nbytes + sum(sys.getsizeof(label) for label in labels)
+        total += sum(array.nbytes for array in self.scalars.values())
+        total += sum(array.nbytes for array in self.series.values())
+        return total
+
+
+def deep_sizeof(obj, seen=None):
+    """Approximate retained size of nested dicts/lists/records/arrays in bytes"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        # Views share their base buffer, count it once
+        size = sys.getsizeof(obj) if obj.base is None else sys.getsizeof(obj) + deep_sizeof(obj.base, seen)
+        return size
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif isinstance(obj, RecordMapping):
+        size += sum(deep_sizeof(getattr(obj, name), seen) for name in obj.__slots__)
+    return size
+
+
+def memory_report(rows):
+    """Compare nested dict-of-lists, per-row records and the struct-of-arrays table"""
+    rows = list(rows)
+    as_dicts = [metrics.to_dict() for _, _, metrics in rows]
+    as_records = [metrics for _, _, metrics in rows]
+    table = CityMetricsTable.from_records(rows)
+
+    dict_bytes = deep_sizeof(as_dicts)
+    record_bytes = deep_sizeof(as_records)
+    table_bytes = table.nbytes
+    return {
+        'rows': len(rows),
+        'dict_of_lists_bytes': dict_bytes,
+        'records_bytes': record_bytes,
+        'table_bytes': table_bytes,
+        'records_reduction': round(dict_bytes / max(record_bytes, 1), 1),
+        'table_reduction': round(dict_bytes / max(table_bytes, 1), 1)
+    }
@@ -0,0 +1,312 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from analytics import (
+    ZONE_NAMES, load_surface_heat_island, load_viirs_activity, load_water_storage, nasa_analyzer,
+    surface_heat_island_path, viirs_activity_path, water_storage_path
+)
+from archive import CITY_WIDE
+
+# Layers correlated per city and zone
+CORRELATION_LAYERS = ('lst', 'ndvi', 'nightlights', 'aqi', 'groundwater')
+# Archive layer -> correlation layer
+ARCHIVE_LAYERS = {
+    'lst': 'lst', 'temperature': 'lst', 'ndvi': 'ndvi', 'nightlights': 'nightlights',
+    'aqi': 'aqi', 'groundwater_level': 'groundwater'
+}
+# Observation sources, each versioned and re-read on its own
+SOURCES = ('lst', 'viirs', 'grace', 'archive')
+# Pseudo-zone merging every named zone's accumulator
+POOLED_ZONES = 'All zones'
+
+
+class RunningCorrelation:
+    """Streaming pairwise covariance / correlation of k layers (Welford, merged with Chan et al.)
+
+    Missing layers are NaN; every statistic is kept per layer pair over the observations where
+    both layers are present, so each update costs O(m * k^2) for m new observations and never
+    touches earlier ones. `mean[i, j]` is the mean of layer i over the pair (i, j).
+    """
+
+    def __init__(self, k):
+        self.count = np.zeros((k, k))
+        self.mean = np.zeros((k, k))
+        self.comoment = np.zeros((k, k))
+        self.m2 = np.zeros((k, k))
+
+    @classmethod
+    def from_observations(cls, observations):
+        """Statistics of one batch: (m, k) observations with NaN gaps"""
+        X = np.atleast_2d(np.asarray(observations, dtype=np.float64))
+        valid = ~np.isnan(X)
+        # Shift by the column means first so the one-pass sums stay well conditioned
+        counts = valid.sum(axis=0)
+        shift = np.divide(np.where(valid, X, 0.0).sum(axis=0), counts, out=np.zeros(X.shape[1]), where=counts > 0)
+        centred = np.where(valid, X - shift, 0.0)
+        V = valid.astype(np.float64)
+
+        batch = cls(X.shape[1])
+        batch.count = V.T @ V
+        n = np.maximum(batch.count, 1)
+        mean = (centred.T @ V) / n
+        batch.mean = np.where(batch.count > 0, mean + shift[:, None], 0.0)
+        batch.comoment = np.where(batch.count > 0, centred.T @ centred - batch.count * mean * mean.T, 0.0)
+        batch.m2 = np.where(batch.count > 0, (centred * centred).T @ V - batch.count * mean * mean, 0.0)
+        return batch
+
+    def merge(self, other):
+        """Fold another accumulator in (parallel / pooled update)"""
+        total = self.count + other.count
+        safe = np.maximum(total, 1)
+        delta = other.mean - self.mean
+        weight = self.count * other.count / safe
+        self.comoment = self.comoment + other.comoment + delta * delta.T * weight
+        self.m2 = self.m2 + other.m2 + delta * delta * weight
+        self.mean = self.mean + delta * other.count / safe
+        self.count = total
+        return self
+
+    def update(self, observations):
+        return self.merge(RunningCorrelation.from_observations(observations))
+
+    def copy(self):
+        clone = RunningCorrelation(len(self.count))
+        clone.count, clone.mean = self.count.copy(), self.mean.copy()
+        clone.comoment, clone.m2 = self.comoment.copy(), self.m2.copy()
+        return clone
+
+    def covariance(self, ddof=1):
+        return np.divide(self.comoment, self.count - ddof, out=np.full_like(self.count, np.nan),
+                         where=self.count > ddof)
+
+    def correlation(self):
+        """Pairwise Pearson correlation; NaN where a pair has fewer than two observations or no spread"""
+        denominator = np.sqrt(self.m2 * self.m2.T)
+        return np.divide(self.comoment, denominator, out=np.full_like(self.count, np.nan),
+                         where=(self.count > 1) & (denominator > 0))
+
+
+def _mtime(path):
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+
+def source_versions(city_name):
+    """Current version of every observation source (None where nothing is published)
+
+    Summaries are versioned by their file mtime and the archive by its write generation;
+    the engine re-reads a source only when its version moves.
+    """
+    archive = nasa_analyzer.nasa_fetcher.archive
+    return {
+        'lst': _mtime(surface_heat_island_path(city_name)),
+        'viirs': _mtime(viirs_activity_path(city_name)),
+        'grace': _mtime(water_storage_path(city_name)),
+        'archive': archive.version() if archive is not None else None
+    }
+
+
+def source_observations(city_name, source, layers=CORRELATION_LAYERS, start_year=None):
+    """Annual per-zone values of one source as (zone, year, layer, value) rows
+
+    City-wide values use the archive's CITY_WIDE zone; several values of a layer in one
+    year (e.g. monthly archive observations) are averaged.
+    """
+    rows = []
+
+    def add(zone, years, layer, values):
+        rows.extend((zone, int(year), layer, value) for year, value in zip(years, values) if value is not None)
+
+    frame = None
+    if source == 'lst':
+        heat = load_surface_heat_island(city_name)
+        if heat:
+            for zone, values in heat['zones'].items():
+                add(zone, heat['years'], 'lst', values)
+    elif source == 'viirs':
+        activity = load_viirs_activity(city_name)
+        if activity:
+            for zone, entry in activity['zones'].items():
+                add(zone, activity['years'], 'nightlights', entry['mean_radiance'])
+            add(CITY_WIDE, activity['years'], 'nightlights', activity['city']['mean_radiance'])
+    elif source == 'grace':
+        storage = load_water_storage(city_name)
+        if storage:
+            years = np.asarray(storage['months'], dtype='datetime64[Y]').astype(np.int64) + 1970
+            for region, entry in storage['regions'].items():
+                add(CITY_WIDE if region == 'city' else region, years, 'groundwater', entry['trend'])
+    elif source == 'archive':
+        archive = nasa_analyzer.nasa_fetcher.archive
+        table = archive.query(
+            city_name, list(ARCHIVE_LAYERS), start_year, zone=None, columns=['zone', 'layer', 'year', 'value']
+        ) if archive is not None else None
+        if table is not None and table.num_rows:
+            frame = table.to_pandas()
+            frame['layer'] = frame['layer'].astype(str).map(ARCHIVE_LAYERS)
+            frame['zone'] = frame['zone'].astype(str)
+            frame = frame[['zone', 'year', 'layer', 'value']]
+    else:
+        raise ValueError(f"Unknown observation source: {source}")
+
+    if frame is None:
+        frame = pd.DataFrame(rows, columns=['zone', 'year', 'layer', 'value'])
+    frame = frame[frame['layer'].isin(layers)]
+    if start_year is not None:
+        frame = frame[frame['year'] >= start_year]
+    return frame.groupby(['zone', 'year', 'layer'], as_index=False)['value'].mean()
+
+
+def layer_observations(city_name, layers=CORRELATION_LAYERS, start_year=None, sources=SOURCES):
+    """Every source's observations combined; layers published by several sources are averaged"""
+    frames = [source_observations(city_name, source, layers, start_year) for source in sources]
+    frame = pd.concat(frames, ignore_index=True)
+    return frame.groupby(['zone', 'year', 'layer'], as_index=False)['value'].mean()
+
+
+def _mean_rows(rows):
+    """NaN-aware mean of several (layers,) rows; NaN where no row has the layer"""
+    stacked = np.array(rows)
+    valid = ~np.isnan(stacked)
+    sums = np.where(valid, stacked, 0.0).sum(axis=0)
+    counts = valid.sum(axis=0)
+    return np.divide(sums, counts, out=np.full(stacked.shape[1], np.nan), where=counts > 0)
+
+
+class CorrelationEngine:
+    """Running correlation matrices per (city, zone), fed incrementally
+
+    Rows are kept per source and (zone, year); a zone/year's observation is the mean of its
+    sources. New rows are folded in O(layers^2). When a source revises or adds layers to
+    rows already folded (e.g. an LST run after the archive was read), only the affected
+    zones are rebuilt from their remembered rows, so the matrices always match a batch
+    computation. update_city re-reads a source only when its version has moved, so
+    unchanged cities cost no I/O at all.
+    """
+
+    def __init__(self, layers=CORRELATION_LAYERS):
+        self.layers = list(layers)
+        self.lock = threading.Lock()
+        self.accumulators = {}
+        # city -> source -> {(zone, year): (layers,) values, NaN where the source has no value}
+        self.rows = {}
+        # city -> {(zone, year): mean of the sources' rows}, the observations folded so far
+        self.combined = {}
+        # city -> source -> version last ingested (the per-source watermark)
+        self.versions = {}
+
+    def observe(self, city_name, zone, observations):
+        """Fold (m, layers) observations into a city/zone's matrices"""
+        with self.lock:
+            accumulator = self.accumulators.setdefault((city_name, zone), RunningCorrelation(len(self.layers)))
+            accumulator.update(observations)
+
+    def ingest(self, city_name, frame, source='observations', replace=False):
+        """Fold one source's (zone, year, layer, value) rows; returns the number of new or changed rows
+
+        replace=True means the frame is the source's complete current output: rows it no
+        longer contains are dropped. Otherwise its values are merged into the source's rows.
+        """
+        incoming = {}
+        if not frame.empty:
+            wide = frame.pivot_table(index=['zone', 'year'], columns='layer', values='value', aggfunc='mean')
+            wide = wide.reindex(columns=self.layers)
+            incoming = dict(zip(wide.index, wide.to_numpy(dtype=np.float64)))
+        fresh = {}
+        rebuild = set()
+        with self.lock:
+            sources = self.rows.setdefault(city_name, {})
+            combined = self.combined.setdefault(city_name, {})
+            previous_rows = sources.get(source, {})
+            if replace:
+                rows = incoming
+            else:
+                rows = dict(previous_rows)
+                for key, values in incoming.items():
+                    earlier = rows.get(key)
+                    rows[key] = values if earlier is None else np.where(np.isnan(values), earlier, values)
+            sources[source] = rows
+
+            for key in set(previous_rows) | set(incoming):
+                present = [source_rows[key] for source_rows in sources.values() if key in source_rows]
+                values = _mean_rows(present) if present else None
+                if values is not None and np.isnan(values).all():
+                    values = None
+                folded = combined.get(key)
+                if folded is None and values is None:
+                    continue
+                if folded is None:
+                    combined[key] = values
+                    fresh.setdefault(key[0], []).append(values)
+                elif values is None:
+                    del combined[key]
+                    rebuild.add(key[0])
+                elif not np.array_equal(values, folded, equal_nan=True):
+                    combined[key] = values
+                    rebuild.add(key[0])
+
+            for zone in rebuild:
+                history = [values for (name, _), values in combined.items() if name == zone]
+                self.accumulators[(city_name, zone)] = (
+                    RunningCorrelation.from_observations(np.array(history)) if history
+                    else RunningCorrelation(len(self.layers))
+                )
+                fresh.pop(zone, None)
+            for zone, observations in fresh.items():
+                accumulator = self.accumulators.setdefault((city_name, zone), RunningCorrelation(len(self.layers)))
+                accumulator.update(np.array(observations))
+        return sum(len(observations) for observations in fresh.values()) + len(rebuild)
+
+    def update_city(self, city_name):
+        """Re-read the sources published since the last update and fold in what changed"""
+        versions = source_versions(city_name)
+        with self.lock:
+            seen = self.versions.setdefault(city_name, {})
+            changed = [source for source, version in versions.items() if seen.get(source, 'unread') != version]
+        updated = 0
+        for source in changed:
+            frame = source_observations(city_name, source, self.layers)
+            updated += self.ingest(city_name, frame, source, replace=True)
+            with self.lock:
+                self.versions[city_name][source] = versions[source]
+        return updated
+
+    def accumulator(self, city_name, zone=CITY_WIDE):
+        """Copy of a zone's accumulator; POOLED_ZONES merges every named zone"""
+        with self.lock:
+            if zone == POOLED_ZONES:
+                pooled = RunningCorrelation(len(self.layers))
+                for (city, name), accumulator in self.accumulators.items():
+                    if city == city_name and name in ZONE_NAMES:
+                        pooled.merge(accumulator)
+                return pooled
+            accumulator = self.accumulators.get((city_name, zone))
+            return accumulator.copy() if accumulator is not None else RunningCorrelation(len(self.layers))
+
+    def zones(self, city_name):
+        with self.lock:
+            return sorted(name for city, name in self.accumulators if city == city_name)
+
+    def matrix(self, city_name, zone=CITY_WIDE):
+        """Correlation matrix as a layers x layers DataFrame"""
+        return pd.DataFrame(self.accumulator(city_name, zone).correlation(), index=self.layers, columns=self.layers)
+
+    def summary(self, city_name, zone=CITY_WIDE):
+        """JSON-ready correlation, covariance and pair counts (None where undefined)"""
+        accumulator = self.accumulator(city_name, zone)
+
+        def clean(matrix):
+            return [[None if np.isnan(value) else round(float(value), 4) for value in row] for row in matrix]
+        return {
+            'city': city_name,
+            'zone': zone,
+            'layers': self.layers,
+            'count': accumulator.count.astype(int).tolist(),
+            'correlation': clean(accumulator.correlation()),
+            'covariance': clean(accumulator.covariance())
+        }
+
+
+# Process-wide engine shared by the dashboard and the API
+correlation_engine = CorrelationEngine()
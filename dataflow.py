@@ -0,0 +1,142 @@
+import time
+
+from session_memory import artifact_nbytes
+
+
+class Dataflow:
+    """Incremental evaluation of dashboard artifacts backed by a session-scoped memo"""
+
+    def __init__(self, memo, shared_store=None):
+        # memo is a plain dict (normally living in st.session_state) so results survive reruns
+        self.memo = memo
+        self.shared_store = shared_store
+        self.inputs = {}
+        self.nodes = {}
+        self.recomputed = []
+        self.evicted = []
+
+    @staticmethod
+    def _freeze(value):
+        """Turn widget values (lists, dicts) into hashable memo keys"""
+        if isinstance(value, (list, tuple)):
+            return tuple(Dataflow._freeze(v) for v in value)
+        if isinstance(value, dict):
+            return tuple(sorted((k, Dataflow._freeze(v)) for k, v in value.items()))
+        if isinstance(value, set):
+            return tuple(sorted(value))
+        return value
+
+    def set_inputs(self, **inputs):
+        """Record the current widget values for this rerun"""
+        for name, value in inputs.items():
+            self.inputs[name] = self._freeze(value)
+
+    def artifact(self, name, deps, shared=False):
+        """Register a computed artifact together with the inputs/artifacts it depends on
+
+        Shared artifacts are pure functions of widget values; they are kept once per
+        process in the shared store and the session memo only holds a reference.
+        """
+        def register(func):
+            self.nodes[name] = (tuple(deps), func, shared)
+            return func
+        return register
+
+    def _dependency_token(self, dep):
+        """(session key, content key) for one dependency"""
+        if dep in self.nodes:
+            # Upstream artifacts are identified by their version counter within the session
+            # and by the widget values they were derived from across sessions
+            self.get(dep)
+            entry = self.memo[dep]
+            return ('artifact', dep, entry['version']), entry['content_key']
+        if dep not in self.inputs:
+            raise KeyError(f"Unknown dataflow input or artifact: {dep}")
+        return ('input', dep, self.inputs[dep]), self.inputs[dep]
+
+    def get(self, name):
+        """Return an artifact, recomputing it only if one of its dependencies changed"""
+        deps, func, shared = self.nodes[name]
+        tokens = [self._dependency_token(dep) for dep in deps]
+        key = tuple(token for token, _ in tokens)
+        content_key = tuple((dep, content) for dep, (_, content) in zip(deps, tokens))
+
+        entry = self.memo.get(name)
+        if entry is not None and entry['key'] == key:
+            entry['last_used'] = time.monotonic()
+            return entry['value']
+
+        kwargs = {dep: self.memo[dep]['value'] if dep in self.nodes else self.inputs[dep] for dep in deps}
+        if shared and self.shared_store is not None:
+            value = self.shared_store.get_or_compute((name, content_key), lambda: func(**kwargs))
+            nbytes = 0
+        else:
+            value = func(**kwargs)
+            nbytes = artifact_nbytes(value)
+
+        version = entry['version'] + 1 if entry is not None else 0
+        self.memo[name] = {
+            'key': key, 'content_key': content_key, 'value': value, 'version': version,
+            'shared': shared and self.shared_store is not None, 'nbytes': nbytes,
+            'last_used': time.monotonic()
+        }
+        self.recomputed.append(name)
+        return value
+
+    def invalidate(self, name=None):
+        """Drop one memoized artifact (or all of them) so it is recomputed on next access"""
+        names = list(self.memo) if name is None else [name]
+        for artifact in names:
+            entry = self.memo.get(artifact)
+            if entry is not None:
+                # Keep the version counter so downstream artifacts notice the recompute
+                entry.update(key=None, value=None, nbytes=0)
+
+    def retained_nbytes(self, name):
+        """Bytes this session alone keeps alive for an artifact
+
+        A shared value costs the session nothing while the store holds it; once the store
+        evicts it, the session memo is what keeps it alive and is charged for it.
+        """
+        entry = self.memo[name]
+        if entry['value'] is None:
+            return 0
+        if entry['shared']:
+            if self.shared_store.holds((name, entry['content_key']), entry['value']):
+                return 0
+            if entry['nbytes'] == 0:
+                entry['nbytes'] = artifact_nbytes(entry['value'])
+        return entry['nbytes']
+
+    def memory_report(self):
+        """Bytes retained per artifact: session-private bytes and shared-store bytes"""
+        report = []
+        for name, entry in self.memo.items():
+            if entry['value'] is None:
+                continue
+            shared_bytes = 0
+            if entry['shared'] and self.shared_store is not None:
+                shared_bytes = self.shared_store.nbytes((name, entry['content_key']))
+            report.append({'artifact': name, 'session_bytes': self.retained_nbytes(name),
+                           'shared_bytes': shared_bytes, 'shared': entry['shared']})
+        return sorted(report, key=lambda row: row['session_bytes'] + row['shared_bytes'], reverse=True)
+
+    def session_nbytes(self):
+        return sum(self.retained_nbytes(name) for name in self.memo)
+
+    def enforce_cap(self, max_bytes):
+        """Evict least-recently-used artifacts the session alone retains until under max_bytes"""
+        sizes = {name: self.retained_nbytes(name) for name in self.memo}
+        total = sum(sizes.values())
+        if total <= max_bytes:
+            return total
+        candidates = sorted(
+            (entry['last_used'], name) for name, entry in self.memo.items() if sizes[name] > 0
+        )
+        for _, name in candidates:
+            if total <= max_bytes:
+                break
+            total -= sizes[name]
+            self.invalidate(name)
+            self.evicted.append(name)
+        return total
@@ -0,0 +1,95 @@
+import os
+
+import numpy as np
+
+from analytics import metrics_cache
+
+# Plot width assumed when the caller does not know it (Streamlit does not report it)
+DEFAULT_CHART_WIDTH = int(os.environ.get('URBANPULSE_CHART_WIDTH', 800))
+
+
+def _finite(x, y):
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    keep = np.isfinite(x) & np.isfinite(y)
+    return x[keep], y[keep]
+
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: `threshold` points that keep the visual shape of the line
+
+    Bucket edges and per-bucket averages are computed up front; the sequential part is one
+    vectorized triangle-area argmax per bucket.
+    """
+    x, y = _finite(x, y)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+
+    # Interior buckets over points 1..n-2; first and last points are always kept
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    avg_x = np.append(sums_x / counts, x[-1])
+    avg_y = np.append(sums_y / counts, y[-1])
+
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        # Point forming the largest triangle with the previous pick and the next bucket's mean
+        area = np.abs(
+            (x[previous] - avg_x[bucket + 1]) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (avg_y[bucket + 1] - y[previous])
+        )
+        previous = start + int(area.argmax())
+        selected[bucket + 1] = previous
+    return x[selected], y[selected]
+
+
+def minmax(x, y, buckets):
+    """Keep the minimum and maximum of every x bucket (one bucket per pixel column)
+
+    Preserves spikes that LTTB can smooth away; at most 2 * buckets points are returned.
+    """
+    x, y = _finite(x, y)
+    if 2 * buckets >= len(x) or buckets < 1:
+        return x, y
+    span = x[-1] - x[0] or 1.0
+    bucket = np.minimum(((x - x[0]) / span * buckets).astype(np.intp), buckets - 1)
+
+    # Sorted by (bucket, y): the first row of a bucket is its minimum, the last its maximum
+    order = np.lexsort((y, bucket))
+    sorted_bucket = bucket[order]
+    first = np.flatnonzero(np.r_[True, sorted_bucket[1:] != sorted_bucket[:-1]])
+    last = np.r_[first[1:] - 1, len(order) - 1]
+    keep = np.unique(np.concatenate([order[first], order[last]]))
+    return x[keep], y[keep]
+
+
+METHODS = {'lttb': lttb, 'minmax': minmax}
+
+
+def downsample(x, y, width=DEFAULT_CHART_WIDTH, method='lttb', x_range=None):
+    """Points worth drawing on a `width`-pixel chart, optionally zoomed to x_range=(lo, hi)
+
+    Zooming slices the full-resolution series first, so narrower ranges show more detail.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if x_range is not None:
+        lo = np.searchsorted(x, x_range[0], side='left')
+        hi = np.searchsorted(x, x_range[1], side='right')
+        x, y = x[lo:hi], y[lo:hi]
+    return METHODS[method](x, y, int(width))
+
+
+def cached_downsample(key, x, y, width=DEFAULT_CHART_WIDTH, method='lttb', x_range=None):
+    """downsample() shared across sessions per (series key, width, method, range)"""
+    x_range = tuple(x_range) if x_range is not None else None
+    return metrics_cache.get_or_compute(
+        ('downsample', key, int(width), method, x_range),
+        lambda: downsample(x, y, width, method, x_range)
+    )
@@ -0,0 +1,398 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Outbound budget shared by every session in the process
+DEFAULT_RATE = float(os.environ.get('URBANPULSE_FETCH_RATE', 5.0))
+DEFAULT_BURST = 10
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Points rounding to the same 0.01° cell (~1 km) share one air-quality lookup
+AIR_QUALITY_DECIMALS = 2
+BATCH_WINDOW = 0.02
+MAX_BATCH = 50
+
+
+class _Slot:
+    """Result placeholder that concurrent callers wait on"""
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+    def result(self):
+        self.event.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class SingleFlight:
+    """Merge concurrent calls with the same key into one execution"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.merged = 0
+
+    def do(self, key, func):
+        with self.lock:
+            slot = self.calls.get(key)
+            if slot is not None:
+                self.merged += 1
+                leader = False
+            else:
+                slot = self.calls[key] = _Slot()
+                leader = True
+        if not leader:
+            return slot.result()
+
+        try:
+            slot.value = func()
+        except Exception as exc:
+            slot.error = exc
+        finally:
+            with self.lock:
+                del self.calls[key]
+            slot.event.set()
+        return slot.result()
+
+
+class MicroBatcher:
+    """Collect keys from concurrent callers for a short window and resolve them in one call
+
+    Keys already pending or in flight are joined rather than requested again.
+    """
+
+    def __init__(self, resolve_many, window=BATCH_WINDOW, max_batch=MAX_BATCH):
+        self.resolve_many = resolve_many
+        self.window = window
+        self.max_batch = max_batch
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.in_flight = {}
+        self.timer = None
+        self.merged = 0
+        self.batches = 0
+
+    def get_many(self, keys):
+        slots = []
+        flush_now = False
+        with self.lock:
+            for key in keys:
+                slot = self.pending.get(key) or self.in_flight.get(key)
+                if slot is None:
+                    slot = self.pending[key] = _Slot()
+                else:
+                    self.merged += 1
+                slots.append(slot)
+            if len(self.pending) >= self.max_batch:
+                flush_now = True
+            elif self.pending and self.timer is None:
+                self.timer = threading.Timer(self.window, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+        if flush_now:
+            self.flush()
+        return [slot.result() for slot in slots]
+
+    def flush(self):
+        with self.lock:
+            batch, self.pending = self.pending, {}
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            self.in_flight.update(batch)
+        if not batch:
+            return
+
+        try:
+            self.batches += 1
+            results = self.resolve_many(list(batch))
+            for key, slot in batch.items():
+                slot.value = results.get(key)
+        except Exception as exc:
+            for slot in batch.values():
+                slot.error = exc
+        finally:
+            with self.lock:
+                for key in batch:
+                    self.in_flight.pop(key, None)
+            for slot in batch.values():
+                slot.event.set()
+
+
+class TokenBucket:
+    """Blocking token-bucket rate limiter (rate tokens/s, bursts up to capacity)"""
+
+    def __init__(self, rate=DEFAULT_RATE, capacity=DEFAULT_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class ExternalDataClient:
+    """Coalescing, rate-limited, retrying client for the fires and air-quality endpoints
+
+    One instance per process: identical in-flight requests are merged, air-quality
+    points from concurrent callers are batched, every HTTP attempt takes a token from a
+    shared bucket and connections are kept alive in a pooled session.
+    """
+
+    def __init__(self, base_urls, air_quality_key=None, air_quality_batch_url=None, rate=DEFAULT_RATE,
+                 burst=DEFAULT_BURST, max_retries=MAX_RETRIES, pool_size=16, timeout=30):
+        self.base_urls = dict(base_urls)
+        self.air_quality_key = air_quality_key
+        # Optional endpoint (proxy or mock) accepting {"locations": [...]} and returning {"results": [...]}
+        self.air_quality_batch_url = air_quality_batch_url
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.bucket = TokenBucket(rate, burst)
+        self.flights = SingleFlight()
+        self.air_batcher = MicroBatcher(self._resolve_air_quality)
+        self.pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='urbanpulse-fetch')
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.counter_lock = threading.Lock()
+        self.counters = Counter()
+
+    def _count(self, name, amount=1):
+        with self.counter_lock:
+            self.counters[name] += amount
+
+    def request(self, method, url, **kwargs):
+        """HTTP request with token-bucket pacing and exponential backoff on transient failures"""
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            self._count('http_attempts')
+            retry_after = None
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                error = exc
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response
+                error = requests.HTTPError(f"{response.status_code} from {url}", response=response)
+                retry_after = response.headers.get('Retry-After')
+
+            if attempt == self.max_retries:
+                raise error
+            self._count('retries')
+            if retry_after is not None and retry_after.isdigit():
+                delay = float(retry_after)
+            else:
+                # Full jitter so many clients do not retry in lockstep
+                delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+            time.sleep(delay)
+
+    def fires_csv(self, url):
+        """FIRMS area CSV text; concurrent requests for the same URL share one download"""
+        self._count('fires_requests')
+        return self.flights.do(('fires', url), lambda: self.request('GET', url).text)
+
+    def fires_download(self, url, handle, chunk_bytes=1 << 20):
+        """Stream a FIRMS area CSV into a binary file handle chunk by chunk; returns its SHA-256"""
+        self._count('fires_requests')
+        digest = hashlib.sha256()
+        with self.request('GET', url, stream=True) as response:
+            for chunk in response.iter_content(chunk_size=chunk_bytes):
+                digest.update(chunk)
+                handle.write(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _cell(lat, lng):
+        return (round(float(lat), AIR_QUALITY_DECIMALS), round(float(lng), AIR_QUALITY_DECIMALS))
+
+    def air_quality_many(self, points):
+        """Current-conditions response per (lat, lng), resolved in as few upstream calls as possible"""
+        self._count('air_quality_points', len(points))
+        return self.air_batcher.get_many([self._cell(lat, lng) for lat, lng in points])
+
+    def air_quality(self, lat, lng):
+        return self.air_quality_many([(lat, lng)])[0]
+
+    def _resolve_air_quality(self, cells):
+        params = {'key': self.air_quality_key} if self.air_quality_key else {}
+        if self.air_quality_batch_url:
+            results = {}
+            for start in range(0, len(cells), MAX_BATCH):
+                chunk = cells[start:start + MAX_BATCH]
+                body = {'locations': [{'latitude': lat, 'longitude': lng} for lat, lng in chunk]}
+                response = self.request('POST', self.air_quality_batch_url, params=params, json=body)
+                results.update(zip(chunk, response.json()['results']))
+            return results
+
+        # The lookup endpoint takes one location per call; fan the unique cells out over the pool
+        def lookup(cell):
+            body = {'location': {'latitude': cell[0], 'longitude': cell[1]}, 'extraComputations': ['LOCAL_AQI']}
+            return self.request('POST', self.base_urls['air_quality'], params=params, json=body).json()
+        return dict(zip(cells, self.pool.map(lookup, cells)))
+
+    def stats(self):
+        with self.counter_lock:
+            stats = dict(self.counters)
+        stats.update(merged_requests=self.flights.merged + self.air_batcher.merged,
+                     air_quality_batches=self.air_batcher.batches)
+        return stats
+
+
+def local_aqi(response):
+    """Local (e.g. India CPCB) AQI from a current-conditions response, or None"""
+    for index in (response or {}).get('indexes', []):
+        if index.get('code') != 'uaqi' and 'aqi' in index:
+            return index['aqi']
+    return None
+
+
+class MockEndpointServer:
+    """Local stand-in for the fires and air-quality endpoints that counts the requests it receives
+
+    fail_first makes the first N requests answer 503 (with a Retry-After header when
+    retry_after is set) to exercise retry/backoff.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.05, fail_first=0, retry_after=None):
+        self.counts = Counter()
+        self.lock = threading.Lock()
+        self.latency = latency
+        self.fail_remaining = fail_first
+        self.retry_after = retry_after
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status, content, content_type, headers=None):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def _handle(self, method):
+                path = self.path.split('?')[0]
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                with mock.lock:
+                    mock.counts[f"{method} {path.split('/')[1]}"] += 1
+                    fail = mock.fail_remaining > 0
+                    mock.fail_remaining -= fail
+                time.sleep(mock.latency)
+                if fail:
+                    headers = {'Retry-After': str(mock.retry_after)} if mock.retry_after is not None else None
+                    return self._reply(503, b'{}', 'application/json', headers)
+                if path.startswith('/fires/'):
+                    csv = "latitude,longitude,acq_date,frp\n12.97,77.59,2024-01-01,5.0\n"
+                    return self._reply(200, csv.encode('utf-8'), 'text/csv')
+                if path == '/air_quality/batch':
+                    results = [mock.conditions(loc) for loc in body['locations']]
+                    return self._reply(200, json.dumps({'results': results}).encode('utf-8'), 'application/json')
+                if path == '/air_quality':
+                    return self._reply(200, json.dumps(mock.conditions(body['location'])).encode('utf-8'), 'application/json')
+                self._reply(404, b'{}', 'application/json')
+
+            def do_GET(self):
+                self._handle('GET')
+
+            def do_POST(self):
+                self._handle('POST')
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+
+    @staticmethod
+    def conditions(location):
+        aqi = int(100 + (location['latitude'] * 7 + location['longitude'] * 3) % 150)
+        return {'indexes': [{'code': 'uaqi', 'aqi': 60}, {'code': 'ind_cpcb', 'aqi': aqi}]}
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def selftest(sessions=50, fail_first=2, batch=False):
+    """Hit a counting mock with many concurrent sessions and report upstream vs. client requests"""
+    mock = MockEndpointServer(fail_first=fail_first).start()
+    client = ExternalDataClient(
+        {'fires': f"{mock.url}/fires/", 'air_quality': f"{mock.url}/air_quality"},
+        air_quality_batch_url=f"{mock.url}/air_quality/batch" if batch else None,
+        rate=50, burst=20
+    )
+    fires_url = f"{mock.url}/fires/KEY/VIIRS_SNPP_NRT/77.3,12.7,77.8,13.2/1"
+    # Every session asks for the same city: the same FIRMS box and five nearby points
+    points = [(12.9716, 77.5946), (13.0216, 77.6446), (12.9216, 77.5446), (13.0016, 77.5646), (12.9717, 77.5947)]
+
+    def session(_):
+        client.fires_csv(fires_url)
+        return [local_aqi(result) for result in client.air_quality_many(points)]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        answers = list(pool.map(session, range(sessions)))
+    elapsed = time.perf_counter() - started
+    mock.stop()
+    return {
+        'sessions': sessions,
+        'seconds': round(elapsed, 3),
+        'consistent_answers': all(answer == answers[0] for answer in answers),
+        'upstream_requests': dict(mock.counts),
+        'client': client.stats()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exercise request coalescing and batching against a local counting mock")
+    parser.add_argument('--sessions', type=int, default=50)
+    parser.add_argument('--fail-first', type=int, default=2, help="Answer the first N upstream requests with 503")
+    parser.add_argument('--batch', action='store_true', help="Use the multi-location batch endpoint of the mock")
+    args = parser.parse_args()
+    print(json.dumps(selftest(args.sessions, args.fail_first, args.batch), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+import argparse
+import io
+import json
+import os
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from analytics import (
+    CITIES, FOCUS_AREAS, TIME_PERIODS, build_alerts, build_zones_df, get_city_metrics, metrics_summary_row,
+    slugify
+)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional
+    pa = None
+    pq = None
+
+
+def _chart_png(years, series, title, ylabel, color):
+    """Static chart image (matplotlib, no browser needed)"""
+    fig, ax = plt.subplots(figsize=(8, 4), dpi=100)
+    ax.plot(years, series, color=color, linewidth=2.5)
+    ax.set_title(title)
+    ax.set_xlabel("Year")
+    ax.set_ylabel(ylabel)
+    ax.grid(alpha=0.3)
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def build_report(city, period, focus_areas=FOCUS_AREAS, charts=True):
+    """All report artifacts for one city and period (every focus area)
+
+    Work is grouped by city/period so the series and chart images are produced once
+    and the per-focus outputs reuse the cached metrics.
+    """
+    prefix = f"{slugify(city)}/{slugify(period)}"
+    files = {}
+    tables = {'metrics': [], 'zones': [], 'alerts': [], 'series': []}
+
+    for focus_area in focus_areas:
+        metrics = get_city_metrics(city, focus_area, period)
+        focus_prefix = f"{prefix}/{slugify(focus_area)}"
+
+        summary = metrics_summary_row(city, focus_area, metrics)
+        tables['metrics'].append(summary)
+        files[f"{focus_prefix}/metrics.json"] = json.dumps(metrics.to_dict(), indent=2, default=str).encode('utf-8')
+
+        zones_df = build_zones_df(focus_area, period, city)
+        files[f"{focus_prefix}/zones.csv"] = zones_df.to_csv(index=False).encode('utf-8')
+        for row in zones_df.to_dict(orient='records'):
+            tables['zones'].append({'city': city, 'focus_area': focus_area, 'time_range': period,
+                                    'zone': row['Zone'], 'priority': row['Priority'],
+                                    'attributes': json.dumps(row, default=str)})
+
+        alerts = build_alerts(metrics, period)
+        files[f"{focus_prefix}/alerts.json"] = json.dumps(alerts, indent=2).encode('utf-8')
+        for alert in alerts:
+            tables['alerts'].append({'city': city, 'focus_area': focus_area, 'time_range': period, **alert})
+
+    # Series and charts do not depend on the focus area
+    growth = metrics['growth_data']
+    temp = metrics['temperature_data']
+    series_df = pd.DataFrame({
+        'Year': growth['years'],
+        'Population_Millions': growth['population'],
+        'Built_up_Area_km2': growth['built_up_area'],
+        'Vegetation_Change': growth['vegetation_loss'],
+        'Temperature_C': temp['temperatures']
+    })
+    files[f"{prefix}/series.csv"] = series_df.to_csv(index=False).encode('utf-8')
+    for row in series_df.to_dict(orient='records'):
+        tables['series'].append({'city': city, 'time_range': period, **row})
+
+    if charts:
+        files[f"{prefix}/urban_expansion.png"] = _chart_png(
+            growth['years'], growth['built_up_area'], f"Urban Expansion - {city} ({period})", "Built-up Area (km²)", '#FC3D21')
+        files[f"{prefix}/temperature.png"] = _chart_png(
+            temp['years'], temp['temperatures'], f"Surface Temperature - {city} ({period})", "Temperature (°C)", '#FF6B6B')
+
+    return {'city': city, 'period': period, 'files': files, 'tables': tables}
+
+
+def build_city_reports(city, periods, focus_areas=FOCUS_AREAS, charts=True):
+    """Reports for every period of one city
+
+    Worker caches are per process, so keeping a city's periods in one task lets its raster
+    summaries and metrics be loaded once instead of once per worker that gets a period.
+    """
+    return [build_report(city, period, focus_areas, charts) for period in periods]
+
+
+class ZipSink:
+    """Writes each finished report straight into a zip archive"""
+
+    def __init__(self, path):
+        self.archive = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED)
+        self.bytes_written = 0
+
+    def write(self, report):
+        for name, content in report['files'].items():
+            # PNGs are already compressed
+            compress = zipfile.ZIP_STORED if name.endswith('.png') else zipfile.ZIP_DEFLATED
+            self.archive.writestr(name, content, compress_type=compress)
+            self.bytes_written += len(content)
+
+    def close(self):
+        self.archive.close()
+
+
+def table_schemas():
+    """Declared schema of every report table
+
+    Inferring them from the first report would type a column that is None there (e.g.
+    activity_growth for a city without rasters) as null, and later reports could not be cast.
+    """
+    text, number = pa.string(), pa.float64()
+    keys = [('city', text), ('focus_area', text), ('time_range', text)]
+    return {
+        'metrics': pa.schema(keys + [
+            ('primary_metric', number), ('metric_label', text), ('risk_level', text),
+            ('population', number), ('growth_rate', number), ('activity_growth', number),
+            ('heat_island_intensity', number), ('surface_uhi', number), ('aqi', number),
+            ('pm25', number), ('water_stress', number), ('groundwater_decline', number)
+        ]),
+        'zones': pa.schema(keys + [('zone', text), ('priority', text), ('attributes', text)]),
+        'alerts': pa.schema(keys + [('type', text), ('message', text), ('priority', text)]),
+        'series': pa.schema([
+            ('city', text), ('time_range', text), ('Year', pa.int64()), ('Population_Millions', number),
+            ('Built_up_Area_km2', number), ('Vegetation_Change', number), ('Temperature_C', number)
+        ])
+    }
+
+
+class ParquetSink:
+    """Appends report tables to one Parquet file per table, charts go next to them"""
+
+    def __init__(self, path):
+        if pq is None:
+            raise SystemExit("Parquet output requires pyarrow (pip install pyarrow)")
+        self.path = path
+        os.makedirs(os.path.join(path, 'charts'), exist_ok=True)
+        self.schemas = table_schemas()
+        self.writers = {}
+        self.bytes_written = 0
+
+    def write(self, report):
+        for name, rows in report['tables'].items():
+            if not rows:
+                continue
+            table = pa.Table.from_pylist(rows, schema=self.schemas[name])
+            writer = self.writers.get(name)
+            if writer is None:
+                writer = self.writers[name] = pq.ParquetWriter(
+                    os.path.join(self.path, f"{name}.parquet"), table.schema, compression='zstd')
+            writer.write_table(table)
+            self.bytes_written += table.nbytes
+
+        for name, content in report['files'].items():
+            if name.endswith('.png'):
+                target = os.path.join(self.path, 'charts', name.replace('/', '__'))
+                with open(target, 'wb') as handle:
+                    handle.write(content)
+                self.bytes_written += len(content)
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+
+
+def run_export(cities, periods, output, output_format='zip', workers=None, charts=True, log=print):
+    """Fan report generation out over a process pool (one task per city) and stream results into the sink"""
+    sink = ZipSink(output) if output_format == 'zip' else ParquetSink(output)
+    workers = workers or os.cpu_count() or 1
+    # Bound the number of finished-but-unwritten city tasks held in memory
+    max_in_flight = workers * 2
+
+    started = time.perf_counter()
+    completed = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = set()
+            for city in cities:
+                pending.add(pool.submit(build_city_reports, city, list(periods), FOCUS_AREAS, charts))
+                if len(pending) < max_in_flight:
+                    continue
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for report in future.result():
+                        sink.write(report)
+                        completed += 1
+            for future in pending:
+                for report in future.result():
+                    sink.write(report)
+                    completed += 1
+    finally:
+        sink.close()
+
+    elapsed = time.perf_counter() - started
+    reports = completed * len(FOCUS_AREAS)
+    stats = {
+        'city_periods': completed,
+        'reports': reports,
+        'seconds': round(elapsed, 2),
+        'reports_per_second': round(reports / elapsed, 1) if elapsed else float('inf'),
+        'megabytes': round(sink.bytes_written / 1e6, 2),
+        'megabytes_per_second': round(sink.bytes_written / 1e6 / elapsed, 2) if elapsed else float('inf')
+    }
+    log(f"Exported {stats['reports']} reports ({stats['city_periods']} city-periods) to {output} "
+        f"in {stats['seconds']}s: {stats['reports_per_second']} reports/s, "
+        f"{stats['megabytes']} MB ({stats['megabytes_per_second']} MB/s)")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk export UrbanPulse AI reports for every city, focus area and period")
+    parser.add_argument('--output', default='urbanpulse_reports.zip', help="Zip file or Parquet dataset directory")
+    parser.add_argument('--format', choices=['zip', 'parquet'], default='zip')
+    parser.add_argument('--cities-file', help="Text file with one city name per line (defaults to the dashboard cities)")
+    parser.add_argument('--periods', nargs='*', default=TIME_PERIODS)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--no-charts', action='store_true', help="Skip static chart images")
+    args = parser.parse_args()
+
+    cities = CITIES
+    if args.cities_file:
+        with open(args.cities_file, encoding='utf-8') as handle:
+            cities = [line.strip() for line in handle if line.strip()]
+
+    run_export(cities, args.periods, args.output, args.format, args.workers, charts=not args.no_charts)
+
+
+if __name__ == "__main__":
+    main()
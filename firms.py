@@ -0,0 +1,386 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from analytics import CITIES, CITY_COORDINATES, MAP_ZONES, ZONE_NAMES, city_bounds, nasa_analyzer
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # Falls back to the pandas chunked reader
+    pa = None
+    pa_csv = None
+
+DEFAULT_STORE = os.environ.get('URBANPULSE_FIRMS_STORE', os.path.join('data', 'firms_aggregate.npz'))
+DEFAULT_CHUNK_ROWS = 500_000
+FIRMS_COLUMNS = ['latitude', 'longitude', 'acq_date', 'frp']
+# Lookup grid used to find candidate cities without an N x cities comparison
+GRID_DEG = 0.5
+METERS_PER_DEGREE = 111_320.0
+
+
+def _is_url(source):
+    return isinstance(source, str) and source.startswith(('http://', 'https://'))
+
+
+def iter_firms_chunks(source, chunk_rows=DEFAULT_CHUNK_ROWS, skip_rows=0):
+    """Yield FIRMS detections as dicts of NumPy columns, chunk by chunk
+
+    Files use pyarrow's streaming CSV reader when available; resumed reads and pyarrow-less
+    installs use the pandas chunked reader. URLs are streamed to a temporary file first
+    (see FirmsAggregateStore.ingest).
+    """
+    if pa_csv is not None and not skip_rows:
+        reader = pa_csv.open_csv(
+            source,
+            read_options=pa_csv.ReadOptions(block_size=64 << 20),
+            convert_options=pa_csv.ConvertOptions(
+                include_columns=FIRMS_COLUMNS,
+                column_types={'latitude': pa.float32(), 'longitude': pa.float32(), 'frp': pa.float32(), 'acq_date': pa.string()}
+            )
+        )
+        for batch in reader:
+            yield {
+                'latitude': batch.column('latitude').to_numpy(zero_copy_only=False),
+                'longitude': batch.column('longitude').to_numpy(zero_copy_only=False),
+                'acq_date': batch.column('acq_date').to_numpy(zero_copy_only=False),
+                'frp': batch.column('frp').to_numpy(zero_copy_only=False)
+            }
+        return
+
+    reader = pd.read_csv(
+        source,
+        usecols=FIRMS_COLUMNS,
+        dtype={'latitude': np.float32, 'longitude': np.float32, 'frp': np.float32, 'acq_date': str},
+        skiprows=range(1, skip_rows + 1) if skip_rows else None,
+        chunksize=chunk_rows
+    )
+    for chunk in reader:
+        yield {column: chunk[column].to_numpy() for column in FIRMS_COLUMNS}
+
+
+class CityIndex:
+    """Vectorized point -> (city, zone) assignment for many cities"""
+
+    def __init__(self, cities=CITIES):
+        self.cities = list(cities)
+        self.bounds = np.array([city_bounds(city) for city in self.cities], dtype=np.float64)
+
+        # Sparse lookup: grid cell id -> every city whose box touches it (boxes can share a cell)
+        cell_city = {}
+        for index, (west, south, east, north) in enumerate(self.bounds):
+            for gx in range(int(np.floor(west / GRID_DEG)), int(np.floor(east / GRID_DEG)) + 1):
+                for gy in range(int(np.floor(south / GRID_DEG)), int(np.floor(north / GRID_DEG)) + 1):
+                    cell_city.setdefault(self._cell_id(gx, gy), []).append(index)
+        self.cell_ids = np.array(sorted(cell_city), dtype=np.int64)
+        # (cells, most candidates per cell), padded with -1
+        width = max((len(candidates) for candidates in cell_city.values()), default=1)
+        self.cell_cities = np.full((len(self.cell_ids), width), -1, dtype=np.int32)
+        for row, cell in enumerate(self.cell_ids):
+            self.cell_cities[row, :len(cell_city[cell])] = cell_city[cell]
+
+        # Zone centres per city: (cities, zones)
+        centres = np.array([CITY_COORDINATES.get(city, (12.9716, 77.5946)) for city in self.cities])
+        offsets = np.array([spec['offset'] for spec in MAP_ZONES.values()])
+        self.zone_lat = centres[:, 0:1] + offsets[None, :, 0]
+        self.zone_lng = centres[:, 1:2] + offsets[None, :, 1]
+        self.zone_radius = np.array([spec['radius'] for spec in MAP_ZONES.values()], dtype=np.float64)
+
+    @staticmethod
+    def _cell_id(gx, gy):
+        return (np.int64(gx) + 1000) * 10_000 + (np.int64(gy) + 1000)
+
+    def assign(self, lat, lng):
+        """City index (-1 outside every box) and zone index for each point"""
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        cells = self._cell_id(np.floor(lng / GRID_DEG).astype(np.int64), np.floor(lat / GRID_DEG).astype(np.int64))
+
+        position = np.searchsorted(self.cell_ids, cells)
+        position = np.minimum(position, len(self.cell_ids) - 1)
+        known = self.cell_ids[position] == cells
+
+        # Exact box test against each candidate city of the point's cell; the first box containing it wins
+        city = np.full(len(lat), -1, dtype=np.int32)
+        for column in range(self.cell_cities.shape[1]):
+            candidate = np.where(known, self.cell_cities[position, column], -1)
+            west, south, east, north = (self.bounds[np.maximum(candidate, 0), k] for k in range(4))
+            inside = (city < 0) & (candidate >= 0) & (lng >= west) & (lng <= east) & (lat >= south) & (lat <= north)
+            city = np.where(inside, candidate, city)
+
+        # Nearest named zone within its radius (equirectangular distance), else the outer zone
+        zone = np.full(len(lat), len(MAP_ZONES), dtype=np.int8)
+        hit = np.flatnonzero(city >= 0)
+        if len(hit):
+            c = city[hit]
+            dlat = (lat[hit, None] - self.zone_lat[c]) * METERS_PER_DEGREE
+            dlng = (lng[hit, None] - self.zone_lng[c]) * METERS_PER_DEGREE * np.cos(np.radians(lat[hit, None]))
+            distance = np.hypot(dlat, dlng)
+            nearest = distance.argmin(axis=1)
+            within = distance[np.arange(len(hit)), nearest] <= self.zone_radius[nearest]
+            zone[hit] = np.where(within, nearest, len(MAP_ZONES))
+        return city, zone
+
+
+def _date_to_day(values):
+    """'YYYY-MM-DD' strings -> days since 1970-01-01 (int32)"""
+    return np.asarray(values, dtype='datetime64[D]').astype(np.int32)
+
+
+def aggregate_chunk(chunk, index):
+    """Bin one chunk of detections into (city, zone, day) counts and FRP statistics"""
+    city, zone = index.assign(chunk['latitude'], chunk['longitude'])
+    keep = city >= 0
+    if not keep.any():
+        return None
+
+    day = _date_to_day(chunk['acq_date'][keep])
+    frp = np.nan_to_num(np.asarray(chunk['frp'][keep], dtype=np.float64))
+    # One int64 key per (city, zone, day) so the grouping is a single np.unique
+    key = (city[keep].astype(np.int64) << 40) | (zone[keep].astype(np.int64) << 32) | (day.astype(np.int64) & 0xFFFFFFFF)
+    unique, inverse = np.unique(key, return_inverse=True)
+    frp_max = np.zeros(len(unique))
+    np.maximum.at(frp_max, inverse, frp)
+    return {
+        'key': unique,
+        'count': np.bincount(inverse, minlength=len(unique)).astype(np.int64),
+        'frp_sum': np.bincount(inverse, weights=frp, minlength=len(unique)),
+        'frp_max': frp_max
+    }
+
+
+def merge_aggregates(parts):
+    """Combine partial aggregates that may share keys"""
+    parts = [part for part in parts if part is not None]
+    if not parts:
+        return None
+    key = np.concatenate([part['key'] for part in parts])
+    unique, inverse = np.unique(key, return_inverse=True)
+    frp_max = np.zeros(len(unique))
+    np.maximum.at(frp_max, inverse, np.concatenate([part['frp_max'] for part in parts]))
+    return {
+        'key': unique,
+        'count': np.bincount(inverse, weights=np.concatenate([part['count'] for part in parts]), minlength=len(unique)).astype(np.int64),
+        'frp_sum': np.bincount(inverse, weights=np.concatenate([part['frp_sum'] for part in parts]), minlength=len(unique)),
+        'frp_max': frp_max
+    }
+
+
+def drop_days(aggregate, days):
+    """Aggregate without the rows of the given days"""
+    if aggregate is None:
+        return None
+    keep = ~np.isin((aggregate['key'] & 0xFFFFFFFF).astype(np.int32), days)
+    return {name: values[keep] for name, values in aggregate.items()}
+
+
+class FirmsAggregateStore:
+    """Compact on-disk (city, zone, day) aggregate of FIRMS detections, updated incrementally
+
+    Every source keeps its own aggregate, so a source can be replaced without touching the
+    others: a file that only grew is resumed from its last row, a file rewritten in place is
+    re-read and replaces its previous rows, and a new download of a URL feed (a rolling NRT
+    window) replaces the feed's rows for every day it covers. `aggregate` merges them all.
+    """
+
+    def __init__(self, path=DEFAULT_STORE):
+        self.path = path
+        self.cities = list(CITIES)
+        self.parts = {}
+        self.aggregate = None
+        self.sources = {}
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with np.load(self.path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            self.cities = meta['cities']
+            self.sources = meta['sources']
+            city = data['city'].astype(np.int64)
+            zone = data['zone'].astype(np.int64)
+            day = data['day'].astype(np.int64)
+            rows = {
+                'key': (city << 40) | (zone << 32) | (day & 0xFFFFFFFF),
+                'count': data['count'].astype(np.int64),
+                'frp_sum': data['frp_sum'].astype(np.float64),
+                'frp_max': data['frp_max'].astype(np.float64)
+            }
+            part = data['part'] if 'part' in data.files else None
+        if 'parts' not in meta:
+            # Stores written before per-source parts cannot replace one source's rows without
+            # double-counting; they are rebuilt from the sources on the next ingest
+            self.sources = {}
+            return
+        self.parts = {name: {column: values[part == index] for column, values in rows.items()}
+                      for index, name in enumerate(meta['parts'])}
+        self._combine()
+
+    def _combine(self):
+        self.aggregate = merge_aggregates(list(self.parts.values()))
+
+    @property
+    def nbytes(self):
+        if self.aggregate is None:
+            return 0
+        return sum(array.nbytes for array in self.aggregate.values())
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        names = [name for name, part in self.parts.items() if part is not None]
+        parts = [self.parts[name] for name in names]
+
+        def column(name, dtype):
+            if not parts:
+                return np.empty(0, dtype)
+            return np.concatenate([part[name] for part in parts]).astype(dtype)
+
+        key = column('key', np.int64)
+        meta = json.dumps({'cities': self.cities, 'zones': ZONE_NAMES, 'sources': self.sources, 'parts': names})
+        temp_path = self.path + '.tmp.npz'
+        np.savez_compressed(
+            temp_path,
+            meta=np.array(meta),
+            part=np.concatenate([np.full(len(part['key']), index, np.int16) for index, part in enumerate(parts)])
+            if parts else np.empty(0, np.int16),
+            city=(key >> 40).astype(np.int16),
+            zone=((key >> 32) & 0xFF).astype(np.int8),
+            day=(key & 0xFFFFFFFF).astype(np.int32),
+            count=column('count', np.int32),
+            frp_sum=column('frp_sum', np.float32),
+            frp_max=column('frp_max', np.float32)
+        )
+        # Atomic replace so the dashboard never reads a half-written aggregate
+        os.replace(temp_path, self.path)
+
+    @staticmethod
+    def _fingerprint(source):
+        stat = os.stat(source)
+        return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    def _aggregate_file(self, path, chunk_rows, skip_rows):
+        """(aggregate, rows read, rows matched, days present) of one CSV, chunk by chunk"""
+        index = CityIndex(self.cities)
+        aggregate = None
+        rows = 0
+        matched = 0
+        days = []
+        for chunk in iter_firms_chunks(path, chunk_rows, skip_rows):
+            rows += len(chunk['latitude'])
+            days.append(np.unique(_date_to_day(chunk['acq_date'])))
+            part = aggregate_chunk(chunk, index)
+            if part is not None:
+                matched += int(part['count'].sum())
+                # Merge as we go so memory is bounded by the aggregate, not the file
+                aggregate = merge_aggregates([aggregate, part])
+        covered = np.unique(np.concatenate(days)) if days else np.empty(0, np.int32)
+        return aggregate, rows, matched, covered
+
+    def ingest(self, source, chunk_rows=DEFAULT_CHUNK_ROWS, log=print):
+        """Stream one CSV file or URL into the aggregate; unchanged sources are skipped"""
+        started = time.perf_counter()
+        previous = self.sources.get(source)
+        if not _is_url(source):
+            fingerprint = self._fingerprint(source)
+            if previous and previous['fingerprint'] == fingerprint:
+                log(f"{source}: unchanged, skipped")
+                return 0
+            # FIRMS NRT files only ever grow by appended rows; any other change is a rewrite
+            appended = (previous is not None and source in self.parts
+                        and fingerprint['size'] > previous['fingerprint'].get('size', 0))
+            skip_rows = previous['rows'] if appended else 0
+            aggregate, rows, matched, _ = self._aggregate_file(source, chunk_rows, skip_rows)
+            self.parts[source] = merge_aggregates([self.parts.get(source), aggregate]) if appended else aggregate
+            total_rows = skip_rows + rows
+        else:
+            # Downloads stream to a temporary file (hashed on the way) and are read back in
+            # chunks, so memory stays bounded by the chunk size; requests go through the
+            # shared rate-limited, retrying client
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            handle = tempfile.NamedTemporaryFile(suffix='.csv', dir=directory, delete=False)
+            try:
+                with handle:
+                    digest = nasa_analyzer.nasa_fetcher.client.fires_download(source, handle)
+                fingerprint = {'sha256': digest}
+                if previous and previous['fingerprint'] == fingerprint:
+                    log(f"{source}: unchanged, skipped")
+                    return 0
+                aggregate, rows, matched, covered = self._aggregate_file(handle.name, chunk_rows, 0)
+            finally:
+                os.remove(handle.name)
+            self.parts[source] = merge_aggregates([drop_days(self.parts.get(source), covered), aggregate])
+            total_rows = rows
+
+        self._combine()
+        self.sources[source] = {'fingerprint': fingerprint, 'rows': total_rows}
+        elapsed = time.perf_counter() - started
+        log(f"{source}: {rows:,} rows, {matched:,} in city boxes, "
+            f"{rows / elapsed if elapsed else 0:,.0f} rows/s")
+        return rows
+
+    def frame(self, start=0, stop=None):
+        """Rows [start:stop] of the aggregate as a DataFrame (city, zone, date, detections, frp_sum, frp_max)"""
+        if self.aggregate is None:
+            return pd.DataFrame(columns=['city', 'zone', 'date', 'detections', 'frp_sum', 'frp_max'])
+        rows = slice(start, stop)
+        key = self.aggregate['key'][rows]
+        return pd.DataFrame({
+            'city': pd.Categorical.from_codes((key >> 40).astype(np.int16), self.cities),
+            'zone': pd.Categorical.from_codes(((key >> 32) & 0xFF).astype(np.int8), ZONE_NAMES),
+            'date': (key & 0xFFFFFFFF).astype(np.int32).astype('datetime64[D]'),
+            'detections': self.aggregate['count'][rows],
+            'frp_sum': self.aggregate['frp_sum'][rows],
+            'frp_max': self.aggregate['frp_max'][rows]
+        })
+
+    def query(self, city_name, start_date=None, end_date=None):
+        """Daily per-zone rows for one city within an optional date range"""
+        if self.aggregate is None or city_name not in self.cities:
+            return self.frame().iloc[0:0]
+        key = self.aggregate['key']
+        city_code = self.cities.index(city_name)
+        # Keys are sorted by city first, so one city is a contiguous slice
+        lo, hi = np.searchsorted(key >> 40, [city_code, city_code + 1])
+        frame = self.frame(lo, hi)
+        if start_date is not None:
+            frame = frame[frame['date'] >= np.datetime64(start_date, 'D')]
+        if end_date is not None:
+            frame = frame[frame['date'] <= np.datetime64(end_date, 'D')]
+        return frame
+
+    def zone_summary(self, city_name, start_date=None, end_date=None):
+        frame = self.query(city_name, start_date, end_date)
+        summary = frame.groupby('zone', observed=True).agg(
+            Detections=('detections', 'sum'),
+            Fire_Days=('date', 'nunique'),
+            Mean_FRP=('frp_sum', 'sum'),
+            Max_FRP=('frp_max', 'max')
+        )
+        summary['Mean_FRP'] = (summary['Mean_FRP'] / summary['Detections']).round(1)
+        return summary.reset_index().rename(columns={'zone': 'Zone'})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream FIRMS fire-hotspot CSVs into the city/zone/day aggregate")
+    parser.add_argument('sources', nargs='+', help="FIRMS CSV files or URLs (FIRMS area API or a local stand-in)")
+    parser.add_argument('--store', default=DEFAULT_STORE)
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    store = FirmsAggregateStore(args.store)
+    for source in args.sources:
+        store.ingest(source, args.chunk_rows)
+    store.save()
+    print(f"Aggregate saved to {args.store} ({len(store.aggregate['key']) if store.aggregate is not None else 0:,} city/zone/day rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+import threading
+from statistics import NormalDist
+
+import numpy as np
+
+PROJECTION_YEAR = 2050
+MAX_THEIL_SEN_PAIRS = 4096
+
+
+def stack_series(series_list):
+    """Pad ragged series into an (n_series, n_steps) float64 matrix with NaN gaps"""
+    length = max(len(series) for series in series_list)
+    matrix = np.full((len(series_list), length), np.nan)
+    for i, series in enumerate(series_list):
+        matrix[i, :len(series)] = series
+    return matrix
+
+
+def _student_t_quantile(df, level):
+    """Two-sided Student-t critical value
+
+    Cornish-Fisher expansion of the normal quantile for df > 4; it badly underestimates
+    the tails below that, so df <= 4 (rounded to an integer) uses the exact quantile.
+    """
+    if not 0 < level < 1:
+        raise ValueError(f"Confidence level must be between 0 and 1, got {level}")
+    p = (1 + level) / 2
+    z = NormalDist().inv_cdf(p)
+    df = np.maximum(np.asarray(df, dtype=np.float64), 1.0)
+    quantile = (z + (z**3 + z) / (4 * df) + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * df**2)
+                + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * df**3)
+                + (79 * z**9 + 776 * z**7 + 1482 * z**5 - 1920 * z**3 - 945 * z) / (92160 * df**4))
+
+    # Closed forms for one, two and four degrees of freedom
+    alpha = 4 * p * (1 - p)
+    exact = {
+        1: np.tan(np.pi * (p - 0.5)),
+        2: (2 * p - 1) / np.sqrt(2 * p * (1 - p)),
+        4: 2 * np.sqrt(max(np.cos(np.arccos(np.sqrt(alpha)) / 3) / np.sqrt(alpha) - 1, 0.0))
+    }
+    # Three degrees of freedom: Newton's method on the closed-form CDF
+    t = exact[4]
+    for _ in range(20):
+        cdf = 0.5 + (np.sqrt(3) * t / (3 + t * t) + np.arctan(t / np.sqrt(3))) / np.pi
+        t -= (cdf - p) / (6 * np.sqrt(3) / (np.pi * (3 + t * t) ** 2))
+    exact[3] = t
+
+    small = np.rint(df)
+    for dof, value in exact.items():
+        quantile = np.where((df <= 4) & (small == dof), value, quantile)
+    return quantile
+
+
+def fit_ols(t, Y):
+    """Ordinary least squares line for every row of Y in one pass
+
+    t is (n_steps,) or (n_series, n_steps); NaNs in Y are ignored. Returns a dict of
+    (n_series,) arrays: slope, intercept, residual std, count and centred t statistics
+    needed for prediction intervals.
+    """
+    Y = np.asarray(Y, dtype=np.float64)
+    t = np.broadcast_to(np.asarray(t, dtype=np.float64), Y.shape)
+    mask = ~np.isnan(Y)
+    n = mask.sum(axis=1)
+    n_safe = np.maximum(n, 1)
+
+    t_masked = np.where(mask, t, 0.0)
+    y_masked = np.where(mask, Y, 0.0)
+    t_mean = t_masked.sum(axis=1) / n_safe
+    y_mean = y_masked.sum(axis=1) / n_safe
+
+    dt = np.where(mask, t - t_mean[:, None], 0.0)
+    dy = np.where(mask, Y - y_mean[:, None], 0.0)
+    stt = (dt * dt).sum(axis=1)
+    slope = np.divide((dt * dy).sum(axis=1), stt, out=np.zeros_like(stt), where=stt > 0)
+    intercept = y_mean - slope * t_mean
+
+    residuals = np.where(mask, Y - (intercept[:, None] + slope[:, None] * t), 0.0)
+    dof = np.maximum(n - 2, 1)
+    resid_std = np.sqrt((residuals * residuals).sum(axis=1) / dof)
+
+    return {'slope': slope, 'intercept': intercept, 'resid_std': resid_std,
+            'n': n, 't_mean': t_mean, 'stt': stt}
+
+
+def fit_theil_sen(t, Y, max_pairs=MAX_THEIL_SEN_PAIRS, seed=0):
+    """Theil-Sen (median of pairwise slopes) for every row of Y in one pass
+
+    Long series are fitted on a fixed random sample of index pairs, drawn directly so
+    the cost stays O(n_series * max_pairs) regardless of the series length.
+    """
+    Y = np.asarray(Y, dtype=np.float64)
+    t = np.broadcast_to(np.asarray(t, dtype=np.float64), Y.shape)
+    steps = Y.shape[1]
+
+    if steps * (steps - 1) // 2 > max_pairs:
+        a, b = np.random.default_rng(seed).integers(0, steps, size=(2, max_pairs))
+        distinct = a != b
+        i, j = np.minimum(a, b)[distinct], np.maximum(a, b)[distinct]
+    else:
+        i, j = np.triu_indices(steps, k=1)
+
+    dt = t[:, j] - t[:, i]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slopes = (Y[:, j] - Y[:, i]) / dt
+    slopes[~np.isfinite(slopes)] = np.nan
+
+    slope = np.nanmedian(slopes, axis=1)
+    intercept = np.nanmedian(Y - slope[:, None] * t, axis=1)
+
+    # Residual spread around the robust line itself, for prediction intervals
+    residuals = Y - (intercept[:, None] + slope[:, None] * t)
+    residuals = np.where(np.isnan(Y), 0.0, residuals)
+    design = fit_ols(t, Y)
+    resid_std = np.sqrt((residuals * residuals).sum(axis=1) / np.maximum(design['n'] - 2, 1))
+    return {'slope': slope, 'intercept': intercept, 'resid_std': resid_std,
+            'n': design['n'], 't_mean': design['t_mean'], 'stt': design['stt']}
+
+
+def fit_exponential(t, Y):
+    """Compound growth fit: OLS on log(Y); annual rate = exp(slope) - 1"""
+    Y = np.asarray(Y, dtype=np.float64)
+    log_y = np.log(np.where(Y > 0, Y, np.nan))
+    fit = fit_ols(t, log_y)
+    fit['growth_rate'] = np.expm1(fit['slope'])
+    fit['log_space'] = True
+    return fit
+
+
+def seasonal_decompose(Y, period=12):
+    """Additive trend/seasonal/residual split of every row of a regular (monthly) series
+
+    The trend is a centred moving average of one full period (2x12 MA for monthly data),
+    the seasonal component is the mean detrended value for each phase, centred to zero.
+    """
+    Y = np.asarray(Y, dtype=np.float64)
+    n_series, steps = Y.shape
+    if steps < period + 1:
+        raise ValueError(f"Need more than one full period ({period}) of data to decompose")
+
+    # Centred moving average over sliding windows (NaN-aware)
+    if period % 2 == 0:
+        weights = np.r_[0.5, np.ones(period - 1), 0.5] / period
+    else:
+        weights = np.ones(period) / period
+    half = len(weights) // 2
+    valid = ~np.isnan(Y)
+    filled = np.where(valid, Y, 0.0)
+    window = np.lib.stride_tricks.sliding_window_view(filled, len(weights), axis=1)
+    counts = np.lib.stride_tricks.sliding_window_view(valid.astype(np.float64), len(weights), axis=1)
+    weighted = window @ weights
+    coverage = counts @ weights
+    trend = np.full_like(Y, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        trend[:, half:steps - half] = np.where(coverage > 0.99, weighted / coverage, np.nan)
+
+    detrended = Y - trend
+    cycles = -(-steps // period)
+    padded = np.full((n_series, cycles * period), np.nan)
+    padded[:, :steps] = detrended
+    phase_means = np.nanmean(padded.reshape(n_series, cycles, period), axis=1)
+    phase_means -= np.nanmean(phase_means, axis=1, keepdims=True)
+    seasonal = np.tile(phase_means, cycles)[:, :steps]
+
+    return {'trend': trend, 'seasonal': seasonal, 'residual': Y - trend - seasonal}
+
+
+def project(fit, future_t, level=0.95):
+    """Point forecasts and prediction intervals for every fitted series"""
+    future_t = np.asarray(future_t, dtype=np.float64)
+    mean = fit['intercept'][:, None] + fit['slope'][:, None] * future_t
+    n = np.maximum(fit['n'], 3).astype(np.float64)
+    stt = np.where(fit['stt'] > 0, fit['stt'], 1.0)
+    leverage = 1.0 + 1.0 / n[:, None] + (future_t - fit['t_mean'][:, None])**2 / stt[:, None]
+    margin = _student_t_quantile(n - 2, level)[:, None] * fit['resid_std'][:, None] * np.sqrt(leverage)
+
+    lower, upper = mean - margin, mean + margin
+    if fit.get('log_space'):
+        mean, lower, upper = np.exp(mean), np.exp(lower), np.exp(upper)
+    return {'mean': mean, 'lower': lower, 'upper': upper}
+
+
+FIT_METHODS = {
+    'ols': fit_ols,
+    'theil_sen': fit_theil_sen,
+    'exponential': fit_exponential
+}
+
+
+class TrendForecaster:
+    """Caches fitted parameters per series key and fits only the missing ones, batched"""
+
+    def __init__(self):
+        self.params = {}
+        # Fits run on dashboard and API threads while the refresher clears the parameters
+        self.lock = threading.Lock()
+
+    def clear(self):
+        with self.lock:
+            self.params.clear()
+
+    def fit(self, keys, t, Y, method='ols'):
+        """Fitted parameters for each key (rows of Y), reusing earlier fits"""
+        with self.lock:
+            missing = [row for row, key in enumerate(keys) if (method, key) not in self.params]
+            if missing:
+                t = np.asarray(t, dtype=np.float64)
+                t_rows = t[missing] if t.ndim == 2 else t
+                fit = FIT_METHODS[method](t_rows, np.asarray(Y, dtype=np.float64)[missing])
+                for position, row in enumerate(missing):
+                    self.params[(method, keys[row])] = {
+                        name: (value[position] if isinstance(value, np.ndarray) else value)
+                        for name, value in fit.items()
+                    }
+            stored = [self.params[(method, key)] for key in keys]
+
+        return {
+            name: (np.array([entry[name] for entry in stored]) if name != 'log_space' else stored[0][name])
+            for name in stored[0]
+        }
+
+    def forecast(self, keys, t, Y, future_t, method='ols', level=0.95):
+        return project(self.fit(keys, t, Y, method), future_t, level)
+
+
+def robust_slope(values, years):
+    """Theil-Sen slope of a single series (units per year)"""
+    return float(fit_theil_sen(np.asarray(years, dtype=np.float64), np.asarray(values, dtype=np.float64)[None, :])['slope'][0])
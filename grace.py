@@ -0,0 +1,203 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from analytics import (
+    CITIES, CITY_COORDINATES, GRACE_DIR, MAP_ZONES, OUTER_ZONE, ZONE_NAMES, city_bounds, slugify,
+    water_storage_path
+)
+from firms import METERS_PER_DEGREE, CityIndex
+from forecasting import seasonal_decompose
+
+# Regions reported per city: every map zone, then the whole city
+REGION_NAMES = ZONE_NAMES + ['city']
+# Share of aquifer volume that drains as water (converts storage change to water-table change)
+SPECIFIC_YIELD = 0.05
+
+
+def stack_paths(city_name, root=GRACE_DIR):
+    """(TWS stack, metadata, cached decomposition) paths for a city"""
+    directory = os.path.join(root, slugify(city_name))
+    return (os.path.join(directory, 'tws.npy'), os.path.join(directory, 'meta.json'),
+            os.path.join(directory, 'decomposition.npz'))
+
+
+def load_meta(city_name, root=GRACE_DIR):
+    """Georeference, first month and value encoding of a city's monthly TWS anomaly stack
+
+    Defaults describe a cm-of-water stack over the city box starting with GRACE in April
+    2002; regional mascon grids can be used as-is by setting their bounds. Missing months
+    are NaN (or `fill`) so the stack stays regular.
+    """
+    meta = {'bounds': list(city_bounds(city_name)), 'start': '2002-04', 'scale': 1.0, 'fill': None,
+            'units': 'cm', 'specific_yield': SPECIFIC_YIELD}
+    meta_path = stack_paths(city_name, root)[1]
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding='utf-8') as handle:
+            meta.update(json.load(handle))
+    return meta
+
+
+def covering_cells(city_name, shape, bounds):
+    """Flat indices, centre latitudes and longitudes of the grid cells overlapping the city box"""
+    height, width = shape
+    west, south, east, north = bounds
+    cell_lat = (north - south) / height
+    cell_lng = (east - west) / width
+    lat = north - (np.arange(height) + 0.5) * cell_lat
+    lng = west + (np.arange(width) + 0.5) * cell_lng
+    lat_grid, lng_grid = np.meshgrid(lat, lng, indexing='ij')
+    lat_flat, lng_flat = lat_grid.ravel(), lng_grid.ravel()
+
+    city_west, city_south, city_east, city_north = city_bounds(city_name)
+    overlaps = (
+        (lng_flat + cell_lng / 2 > city_west) & (lng_flat - cell_lng / 2 < city_east)
+        & (lat_flat + cell_lat / 2 > city_south) & (lat_flat - cell_lat / 2 < city_north)
+    )
+    cells = np.flatnonzero(overlaps)
+    return cells, lat_flat[cells], lng_flat[cells]
+
+
+def region_weights(city_name, lat, lng, cell_km):
+    """(regions, cells) row-normalised weights
+
+    GRACE cells are far coarser than the map zones, so a zone's series is a Gaussian-weighted
+    blend of the cells around its centre (bandwidth one cell); the outer city averages the
+    cells outside every named zone, and the city row averages all covering cells.
+    """
+    centre_lat, centre_lng = CITY_COORDINATES.get(city_name, (12.9716, 77.5946))
+    weights = np.zeros((len(REGION_NAMES), len(lat)))
+    for index, spec in enumerate(MAP_ZONES.values()):
+        dlat = (lat - centre_lat - spec['offset'][0]) * METERS_PER_DEGREE / 1000
+        dlng = (lng - centre_lng - spec['offset'][1]) * METERS_PER_DEGREE / 1000 * np.cos(np.radians(lat))
+        weights[index] = np.exp(-(np.hypot(dlat, dlng) / cell_km) ** 2)
+
+    _, zone = CityIndex([city_name]).assign(lat, lng)
+    outer = zone == len(MAP_ZONES)
+    weights[ZONE_NAMES.index(OUTER_ZONE)] = outer if outer.any() else 1.0
+    weights[REGION_NAMES.index('city')] = 1.0
+    return weights / weights.sum(axis=1, keepdims=True)
+
+
+def _weighted(weights, values):
+    """NaN-aware weights @ values: regions with no valid cell at a step stay NaN"""
+    valid = ~np.isnan(values)
+    sums = weights @ np.where(valid, values, 0.0)
+    coverage = weights @ valid
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(coverage > 0, sums / coverage, np.nan)
+
+
+def decompose_cells(path, meta, cells):
+    """Trend / seasonal / residual of every covering cell in one batched decomposition"""
+    stack = np.load(path, mmap_mode='r')
+    months = stack.shape[0]
+    series = np.asarray(stack.reshape(months, -1)[:, cells], dtype=np.float64).T
+    if meta['fill'] is not None:
+        series[series == meta['fill']] = np.nan
+    series *= meta['scale']
+    if meta['units'] == 'mm':
+        series /= 10
+    return seasonal_decompose(series, period=12)
+
+
+def cached_components(cache_path, signature, cells):
+    """Components saved by an earlier run over the same stack, metadata and cells, else None"""
+    if not os.path.exists(cache_path):
+        return None
+    with np.load(cache_path, allow_pickle=False) as cache:
+        if ('signature' not in cache.files or str(cache['signature']) != signature
+                or not np.array_equal(cache['cells'], cells)):
+            return None
+        return {name: cache[name].astype(np.float64) for name in ('trend', 'seasonal', 'residual')}
+
+
+def process_stack(city_name, root=GRACE_DIR, log=print):
+    """Decompose every covering cell's TWS series and write per-region water_storage.json
+
+    The decomposition is cached next to the stack and reused while the stack file and its
+    metadata are unchanged, so re-running only rewrites the summary.
+    """
+    path, _, cache_path = stack_paths(city_name, root)
+    meta = load_meta(city_name, root)
+    stack = np.load(path, mmap_mode='r')
+    if stack.ndim != 3:
+        raise ValueError(f"{path}: expected a (months, rows, cols) stack, got shape {stack.shape}")
+    months, height, width = stack.shape
+    del stack
+
+    started = time.perf_counter()
+    cells, lat, lng = covering_cells(city_name, (height, width), meta['bounds'])
+    if not len(cells):
+        raise ValueError(f"{path}: no grid cell overlaps {city_name}")
+    stat = os.stat(path)
+    signature = json.dumps({'size': stat.st_size, 'mtime': stat.st_mtime, 'meta': meta}, sort_keys=True)
+    components = cached_components(cache_path, signature, cells)
+    if components is None:
+        components = decompose_cells(path, meta, cells)
+        np.savez_compressed(cache_path, signature=np.array(signature), cells=cells, lat=lat, lng=lng,
+                            **{name: values.astype(np.float32) for name, values in components.items()})
+    else:
+        log(f"{city_name}: stack unchanged, reusing {cache_path}")
+
+    _, south, _, north = meta['bounds']
+    cell_km = (north - south) / height * METERS_PER_DEGREE / 1000
+    weights = region_weights(city_name, lat, lng, cell_km)
+    trend = _weighted(weights, components['trend'])
+    seasonal = _weighted(weights, components['seasonal'])
+    residual = _weighted(weights, components['residual'])
+
+    labels = np.datetime64(meta['start'], 'M') + np.arange(months)
+    calendar_month = labels.astype(np.int64) % 12
+    # Mean seasonal anomaly per calendar month (Jan..Dec)
+    climatology = np.stack([np.nanmean(seasonal[:, calendar_month == m], axis=1) for m in range(12)], axis=1)
+
+    def column(values):
+        return [None if np.isnan(value) else round(float(value), 3) for value in values]
+
+    summary = {
+        'city_name': city_name,
+        'months': [str(label) for label in labels],
+        'units': 'cm',
+        'specific_yield': meta['specific_yield'],
+        'cells': int(len(cells)),
+        'regions': {
+            name: {
+                'trend': column(trend[index]),
+                'seasonal': column(climatology[index]),
+                'residual_std': round(float(np.nanstd(residual[index])), 3)
+            }
+            for index, name in enumerate(REGION_NAMES)
+        }
+    }
+
+    output = water_storage_path(city_name, root)
+    temp_path = output + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as handle:
+        json.dump(summary, handle, indent=2)
+    # Atomic replace so the dashboard never reads a half-written file
+    os.replace(temp_path, output)
+
+    elapsed = time.perf_counter() - started
+    log(f"{city_name}: {months} months x {len(cells)} cells decomposed in {elapsed:.3f}s -> {output}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trend/seasonal decomposition of GRACE water storage per city and zone")
+    parser.add_argument('cities', nargs='*', help="Cities to process (defaults to every city with a stack)")
+    parser.add_argument('--root', default=GRACE_DIR, help="Directory holding <city-slug>/tws.npy stacks")
+    args = parser.parse_args()
+
+    cities = args.cities or [city for city in CITIES if os.path.exists(stack_paths(city, args.root)[0])]
+    if not cities:
+        raise SystemExit(f"No GRACE stacks found under {args.root}")
+    for city in cities:
+        process_stack(city, args.root)
+
+
+if __name__ == "__main__":
+    main()
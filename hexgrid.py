@@ -0,0 +1,227 @@
+import numpy as np
+import pandas as pd
+
+from analytics import CITY_COORDINATES, ZONE_NAMES, ZONE_TABLE_MAP, city_bounds, metrics_cache
+from firms import METERS_PER_DEGREE, CityIndex
+
+# Edge length of the coarsest hexagons; every finer resolution halves it (aperture 4)
+BASE_EDGE_KM = 8.0
+RESOLUTIONS = 4
+# Spacing of the sample lattice that spreads zone values over the city box
+SAMPLE_SPACING_KM = 0.25
+SQRT3 = np.sqrt(3.0)
+# Cell ids pack (resolution, q, r) into one int64: 8 bits | 28 bits | 28 bits
+_AXIS_BITS = 28
+_AXIS_MASK = (1 << _AXIS_BITS) - 1
+_AXIS_OFFSET = 1 << (_AXIS_BITS - 1)
+# Fill colours from low to high values
+HEX_PALETTE = ['#2c7bb6', '#abd9e9', '#ffffbf', '#fdae61', '#d7191c']
+
+
+def _hex_round(q, r):
+    """Nearest hexagon of fractional axial coordinates (cube rounding)"""
+    s = -q - r
+    rq, rr, rs = np.rint(q), np.rint(r), np.rint(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+    return rq.astype(np.int64), rr.astype(np.int64)
+
+
+class HexGrid:
+    """Hierarchical pointy-top hexagons on a local plane around a city centre (H3-style)
+
+    Resolution 0 has BASE_EDGE_KM edges and each finer resolution halves them. A cell's
+    parent is the coarser cell containing its centre, so every child has exactly one parent
+    and rollups can be built from the level below instead of from the raw points.
+    """
+
+    def __init__(self, city_name, base_edge_km=BASE_EDGE_KM, resolutions=RESOLUTIONS):
+        self.city_name = city_name
+        self.base_edge_km = base_edge_km
+        self.resolutions = resolutions
+        self.lat0, self.lng0 = CITY_COORDINATES.get(city_name, (12.9716, 77.5946))
+        self.km_per_lat = METERS_PER_DEGREE / 1000
+        self.km_per_lng = self.km_per_lat * np.cos(np.radians(self.lat0))
+
+    @property
+    def finest(self):
+        return self.resolutions - 1
+
+    def edge_km(self, res):
+        return self.base_edge_km / 2 ** res
+
+    def _to_xy(self, lat, lng):
+        x = (np.asarray(lng, dtype=np.float64) - self.lng0) * self.km_per_lng
+        y = (np.asarray(lat, dtype=np.float64) - self.lat0) * self.km_per_lat
+        return x, y
+
+    def _to_latlng(self, x, y):
+        return self.lat0 + y / self.km_per_lat, self.lng0 + x / self.km_per_lng
+
+    @staticmethod
+    def _pack(res, q, r):
+        return (np.asarray(res, dtype=np.int64) << 2 * _AXIS_BITS) | ((q + _AXIS_OFFSET) << _AXIS_BITS) | (r + _AXIS_OFFSET)
+
+    @staticmethod
+    def _unpack(cells):
+        cells = np.asarray(cells, dtype=np.int64)
+        res = cells >> 2 * _AXIS_BITS
+        q = ((cells >> _AXIS_BITS) & _AXIS_MASK) - _AXIS_OFFSET
+        r = (cells & _AXIS_MASK) - _AXIS_OFFSET
+        return res, q, r
+
+    def _cells_xy(self, x, y, res):
+        size = self.edge_km(res)
+        q, r = _hex_round((SQRT3 / 3 * x - y / 3) / size, (2 / 3 * y) / size)
+        return self._pack(res, q, r)
+
+    def _centres_xy(self, cells):
+        res, q, r = self._unpack(cells)
+        size = self.base_edge_km / 2.0 ** res
+        return size * (SQRT3 * q + SQRT3 / 2 * r), size * 1.5 * r
+
+    def cells(self, lat, lng, res):
+        """Cell id of every point at one resolution (vectorized; fine for millions of points)"""
+        x, y = self._to_xy(lat, lng)
+        return self._cells_xy(x, y, res)
+
+    def centres(self, cells):
+        """(lat, lng) of each cell centre"""
+        return self._to_latlng(*self._centres_xy(cells))
+
+    def parent(self, cells):
+        """Cell one resolution coarser containing each cell's centre"""
+        res, _, _ = self._unpack(cells)
+        x, y = self._centres_xy(cells)
+        return self._cells_xy(x, y, res - 1)
+
+    def boundaries(self, cells):
+        """(n, 7, 2) closed [lng, lat] rings of each cell, ready for GeoJSON"""
+        res, _, _ = self._unpack(cells)
+        x, y = self._centres_xy(cells)
+        size = (self.base_edge_km / 2.0 ** res)[:, None]
+        angles = np.radians(60 * np.arange(7) - 30)
+        lat, lng = self._to_latlng(x[:, None] + size * np.cos(angles), y[:, None] + size * np.sin(angles))
+        return np.stack([lng, lat], axis=-1)
+
+
+class HexRollup:
+    """Per-resolution aggregates of point metrics, precomputed finest-first
+
+    Points are binned once at the finest resolution; each coarser level sums the level
+    below it through parent(), so switching resolution is a dict lookup.
+    """
+
+    def __init__(self, grid, frames):
+        self.grid = grid
+        self.frames = frames
+
+    @classmethod
+    def build(cls, grid, point_cells, values):
+        """point_cells: finest-resolution cell of every point; values: {metric: (n,) array}"""
+        cells, inverse = np.unique(point_cells, return_inverse=True)
+        level = {'cells': cells, 'count': np.bincount(inverse, minlength=len(cells)).astype(np.float64)}
+        for name, column in values.items():
+            column = np.asarray(column, dtype=np.float64)
+            valid = np.isfinite(column)
+            level[name] = (
+                np.bincount(inverse, weights=np.where(valid, column, 0.0), minlength=len(cells)),
+                np.bincount(inverse, weights=valid, minlength=len(cells))
+            )
+        levels = {grid.finest: level}
+
+        for res in range(grid.finest - 1, -1, -1):
+            child = levels[res + 1]
+            cells, inverse = np.unique(grid.parent(child['cells']), return_inverse=True)
+            level = {'cells': cells, 'count': np.bincount(inverse, weights=child['count'], minlength=len(cells))}
+            for name in values:
+                sums, valid = child[name]
+                level[name] = (
+                    np.bincount(inverse, weights=sums, minlength=len(cells)),
+                    np.bincount(inverse, weights=valid, minlength=len(cells))
+                )
+            levels[res] = level
+
+        return cls(grid, {res: cls._frame(grid, level, values) for res, level in levels.items()})
+
+    @staticmethod
+    def _frame(grid, level, names):
+        lat, lng = grid.centres(level['cells'])
+        frame = pd.DataFrame({'cell': level['cells'], 'lat': lat, 'lng': lng, 'points': level['count'].astype(np.int64)})
+        for name in names:
+            sums, valid = level[name]
+            frame[name] = np.divide(sums, valid, out=np.full(len(sums), np.nan), where=valid > 0)
+        return frame
+
+    def level(self, res):
+        return self.frames[res]
+
+    def geojson(self, res, metric):
+        """FeatureCollection of one resolution coloured by a metric (quantile classes)"""
+        frame = self.frames[res]
+        values = frame[metric].to_numpy()
+        finite = values[np.isfinite(values)]
+        if len(finite):
+            edges = np.quantile(finite, np.linspace(0, 1, len(HEX_PALETTE) + 1)[1:-1])
+            classes = np.digitize(np.nan_to_num(values, nan=finite.min()), edges)
+        else:
+            classes = np.zeros(len(values), dtype=np.intp)
+        rings = self.grid.boundaries(frame['cell'].to_numpy())
+        features = [
+            {
+                'type': 'Feature',
+                'geometry': {'type': 'Polygon', 'coordinates': [ring.round(6).tolist()]},
+                'properties': {
+                    'value': None if np.isnan(value) else round(float(value), 3),
+                    'points': int(points),
+                    'color': HEX_PALETTE[k]
+                }
+            }
+            for ring, value, points, k in zip(rings, values, frame['points'], classes)
+        ]
+        return {'type': 'FeatureCollection', 'features': features}
+
+
+def sample_points(city_name, spacing_km=SAMPLE_SPACING_KM):
+    """Regular lattice over the city box with each point's named zone index"""
+    west, south, east, north = city_bounds(city_name)
+    lat0 = (south + north) / 2
+    lat_step = spacing_km * 1000 / METERS_PER_DEGREE
+    lng_step = lat_step / np.cos(np.radians(lat0))
+    lat, lng = np.meshgrid(np.arange(south, north, lat_step), np.arange(west, east, lng_step), indexing='ij')
+    lat, lng = lat.ravel(), lng.ravel()
+    _, zone = CityIndex([city_name]).assign(lat, lng)
+    return lat, lng, zone
+
+
+def city_hex_points(city_name):
+    """Grid, finest cell and zone index of the city's sample points (shared across sessions)"""
+    def compute():
+        grid = HexGrid(city_name)
+        lat, lng, zone = sample_points(city_name)
+        return grid, grid.cells(lat, lng, grid.finest), zone
+    return metrics_cache.get_or_compute(('hex_points', city_name), compute)
+
+
+def zone_values(zones_df, focus_area):
+    """Numeric zone-table columns as (len(ZONE_NAMES),) arrays, averaging rows that share a map zone"""
+    mapping = ZONE_TABLE_MAP.get(focus_area, ZONE_TABLE_MAP['default'])
+    zone_index = np.array([ZONE_NAMES.index(mapping[zone]) for zone in zones_df['Zone']])
+    values = {}
+    for column in zones_df.select_dtypes(include=[np.number]).columns:
+        column_values = zones_df[column].to_numpy(dtype=np.float64)
+        valid = np.isfinite(column_values)
+        sums = np.bincount(zone_index, weights=np.where(valid, column_values, 0.0), minlength=len(ZONE_NAMES))
+        counts = np.bincount(zone_index, weights=valid, minlength=len(ZONE_NAMES))
+        values[column] = np.divide(sums, counts, out=np.full(len(ZONE_NAMES), np.nan), where=counts > 0)
+    return values
+
+
+def zone_rollup(city_name, zones_df, focus_area):
+    """Hex rollup of a city's zone table at every resolution"""
+    grid, point_cells, zone = city_hex_points(city_name)
+    values = {column: per_zone[zone] for column, per_zone in zone_values(zones_df, focus_area).items()}
+    return HexRollup.build(grid, point_cells, values)
@@ -0,0 +1,257 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import threading
+import time
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+from analytics import CITIES, FOCUS_AREAS, SOLUTIONS, TIME_PERIODS
+
+try:
+    import psutil
+except ImportError:  # Falls back to peak RSS from getrusage
+    psutil = None
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+# AppTest installs and resets the process-global Streamlit Runtime on every run, so runs of
+# different sessions cannot overlap in one process. In thread mode reruns take this lock and
+# the time spent waiting for it is reported apart from render time.
+APPTEST_LOCK = threading.Lock()
+
+NASA_LAYERS = [
+    "Landsat - Urban Expansion",
+    "MODIS - Temperature & Heat Islands",
+    "VIIRS - Nighttime Lights & Activity",
+    "GRACE - Water Resources",
+    "SEDAC - Population & Infrastructure",
+    "MODIS - Air Quality & Aerosols"
+]
+
+# Relative frequency of each user action in a simulated session
+ACTION_WEIGHTS = {
+    'switch_city': 0.30,
+    'switch_period': 0.25,
+    'switch_focus': 0.25,
+    'toggle_solution': 0.10,
+    'toggle_layer': 0.10
+}
+
+
+def _widget(widgets, label):
+    for widget in widgets:
+        if widget.label == label:
+            return widget
+    raise LookupError(f"Widget not found: {label}")
+
+
+def rss_mb():
+    """(MB, kind): current RSS with psutil, otherwise the peak RSS from getrusage"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 1e6, 'current'
+    # ru_maxrss is KB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return (peak / 1e6 if sys.platform == "darwin" else peak / 1e3), 'peak'
+
+
+class SimulatedSession:
+    """One browser session driven through Streamlit's AppTest"""
+
+    def __init__(self, seed, timeout):
+        self.rng = random.Random(seed)
+        self.app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.latencies = []
+        self.waits = []
+        self.errors = 0
+
+    def _timed(self, action):
+        queued = time.perf_counter()
+        with APPTEST_LOCK:
+            started = time.perf_counter()
+            action()
+            self.latencies.append(time.perf_counter() - started)
+        self.waits.append(started - queued)
+        if self.app.exception:
+            self.errors += 1
+
+    def open(self):
+        self._timed(self.app.run)
+
+    def step(self):
+        action = self.rng.choices(list(ACTION_WEIGHTS), weights=list(ACTION_WEIGHTS.values()))[0]
+        app = self.app
+        if action == 'switch_city':
+            widget = _widget(app.selectbox, "Select City")
+            change = lambda: widget.set_value(self.rng.choice(CITIES)).run()
+        elif action == 'switch_period':
+            widget = _widget(app.selectbox, "Analysis Period")
+            change = lambda: widget.set_value(self.rng.choice(TIME_PERIODS)).run()
+        elif action == 'switch_focus':
+            widget = _widget(app.selectbox, "Primary Infrastructure Focus")
+            change = lambda: widget.set_value(self.rng.choice(FOCUS_AREAS)).run()
+        elif action == 'toggle_solution':
+            widget = _widget(app.multiselect, "Select solutions to implement:")
+            name = self.rng.choice(SOLUTIONS)['name']
+            change = (lambda: widget.unselect(name).run()) if name in widget.value else (lambda: widget.select(name).run())
+        else:
+            widget = _widget(app.multiselect, "Select Data Layers")
+            layer = self.rng.choice(NASA_LAYERS)
+            change = (lambda: widget.unselect(layer).run()) if layer in widget.value else (lambda: widget.select(layer).run())
+        self._timed(change)
+
+
+def drive(client, actions, think_time, barrier):
+    try:
+        client.open()
+        barrier.wait()
+        for _ in range(actions):
+            if think_time:
+                time.sleep(client.rng.uniform(0, 2 * think_time))
+            client.step()
+    except Exception:
+        # Timeouts or script errors count against the level; release the other sessions
+        client.errors += 1
+        barrier.abort()
+
+
+def _session_process(seed, actions, think_time, timeout, barrier, results):
+    """Run one session alone in this process and report its latencies, CPU and RSS"""
+    cpu_before = time.process_time()
+    try:
+        client = SimulatedSession(seed, timeout)
+    except Exception:
+        # Always report, or the parent would wait for this session forever
+        barrier.abort()
+        latencies, waits, errors = [], [], 1
+    else:
+        drive(client, actions, think_time, barrier)
+        latencies, waits, errors = client.latencies, client.waits, client.errors
+    rss, rss_kind = rss_mb()
+    results.put({'latencies': latencies, 'waits': waits, 'errors': errors,
+                 'cpu': time.process_time() - cpu_before, 'rss': rss, 'rss_kind': rss_kind})
+
+
+def _run_processes(sessions, actions, think_time, seed, timeout):
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(sessions)
+    results = context.Queue()
+    workers = [context.Process(target=_session_process, args=(seed + i, actions, think_time, timeout, barrier, results))
+               for i in range(sessions)]
+    wall_before = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    # Drain before joining so a full queue cannot block the workers
+    reports = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    wall = time.perf_counter() - wall_before
+    rss_kind = reports[0]['rss_kind']
+    return reports, wall, {
+        'cpu': sum(report['cpu'] for report in reports),
+        'rss': sum(report['rss'] for report in reports),
+        'rss_per_session': float(np.mean([report['rss'] for report in reports])),
+        'rss_kind': rss_kind
+    }
+
+
+def _run_threads(sessions, actions, think_time, seed, timeout):
+    clients = [SimulatedSession(seed + i, timeout) for i in range(sessions)]
+    barrier = threading.Barrier(sessions)
+    rss_before, rss_kind = rss_mb()
+    cpu_before = time.process_time()
+    wall_before = time.perf_counter()
+    threads = [threading.Thread(target=drive, args=(client, actions, think_time, barrier), daemon=True)
+               for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - wall_before
+    rss_after, _ = rss_mb()
+    reports = [{'latencies': client.latencies, 'waits': client.waits, 'errors': client.errors} for client in clients]
+    return reports, wall, {
+        # One interpreter runs every session, so CPU and RSS are the whole process
+        'cpu': time.process_time() - cpu_before,
+        'rss': rss_after,
+        'rss_per_session': (rss_after - rss_before) / sessions,
+        'rss_kind': rss_kind
+    }
+
+
+def run_level(sessions, actions, think_time, seed, timeout, isolation='process'):
+    """Run `sessions` concurrent sessions, each performing `actions` reruns
+
+    With process isolation every session runs in its own interpreter, so reruns really
+    overlap and CPU/RSS are those of the session processes. Thread isolation keeps every
+    session in this process (sharing its caches) with reruns serialized on APPTEST_LOCK.
+    """
+    run = _run_processes if isolation == 'process' else _run_threads
+    reports, wall, usage = run(sessions, actions, think_time, seed, timeout)
+
+    # The first run of each session (cold open) is reported separately from widget reruns
+    reruns = np.array([latency for report in reports for latency in report['latencies'][1:]])
+    waits = np.array([wait for report in reports for wait in report['waits'][1:]] or [0.0])
+    opens = np.array([report['latencies'][0] for report in reports if report['latencies']] or [0.0])
+    p50, p95, p99 = np.percentile(reruns, [50, 95, 99]) if len(reruns) else (0.0, 0.0, 0.0)
+    rss_label = 'rss_mb' if usage['rss_kind'] == 'current' else 'peak_rss_mb'
+    return {
+        'sessions': sessions,
+        'isolation': isolation,
+        'reruns': int(len(reruns)),
+        'errors': sum(report['errors'] for report in reports),
+        'open_p50_ms': round(float(np.median(opens)) * 1000, 1),
+        'p50_ms': round(float(p50) * 1000, 1),
+        'p95_ms': round(float(p95) * 1000, 1),
+        'p99_ms': round(float(p99) * 1000, 1),
+        'wait_p95_ms': round(float(np.percentile(waits, 95)) * 1000, 1),
+        'throughput_rps': round(len(reruns) / wall, 2) if wall else 0.0,
+        'cpu_percent': round(100 * usage['cpu'] / wall, 1) if wall else 0.0,
+        rss_label: round(usage['rss'], 1),
+        rss_label + '_per_session': round(usage['rss_per_session'], 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline concurrent-session load test for app.py")
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 2, 4, 8], help="Concurrent session counts to test")
+    parser.add_argument('--actions', type=int, default=20, help="Widget changes per session")
+    parser.add_argument('--think-ms', type=float, default=0.0, help="Mean think time between actions")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=60.0, help="Per-rerun timeout in seconds")
+    parser.add_argument('--isolation', choices=['process', 'thread'], default='process',
+                        help="Run each session in its own process, or all sessions in this one")
+    parser.add_argument('--max-p95-ms', type=float, help="Fail (exit 1) if any level exceeds this p95 rerun latency")
+    parser.add_argument('--json', help="Write the results to this file")
+    args = parser.parse_args()
+
+    # Background refreshes would regenerate metrics in the middle of the measurements
+    os.environ['URBANPULSE_REFRESH'] = '0'
+    results = []
+    rss_label = 'rss_mb' if psutil is not None else 'peak_rss_mb'
+    rss_header = 'rss MB' if psutil is not None else 'peak MB'
+    print(f"{'sessions':>8} {'reruns':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'wait p95':>8} {'rps':>7} "
+          f"{'cpu %':>7} {rss_header:>8} {'MB/sess':>8} {'errors':>6}")
+    for sessions in args.sessions:
+        result = run_level(sessions, args.actions, args.think_ms / 1000, args.seed, args.timeout, args.isolation)
+        results.append(result)
+        print(f"{result['sessions']:>8} {result['reruns']:>7} {result['p50_ms']:>8} {result['p95_ms']:>8} "
+              f"{result['p99_ms']:>8} {result['wait_p95_ms']:>8} {result['throughput_rps']:>7} {result['cpu_percent']:>7} "
+              f"{result[rss_label]:>8} {result[rss_label + '_per_session']:>8} {result['errors']:>6}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as handle:
+            json.dump(results, handle, indent=2)
+
+    failed = [r for r in results if r['errors'] or (args.max_p95_ms is not None and r['p95_ms'] > args.max_p95_ms)]
+    if failed:
+        print(f"Capacity gate failed at session counts: {[r['sessions'] for r in failed]}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import argparse
+import functools
+import json
+import os
+import time
+
+import numpy as np
+
+from analytics import (
+    CITIES, CITY_COORDINATES, LST_DIR, ZONE_NAMES, city_bounds, slugify, surface_heat_island_path
+)
+from firms import METERS_PER_DEGREE, CityIndex
+
+# Urban core: disc around the city centre; rural reference: ring well outside it (km)
+URBAN_CORE_KM = 8.0
+RURAL_RING_KM = (15.0, 25.0)
+# Regions reduced per time step: every map zone, then the urban core and the rural ring
+REGION_NAMES = ZONE_NAMES + ['urban_core', 'rural_ring']
+DEFAULT_CHUNK_MB = 256
+
+
+def stack_paths(city_name, root=LST_DIR):
+    """(LST stack, metadata, cached masks) paths for a city"""
+    directory = os.path.join(root, slugify(city_name))
+    return (os.path.join(directory, 'lst.npy'), os.path.join(directory, 'meta.json'),
+            os.path.join(directory, 'masks.npz'))
+
+
+def load_meta(city_name, root=LST_DIR):
+    """Georeference, acquisition dates and value encoding of a city's LST stack
+
+    Defaults describe a Celsius stack of 8-day composites over the city box from 2014;
+    MODIS MOD11A2 grids can be used as-is with {"scale": 0.02, "units": "K", "fill": 0}.
+    """
+    meta = {'bounds': list(city_bounds(city_name)), 'start': '2014-01-01', 'step_days': 8,
+            'scale': 1.0, 'offset': 0.0, 'units': 'C', 'fill': None}
+    meta_path = stack_paths(city_name, root)[1]
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding='utf-8') as handle:
+            meta.update(json.load(handle))
+    return meta
+
+
+def step_years(meta, steps):
+    """Calendar year of every time step"""
+    if 'dates' in meta:
+        dates = np.asarray(meta['dates'][:steps], dtype='datetime64[D]')
+    else:
+        dates = np.datetime64(meta['start'], 'D') + np.arange(steps) * int(meta['step_days'])
+    return dates.astype('datetime64[Y]').astype(np.int64) + 1970
+
+
+@functools.lru_cache(maxsize=32)
+def region_matrix(city_name, shape, bounds):
+    """(pixels, regions) 0/1 matrix assigning each pixel to its zone, urban core and rural ring
+
+    Masks only depend on the city and grid geometry, so they are built once per process.
+    """
+    height, width = shape
+    west, south, east, north = bounds
+    lat = north - (np.arange(height) + 0.5) * (north - south) / height
+    lng = west + (np.arange(width) + 0.5) * (east - west) / width
+    lat_grid, lng_grid = np.meshgrid(lat, lng, indexing='ij')
+    lat_flat, lng_flat = lat_grid.ravel(), lng_grid.ravel()
+
+    city, zone = CityIndex([city_name]).assign(lat_flat, lng_flat)
+    centre_lat, centre_lng = CITY_COORDINATES.get(city_name, (12.9716, 77.5946))
+    distance_km = np.hypot(
+        (lat_flat - centre_lat) * METERS_PER_DEGREE,
+        (lng_flat - centre_lng) * METERS_PER_DEGREE * np.cos(np.radians(lat_flat))
+    ) / 1000
+
+    matrix = np.zeros((height * width, len(REGION_NAMES)), dtype=np.float32)
+    inside = np.flatnonzero(city >= 0)
+    matrix[inside, zone[inside]] = 1
+    matrix[:, len(ZONE_NAMES)] = distance_km <= URBAN_CORE_KM
+    matrix[:, len(ZONE_NAMES) + 1] = (distance_km >= RURAL_RING_KM[0]) & (distance_km <= RURAL_RING_KM[1])
+    matrix.flags.writeable = False
+    return matrix
+
+
+def load_region_matrix(city_name, shape, bounds, root=LST_DIR):
+    """Region masks from masks.npz when they match the grid, otherwise built and saved"""
+    mask_path = stack_paths(city_name, root)[2]
+    geometry = np.array([*shape, *bounds], dtype=np.float64)
+    if os.path.exists(mask_path):
+        with np.load(mask_path) as cached:
+            if np.array_equal(cached['geometry'], geometry) and list(cached['regions']) == REGION_NAMES:
+                return cached['matrix'].astype(np.float32)
+    matrix = region_matrix(city_name, tuple(shape), tuple(bounds))
+    np.savez_compressed(mask_path, geometry=geometry, regions=np.array(REGION_NAMES), matrix=matrix.astype(bool))
+    return matrix
+
+
+def regional_means(path, meta, matrix, max_chunk_mb=DEFAULT_CHUNK_MB):
+    """(steps, regions) mean LST in °C; NaN where a region has no valid pixel at that step
+
+    Steps are read in chunks from the memory-mapped stack and every chunk is reduced
+    for all regions at once with two matrix products (value sums and valid counts).
+    """
+    stack = np.load(path, mmap_mode='r')
+    steps = stack.shape[0]
+    pixels = stack.shape[1] * stack.shape[2]
+    chunk = max(int(max_chunk_mb * 1e6 / (pixels * 4 * 3)), 1)
+
+    means = np.empty((steps, matrix.shape[1]), dtype=np.float64)
+    for start in range(0, steps, chunk):
+        raw = np.asarray(stack[start:start + chunk], dtype=np.float32).reshape(-1, pixels)
+        valid = np.isfinite(raw)
+        if meta['fill'] is not None:
+            valid &= raw != meta['fill']
+        values = raw * np.float32(meta['scale']) + np.float32(meta['offset'])
+        if meta['units'] == 'K':
+            values -= np.float32(273.15)
+        values = np.where(valid, values, 0)
+        sums = values @ matrix
+        counts = valid.astype(np.float32) @ matrix
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means[start:start + len(raw)] = np.where(counts > 0, sums / counts, np.nan)
+    return means
+
+
+def annual_means(years, means):
+    """Average per-step regional means into calendar years -> (unique years, (years, regions))"""
+    unique, inverse = np.unique(years, return_inverse=True)
+    valid = ~np.isnan(means)
+    sums = np.zeros((len(unique), means.shape[1]))
+    counts = np.zeros((len(unique), means.shape[1]))
+    np.add.at(sums, inverse, np.where(valid, means, 0))
+    np.add.at(counts, inverse, valid)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return unique, np.where(counts > 0, sums / counts, np.nan)
+
+
+def process_stack(city_name, root=LST_DIR, max_chunk_mb=DEFAULT_CHUNK_MB, log=print):
+    """Compute urban-core, rural-ring and per-zone LST for every time step and write heat_island.json"""
+    path = stack_paths(city_name, root)[0]
+    meta = load_meta(city_name, root)
+    stack = np.load(path, mmap_mode='r')
+    if stack.ndim != 3:
+        raise ValueError(f"{path}: expected a (steps, rows, cols) stack, got shape {stack.shape}")
+    steps, height, width = stack.shape
+    del stack
+
+    started = time.perf_counter()
+    matrix = load_region_matrix(city_name, (height, width), meta['bounds'], root)
+    means = regional_means(path, meta, matrix, max_chunk_mb)
+    years, annual = annual_means(step_years(meta, steps), means)
+
+    def column(values):
+        return [None if np.isnan(value) else round(float(value), 3) for value in values]
+
+    urban = len(ZONE_NAMES)
+    summary = {
+        'city_name': city_name,
+        'steps': steps,
+        'years': years.tolist(),
+        'urban_core': column(annual[:, urban]),
+        'rural_ring': column(annual[:, urban + 1]),
+        'zones': {name: column(annual[:, index]) for index, name in enumerate(ZONE_NAMES)},
+        'pixels': {name: int(count) for name, count in zip(REGION_NAMES, matrix.sum(axis=0))}
+    }
+
+    output = surface_heat_island_path(city_name, root)
+    temp_path = output + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as handle:
+        json.dump(summary, handle, indent=2)
+    # Atomic replace so the dashboard never reads a half-written file
+    os.replace(temp_path, output)
+
+    elapsed = time.perf_counter() - started
+    log(f"{city_name}: {steps} steps x {height}x{width} px, "
+        f"{steps * height * width / elapsed if elapsed else 0:,.0f} px-steps/s -> {output}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Surface urban heat island (urban core minus rural ring) from LST grids")
+    parser.add_argument('cities', nargs='*', help="Cities to process (defaults to every city with a stack)")
+    parser.add_argument('--root', default=LST_DIR, help="Directory holding <city-slug>/lst.npy stacks")
+    parser.add_argument('--max-chunk-mb', type=float, default=DEFAULT_CHUNK_MB, help="Memory budget per block of time steps")
+    args = parser.parse_args()
+
+    cities = args.cities or [city for city in CITIES if os.path.exists(stack_paths(city, args.root)[0])]
+    if not cities:
+        raise SystemExit(f"No LST stacks found under {args.root}")
+    for city in cities:
+        process_stack(city, args.root, args.max_chunk_mb)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+# Criteria per zone table: column -> (direction, default weight)
+# +1: higher values mean more need (higher priority), -1: higher values mean less need
+PRIORITY_CRITERIA = {
+    "Housing & Urban Growth": {
+        'Growth_Rate': (1, 0.4), 'Infrastructure_Score': (-1, 0.4), 'Activity_Growth': (1, 0.2)
+    },
+    "Water & Resources": {
+        'Water_Stress': (1, 0.45), 'Groundwater_Level': (-1, 0.3), 'Consumption_Rate': (1, 0.25)
+    },
+    "Public Health & Heat": {
+        'Heat_Index': (1, 0.4), 'Air_Quality': (1, 0.35), 'Healthcare_Access': (-1, 0.25)
+    },
+    'default': {
+        'Development_Index': (-1, 0.5), 'Infrastructure_Score': (-1, 0.5)
+    }
+}
+# Lower score bound of each priority label
+PRIORITY_LEVELS = [(0.8, 'Critical'), (0.6, 'High'), (0.4, 'Medium'), (0.0, 'Low')]
+METHODS = ('topsis', 'weighted_sum')
+
+
+def criteria_for(focus_area):
+    return PRIORITY_CRITERIA.get(focus_area, PRIORITY_CRITERIA['default'])
+
+
+def default_weights(focus_area):
+    return {column: weight for column, (_, weight) in criteria_for(focus_area).items()}
+
+
+def priority_scores(X, weights, directions, method='topsis'):
+    """Need score in [0, 1] for every row of X (n_zones, n_criteria), in one vectorized pass
+
+    topsis: relative closeness to the ideal (highest-need) point after vector normalisation;
+    weighted_sum: min-max normalised criteria oriented by direction, dotted with the weights.
+    NaN entries (criteria a zone has no data for) contribute nothing.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    directions = np.asarray(directions, dtype=np.float64)
+    weights = weights / weights.sum() if weights.sum() > 0 else np.full_like(weights, 1 / len(weights))
+    missing = np.isnan(X)
+
+    if method == 'weighted_sum':
+        low = np.nanmin(np.where(missing, np.inf, X), axis=0)
+        high = np.nanmax(np.where(missing, -np.inf, X), axis=0)
+        span = np.where(high > low, high - low, 1.0)
+        scaled = (X - low) / span
+        oriented = np.where(directions > 0, scaled, 1 - scaled)
+        oriented[missing] = 0.0
+        # Re-weight rows with missing criteria over the criteria they do have
+        available = (~missing) @ weights
+        return np.divide(oriented @ weights, available, out=np.zeros(len(X)), where=available > 0)
+
+    if method != 'topsis':
+        raise ValueError(f"Unknown prioritization method: {method}")
+    filled = np.where(missing, 0.0, X)
+    norms = np.sqrt((filled * filled).sum(axis=0))
+    weighted = filled / np.where(norms > 0, norms, 1.0) * weights
+    column_max = np.where(missing, -np.inf, weighted).max(axis=0)
+    column_min = np.where(missing, np.inf, weighted).min(axis=0)
+    ideal = np.where(directions > 0, column_max, column_min)
+    anti_ideal = np.where(directions > 0, column_min, column_max)
+    # Missing criteria sit at the ideal and anti-ideal alike, so they do not move the score
+    to_ideal = np.where(missing, 0.0, weighted - ideal)
+    to_anti = np.where(missing, 0.0, weighted - anti_ideal)
+    d_ideal = np.sqrt((to_ideal * to_ideal).sum(axis=1))
+    d_anti = np.sqrt((to_anti * to_anti).sum(axis=1))
+    total = d_ideal + d_anti
+    return np.divide(d_anti, total, out=np.zeros(len(X)), where=total > 0)
+
+
+def priority_labels(scores):
+    thresholds = np.array([bound for bound, _ in PRIORITY_LEVELS[::-1]][1:])
+    labels = np.array([label for _, label in PRIORITY_LEVELS[::-1]])
+    return labels[np.digitize(scores, thresholds)]
+
+
+def top_k(scores, k):
+    """Indices of the k highest scores, best first (argpartition, then sort only those k)"""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind='stable')]
+
+
+def prioritize(zones_df, focus_area, weights=None, method='topsis'):
+    """Copy of a zone table with Priority_Score and a Priority label derived from its numeric columns"""
+    criteria = {column: spec for column, spec in criteria_for(focus_area).items() if column in zones_df.columns}
+    weights = {**default_weights(focus_area), **(weights or {})}
+    columns = list(criteria)
+    scores = priority_scores(
+        zones_df[columns].to_numpy(dtype=np.float64),
+        [weights[column] for column in columns],
+        [criteria[column][0] for column in columns],
+        method
+    )
+    result = zones_df.copy()
+    result['Priority_Score'] = np.round(scores, 3)
+    result['Priority'] = priority_labels(scores)
+    return result
+
+
+def rank_zones(zone_tables, focus_area, weights=None, method='topsis', k=10):
+    """Score every zone of many tables (e.g. one per city) together and return the top k
+
+    zone_tables maps a label (city) to its zone table; all rows are stacked into one
+    matrix so normalisation and scoring happen in a single pass.
+    """
+    frames = [table.assign(City=label) for label, table in zone_tables.items()]
+    if not frames:
+        return pd.DataFrame()
+    stacked = pd.concat(frames, ignore_index=True)
+    scored = prioritize(stacked, focus_area, weights, method)
+    best = top_k(scored['Priority_Score'].to_numpy(), k)
+    leading = ['City', 'Zone', 'Priority_Score', 'Priority']
+    return scored.iloc[best][leading + [c for c in criteria_for(focus_area) if c in scored.columns]].reset_index(drop=True)
@@ -0,0 +1,195 @@
+import argparse
+import json
+import os
+import threading
+import time
+
+from analytics import (
+    CITIES, FOCUS_AREAS, TIME_PERIODS, city_metrics_key, metrics_cache, nasa_analyzer, popular_metric_keys,
+    trend_forecaster
+)
+from firms import DEFAULT_STORE as FIRMS_STORE, FirmsAggregateStore
+
+DAY = 86400
+# Refresh cadence per data layer (seconds), matching the upstream product update frequency
+LAYER_CADENCES = {
+    'MODIS': DAY,
+    'VIIRS': DAY,
+    'FIRMS': 3 * 3600,
+    'Landsat': 16 * DAY,
+    'GRACE': 30 * DAY
+}
+# Layers feeding CityMetrics; any of them refreshing regenerates the warm metric keys
+METRIC_LAYERS = ('MODIS', 'VIIRS', 'Landsat', 'GRACE')
+# Failed refreshes are retried after this long instead of waiting a full cadence
+RETRY_AFTER = 300
+POPULAR_KEYS = 30
+# Always kept warm: every city at the dashboard's default focus and period
+PREWARM_KEYS = [(city, FOCUS_AREAS[0], TIME_PERIODS[0]) for city in CITIES]
+# FIRMS NRT sources re-ingested on the FIRMS cadence (space separated files or URLs)
+FIRMS_SOURCES = os.environ.get('URBANPULSE_FIRMS_SOURCES', '').split()
+
+
+class RefreshScheduler:
+    """Background thread that refreshes each data layer on its cadence (stale-while-revalidate)
+
+    Refreshed values are swapped into metrics_cache, so readers are always served the last
+    good value immediately; a failed refresh keeps it. `version` changes after every
+    successful refresh so dashboards can key their derived artifacts on it.
+    """
+
+    def __init__(self, cadences=LAYER_CADENCES, popular=POPULAR_KEYS, firms_sources=FIRMS_SOURCES, tick=30):
+        self.popular = popular
+        self.firms_sources = list(firms_sources)
+        self.tick = tick
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.version = 0
+        self.layers = {
+            name: {'cadence': cadence, 'last_refresh': None, 'last_attempt': None, 'in_flight': False,
+                   'errors': 0, 'last_error': None, 'duration': None}
+            for name, cadence in cadences.items()
+            if name != 'FIRMS' or self.firms_sources
+        }
+
+    def warm_keys(self):
+        """Pre-warm keys plus the most requested (city, focus, period) keys"""
+        keys = list(PREWARM_KEYS)
+        for key in popular_metric_keys(self.popular):
+            if key not in keys:
+                keys.append(key)
+        return keys
+
+    def refresh_metrics(self):
+        refreshed = set()
+        for city, focus, period in self.warm_keys():
+            key = city_metrics_key(city, focus, period)
+            metrics_cache.refresh(key, lambda: nasa_analyzer.generate_city_metrics(city, focus, period))
+            refreshed.add(key)
+        # Everything else derived from the old data is dropped and recomputed on next use:
+        # cold metric keys, projections fitted on the metrics and downsampled chart series.
+        # Fits take the forecaster lock, so none can repopulate stale parameters in between
+        with trend_forecaster.lock:
+            trend_forecaster.params.clear()
+            metrics_cache.discard(lambda key: (
+                (key[0] == 'city_metrics' and key not in refreshed) or key[0] in ('trend_projections', 'downsample')
+            ))
+
+    def refresh_firms(self):
+        store = FirmsAggregateStore(FIRMS_STORE)
+        for source in self.firms_sources:
+            store.ingest(source, log=lambda message: None)
+        store.save()
+
+    def due(self, now=None):
+        """Layers whose cadence (or retry delay after a failure) has elapsed"""
+        now = time.time() if now is None else now
+        due = []
+        with self.lock:
+            for name, layer in self.layers.items():
+                if layer['in_flight']:
+                    continue
+                if layer['last_attempt'] is None:
+                    due.append(name)
+                    continue
+                failed = layer['last_refresh'] is None or layer['last_refresh'] < layer['last_attempt']
+                wait = min(layer['cadence'], RETRY_AFTER) if failed else layer['cadence']
+                if now - layer['last_attempt'] >= wait:
+                    due.append(name)
+        return due
+
+    def run_layers(self, names):
+        """Refresh the given layers; metric layers due together share one regeneration"""
+        jobs = {}
+        for name in names:
+            job = self.refresh_firms if name == 'FIRMS' else self.refresh_metrics
+            jobs.setdefault(job, []).append(name)
+
+        for job, layer_names in jobs.items():
+            started = time.time()
+            with self.lock:
+                for name in layer_names:
+                    self.layers[name].update(in_flight=True, last_attempt=started)
+            error = None
+            try:
+                job()
+            except Exception as exc:  # Keep serving the last good value
+                error = f"{type(exc).__name__}: {exc}"
+            finished = time.time()
+            with self.lock:
+                for name in layer_names:
+                    layer = self.layers[name]
+                    layer.update(in_flight=False, duration=finished - started)
+                    if error is None:
+                        layer['last_refresh'] = finished
+                    else:
+                        layer['errors'] += 1
+                        layer['last_error'] = error
+                if error is None:
+                    self.version += 1
+
+    def run_pending(self):
+        self.run_layers(self.due())
+
+    def _loop(self):
+        # First pass pre-warms every layer, then wake up every `tick` seconds
+        self.run_pending()
+        while not self.stop_event.wait(self.tick):
+            self.run_pending()
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._loop, name="urbanpulse-refresh", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+
+    def stats(self, now=None):
+        """Per-layer freshness; lag is how far a layer is behind its cadence"""
+        now = time.time() if now is None else now
+        with self.lock:
+            layers = {}
+            for name, layer in self.layers.items():
+                age = None if layer['last_refresh'] is None else now - layer['last_refresh']
+                layers[name] = {
+                    'cadence_s': layer['cadence'],
+                    'age_s': None if age is None else round(age, 1),
+                    'lag_s': None if age is None else round(max(age - layer['cadence'], 0.0), 1),
+                    'in_flight': layer['in_flight'],
+                    'last_duration_s': None if layer['duration'] is None else round(layer['duration'], 3),
+                    'errors': layer['errors'],
+                    'last_error': layer['last_error']
+                }
+            return {'running': self.thread is not None and self.thread.is_alive(),
+                    'version': self.version, 'layers': layers}
+
+
+# Process-wide scheduler shared by the dashboard and the API (started by whichever runs first)
+refresh_scheduler = RefreshScheduler()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh every data layer once (or keep refreshing on cadence)")
+    parser.add_argument('--watch', action='store_true', help="Keep running and refresh layers on their cadence")
+    parser.add_argument('--tick', type=float, default=30.0, help="Seconds between cadence checks with --watch")
+    args = parser.parse_args()
+
+    scheduler = RefreshScheduler(tick=args.tick)
+    if args.watch:
+        scheduler.start()
+        try:
+            while True:
+                time.sleep(args.tick)
+                print(json.dumps(scheduler.stats()))
+        except KeyboardInterrupt:
+            scheduler.stop()
+    else:
+        scheduler.run_pending()
+        print(json.dumps(scheduler.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
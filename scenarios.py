@@ -0,0 +1,120 @@
+import numpy as np
+
+from analytics import ZONE_NAMES
+from forecasting import PROJECTION_YEAR, robust_slope
+
+# Share of the city's population and built-up area per zone (ZONE_NAMES order: CBD,
+# residential, industrial, green spaces, outer city)
+POPULATION_SHARE = np.array([0.10, 0.35, 0.10, 0.05, 0.40])
+BUILT_UP_SHARE = np.array([0.12, 0.33, 0.20, 0.03, 0.32])
+# Relative growth per zone (the outer city absorbs most new residents); normalised below so
+# the city-wide rate matches the slider
+GROWTH_WEIGHT = np.array([0.5, 1.0, 0.8, 0.3, 1.6])
+GROWTH_WEIGHT = GROWTH_WEIGHT / (POPULATION_SHARE @ GROWTH_WEIGHT)
+# Surface warming per doubling of a zone's built-up area (°C)
+HEAT_PER_BUILT_DOUBLING = 1.5
+# Cooling at full intervention adoption (green roofs, urban forest), reached after the ramp
+MAX_ADOPTION_COOLING = 2.5
+ADOPTION_RAMP_YEARS = 5
+# Vegetation index lost per km² of new built-up area, and the share interventions offset
+VEGETATION_PER_KM2 = 0.3
+ADOPTION_VEGETATION_OFFSET = 0.6
+# Transit coverage gain per year (points), scaled up by densification
+TRANSIT_BASE = 45.0
+TRANSIT_GAIN = 2.5
+
+
+def scenario_baseline(metrics, end_year=PROJECTION_YEAR):
+    """Per-zone starting point (last observed year) shared by every scenario of a city/period"""
+    growth = metrics['growth_data']
+    temperatures = np.asarray(metrics['temperature_data']['temperatures'], dtype=np.float64)
+    last_year = int(growth['years'][-1])
+    years = np.arange(last_year, end_year + 1)
+    population = float(growth['population'][-1]) * POPULATION_SHARE
+    built_up = float(growth['built_up_area'][-1]) * BUILT_UP_SHARE
+    # Background warming is the city's fitted temperature trend (heat_island_intensity is the
+    # urban-rural difference trend, not the warming rate)
+    warming = robust_slope(temperatures, metrics['temperature_data']['years'])
+    return {
+        'years': years,
+        't': (years - last_year).astype(np.float64),
+        'zones': list(ZONE_NAMES),
+        'population': population,
+        'built_up': built_up,
+        'built_up_per_capita': built_up / population,
+        'vegetation': float(growth['vegetation_loss'][-1]),
+        # Mean of the last three valid years so one noisy (or missing) year does not dominate
+        'temperature': float(np.nanmean(temperatures[~np.isnan(temperatures)][-3:])),
+        'warming': warming if np.isfinite(warming) else 0.0,
+        'growth_rate': float(metrics['growth_rate'])
+    }
+
+
+def project_population(baseline, growth_rate):
+    """(zones, years) population in millions at a city-wide annual growth rate (%)"""
+    rate = growth_rate / 100 * GROWTH_WEIGHT
+    return baseline['population'][:, None] * (1 + rate[:, None]) ** baseline['t'][None, :]
+
+
+def project_built_up(baseline, population, densification):
+    """(zones, years) built-up km²; densification is the share of new residents housed without new land"""
+    new_residents = np.maximum(population - baseline['population'][:, None], 0.0)
+    return baseline['built_up'][:, None] + new_residents * baseline['built_up_per_capita'][:, None] * (1 - densification)
+
+
+def _adoption_ramp(baseline, adoption):
+    return adoption / 100 * np.minimum(baseline['t'] / ADOPTION_RAMP_YEARS, 1.0)
+
+
+def project_vegetation(baseline, built_up, adoption):
+    """(years,) city vegetation index change; interventions offset part of the loss"""
+    new_land = (built_up - baseline['built_up'][:, None]).sum(axis=0)
+    offset = 1 - ADOPTION_VEGETATION_OFFSET * _adoption_ramp(baseline, adoption)
+    return baseline['vegetation'] - VEGETATION_PER_KM2 * new_land * offset
+
+
+def project_heat(baseline, built_up, adoption):
+    """(zones, years) surface temperature: background warming + densification heat - cooling"""
+    densification_heat = HEAT_PER_BUILT_DOUBLING * np.log2(built_up / baseline['built_up'][:, None])
+    # Interventions cool the densest zones most
+    density = BUILT_UP_SHARE / BUILT_UP_SHARE.max()
+    cooling = MAX_ADOPTION_COOLING * density[:, None] * _adoption_ramp(baseline, adoption)[None, :]
+    return baseline['temperature'] + baseline['warming'] * baseline['t'][None, :] + densification_heat - cooling
+
+
+def project_transit(baseline, densification):
+    """(years,) transit coverage (%): denser cities are cheaper to serve"""
+    return np.minimum(TRANSIT_BASE + TRANSIT_GAIN * baseline['t'] * (0.5 + densification), 100.0)
+
+
+def summarize(baseline, population, built_up, vegetation, heat, transit):
+    """City totals per year and the end-year values per zone"""
+    weights = built_up / built_up.sum(axis=0, keepdims=True)
+    return {
+        'years': baseline['years'],
+        'population': population.sum(axis=0),
+        'built_up': built_up.sum(axis=0),
+        'vegetation': vegetation,
+        # Built-up-weighted mean surface temperature
+        'temperature': (heat * weights).sum(axis=0),
+        'transit': transit,
+        'zones': {
+            name: {'population': population[z, -1], 'built_up': built_up[z, -1], 'temperature': heat[z, -1]}
+            for z, name in enumerate(baseline['zones'])
+        }
+    }
+
+
+def simulate(metrics, growth_rate=None, densification=0.3, adoption=0.0, end_year=PROJECTION_YEAR):
+    """Full scenario in one call (the dashboard wires the stages separately so only the
+    stages downstream of a moved slider are recomputed)"""
+    baseline = scenario_baseline(metrics, end_year)
+    growth_rate = baseline['growth_rate'] if growth_rate is None else growth_rate
+    population = project_population(baseline, growth_rate)
+    built_up = project_built_up(baseline, population, densification)
+    return summarize(
+        baseline, population, built_up,
+        project_vegetation(baseline, built_up, adoption),
+        project_heat(baseline, built_up, adoption),
+        project_transit(baseline, densification)
+    )
@@ -0,0 +1,139 @@
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from analytics import MetricsCache
+from city_records import deep_sizeof
+
+# Per-session cap for artifacts that are not shared between sessions
+DEFAULT_SESSION_CAP_MB = float(os.environ.get('URBANPULSE_SESSION_MEMORY_MB', 64))
+# Byte budget of the process-wide shared artifact store
+DEFAULT_SHARED_CAP_MB = float(os.environ.get('URBANPULSE_SHARED_MEMORY_MB', 512))
+# Sessions that have not rerun for this long are dropped from the report
+SESSION_REPORT_TTL = 3600
+
+
+def artifact_nbytes(value):
+    """Approximate bytes retained by a dashboard artifact"""
+    if value is None:
+        return 0
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True, index=True).sum())
+    if isinstance(value, np.ndarray):
+        # Views onto shared buffers (memmaps, store arrays) retain no data of their own
+        return 0 if value.base is not None else int(value.nbytes)
+    if isinstance(value, (str, bytes)):
+        return sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(artifact_nbytes(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(artifact_nbytes(item) for item in value.values())
+    if hasattr(value, 'nbytes'):
+        # Stores and tables that know their own footprint
+        return int(value.nbytes)
+    if hasattr(value, 'to_plotly_json'):
+        return deep_sizeof(value.to_plotly_json())
+    return deep_sizeof(value)
+
+
+def _freeze(value):
+    """Make shared NumPy data read-only so no session can mutate another's view
+
+    DataFrames are left writeable (several pandas code paths expect it); shared frames
+    are read-only by convention and never modified in place by the dashboard.
+    """
+    if isinstance(value, np.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _freeze(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _freeze(item)
+    return value
+
+
+class SharedArtifactStore(MetricsCache):
+    """Process-wide read-only store for immutable artifacts (tables, rasters, figures, map HTML)
+
+    Every session receives the same object, so a large artifact is held once per process
+    instead of once per session. Least recently used artifacts are evicted once the store
+    holds more than maxsize entries or max_bytes bytes.
+    """
+
+    def __init__(self, maxsize=2048, max_bytes=DEFAULT_SHARED_CAP_MB * 1e6):
+        super().__init__(maxsize)
+        self.max_bytes = max_bytes
+        self.sizes = {}
+        self.total_bytes = 0
+        # Sizes measured outside the lock, picked up when the entry is inserted
+        self.pending_sizes = {}
+
+    def get_or_compute(self, key, compute):
+        def build():
+            value = _freeze(compute())
+            nbytes = artifact_nbytes(value)
+            with self.lock:
+                self.pending_sizes[key] = nbytes
+            return value
+        return super().get_or_compute(key, build)
+
+    def _insert(self, key, value):
+        nbytes = self.pending_sizes.pop(key, None)
+        if nbytes is None:
+            nbytes = artifact_nbytes(value)
+        self.total_bytes += nbytes - self.sizes.get(key, 0)
+        self.sizes[key] = nbytes
+        super()._insert(key, value)
+        # The newest entry is kept even when it alone exceeds the budget
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            self._drop(next(iter(self.entries)))
+
+    def _drop(self, key):
+        super()._drop(key)
+        self.total_bytes -= self.sizes.pop(key, 0)
+
+    def holds(self, key, value):
+        """Whether the store still retains this exact object under key"""
+        with self.lock:
+            return self.entries.get(key) is value
+
+    def nbytes(self, key=None):
+        with self.lock:
+            if key is not None:
+                return self.sizes.get(key, 0)
+            return self.total_bytes
+
+    def stats(self):
+        stats = super().stats()
+        stats['bytes'] = self.nbytes()
+        stats['max_bytes'] = int(self.max_bytes)
+        return stats
+
+
+class SessionMemoryRegistry:
+    """Bytes retained by each live session, reported alongside the shared store"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions = {}
+
+    def update(self, session_id, nbytes):
+        now = time.time()
+        with self.lock:
+            self.sessions[session_id] = (nbytes, now)
+            for stale in [sid for sid, (_, seen) in self.sessions.items() if now - seen > SESSION_REPORT_TTL]:
+                del self.sessions[stale]
+
+    def report(self):
+        with self.lock:
+            return {sid: nbytes for sid, (nbytes, _) in self.sessions.items()}
+
+
+# Process-wide singletons
+shared_store = SharedArtifactStore()
+session_registry = SessionMemoryRegistry()
@@ -0,0 +1,43 @@
+import http.client
+
+import pytest
+import requests
+
+import api_server
+
+
+@pytest.fixture
+def api():
+    server = api_server.start_api_server(port=0, workers=2)
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_oversized_bodies_are_rejected_before_they_are_read(api):
+    connection = http.client.HTTPConnection(api.split('//')[1])
+    connection.putrequest('POST', '/v1/batch/metrics')
+    connection.putheader('Content-Length', str(api_server.MAX_BODY_BYTES + 1))
+    connection.endheaders()
+    response = connection.getresponse()
+    assert response.status == 413
+    assert response.getheader('Connection') == 'close'
+    connection.close()
+
+
+def test_zone_and_alert_requests_reuse_the_shared_store(api, monkeypatch):
+    calls = []
+    build = api_server.build_zones_df
+    monkeypatch.setattr(api_server, 'build_zones_df', lambda *args: calls.append(args) or build(*args))
+
+    for _ in range(3):
+        assert requests.get(f"{api}/v1/zones", params={'city': 'Bangalore'}).status_code == 200
+        assert requests.get(f"{api}/v1/alerts", params={'city': 'Bangalore'}).status_code == 200
+    assert len(calls) == 1
+
+
+def test_arrow_routes_accept_a_trailing_slash(api):
+    pytest.importorskip('pyarrow')
+    response = requests.get(f"{api}/v1/zones/", params={'format': 'arrow'})
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == 'application/vnd.apache.arrow.stream'
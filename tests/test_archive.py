@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+import analytics
+from analytics import CITIES, FOCUS_AREAS, TIME_PERIODS, get_city_metrics, get_trend_projections
+from archive import ObservationArchive
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    archive = ObservationArchive(str(tmp_path / 'archive'))
+    monkeypatch.setattr(analytics.nasa_analyzer.nasa_fetcher, 'archive', archive)
+    return archive
+
+
+def temperature_frame(city, years, start, slope):
+    return pd.DataFrame({
+        'city': city,
+        'layer': 'temperature',
+        'date': [f"{year}-07-01" for year in years],
+        'value': [start + slope * (year - years[0]) for year in years]
+    })
+
+
+def test_query_prunes_to_the_requested_city_and_years(archive):
+    archive.write(pd.concat([
+        temperature_frame(CITIES[0], list(range(2014, 2025)), 30.0, 0.5),
+        temperature_frame(CITIES[1], list(range(2014, 2025)), 20.0, 0.1)
+    ]))
+    table = archive.query(CITIES[0], ['temperature'], 2020, 2022)
+    assert table.num_rows == 3
+    assert set(table.column('city').to_pylist()) == {CITIES[0]}
+
+
+def test_write_upserts_existing_observations(archive):
+    years = list(range(2014, 2025))
+    archive.write(temperature_frame(CITIES[0], years, 30.0, 0.5))
+    archive.write(temperature_frame(CITIES[0], [2024], 99.0, 0.0))
+    annual = archive.annual(CITIES[0], ['temperature'], 2014, 2024)
+    assert len(annual) == len(years)
+    assert annual.loc[2024, 'temperature'] == pytest.approx(99.0)
+    assert annual.loc[2023, 'temperature'] == pytest.approx(34.5)
+
+
+def test_archive_ingest_changes_metrics_and_projections(archive):
+    city, focus, period = CITIES[0], FOCUS_AREAS[1], TIME_PERIODS[0]
+    start, end = analytics.PERIOD_YEARS[period]
+    before = get_trend_projections(city, focus, period)
+
+    archive.write(temperature_frame(city, list(range(start, end + 1)), 30.0, 1.0))
+
+    # No refresh in between: the new partition is served because the cache keys carry the archive version
+    metrics = get_city_metrics(city, focus, period)
+    assert metrics['temperature_data']['temperatures'][0] == pytest.approx(30.0)
+    after = get_trend_projections(city, focus, period)
+    assert after['temperature']['slope'] == pytest.approx(1.0, abs=1e-3)
+    assert after['temperature']['slope'] != pytest.approx(before['temperature']['slope'], abs=1e-3)
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from city_records import AirQuality, GrowthSeries, TemperatureSeries
+
+
+def growth(**overrides):
+    values = dict(years=[2020, 2021, 2022], population=[1.0, 1.1, 1.2], built_up_area=[10.0, 11.0, 12.5],
+                  growth_rate=2.5, vegetation_loss=[0.1, 0.2, 0.3], time_range='2019-2024 (Recent Years)')
+    values.update(overrides)
+    return GrowthSeries.build(**values)
+
+
+def test_records_compare_field_by_field():
+    assert growth() == growth()
+    assert growth() != growth(built_up_area=[10.0, 11.0, 13.0])
+    assert growth() != growth(growth_rate=3.0)
+    # Missing measurements (NaN) match each other
+    assert growth(activity_growth=float('nan')) == growth(activity_growth=float('nan'))
+
+
+def test_records_of_different_types_are_not_equal():
+    assert AirQuality(aqi=80, pm25=30, trend='Stable') != growth()
+    assert TemperatureSeries.build([2020], [30.0], 'Rising', 0.2, '2019-2024 (Recent Years)') != growth()
+
+
+def test_records_are_unhashable():
+    with pytest.raises(TypeError):
+        hash(growth())
+
+
+def test_building_a_record_leaves_the_callers_array_writeable():
+    area = np.array([10.0, 11.0, 12.5], dtype=np.float32)
+    record = growth(built_up_area=area)
+    assert area.flags.writeable
+    assert not record.built_up_area.flags.writeable
+    area[0] = 99.0
+    assert record.built_up_area[0] == 10.0
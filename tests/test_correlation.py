@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import correlation
+from correlation import CorrelationEngine, RunningCorrelation
+
+LAYERS = ['a', 'b', 'c']
+
+
+def random_observations(rows=60, seed=0):
+    rng = np.random.default_rng(seed)
+    base = rng.normal(size=(rows, 1))
+    return np.hstack([base + rng.normal(scale=0.5, size=(rows, 1)) for _ in LAYERS])
+
+
+def long_frame(observations, zone='Z', first_year=1950):
+    return pd.DataFrame([
+        (zone, first_year + row, layer, value)
+        for row, values in enumerate(observations)
+        for layer, value in zip(LAYERS, values) if not np.isnan(value)
+    ], columns=['zone', 'year', 'layer', 'value'])
+
+
+def test_merged_batches_match_numpy():
+    X = random_observations()
+    accumulator = RunningCorrelation.from_observations(X[:10])
+    for start in range(10, len(X), 7):
+        accumulator.merge(RunningCorrelation.from_observations(X[start:start + 7]))
+    np.testing.assert_allclose(accumulator.correlation(), np.corrcoef(X, rowvar=False), atol=1e-10)
+    np.testing.assert_allclose(accumulator.covariance(), np.cov(X, rowvar=False), atol=1e-10)
+
+
+def test_pairwise_statistics_skip_missing_values():
+    X = random_observations()
+    X[::3, 2] = np.nan
+    accumulator = RunningCorrelation(3).update(X)
+    both = ~np.isnan(X[:, 2])
+    expected = np.corrcoef(X[both][:, [0, 2]], rowvar=False)[0, 1]
+    assert accumulator.correlation()[0, 2] == pytest.approx(expected)
+    assert accumulator.count[0, 2] == both.sum()
+    assert accumulator.count[0, 1] == len(X)
+
+
+def test_incremental_ingest_matches_batch():
+    X = random_observations()
+    engine = CorrelationEngine(LAYERS)
+    for start in range(0, len(X), 13):
+        engine.ingest('City', long_frame(X[start:start + 13], first_year=1950 + start))
+    np.testing.assert_allclose(engine.matrix('City', 'Z').to_numpy(), np.corrcoef(X, rowvar=False), atol=1e-10)
+
+
+def test_late_layer_rebuilds_the_zone():
+    X = random_observations()
+    engine = CorrelationEngine(LAYERS)
+    early = X.copy()
+    early[:, 2] = np.nan
+    engine.ingest('City', long_frame(early), source='archive', replace=True)
+    # The third layer is published later by another source for the same years
+    late = np.full_like(X, np.nan)
+    late[:, 2] = X[:, 2]
+    assert engine.ingest('City', long_frame(late), source='lst', replace=True) == 1
+    np.testing.assert_allclose(engine.matrix('City', 'Z').to_numpy(), np.corrcoef(X, rowvar=False), atol=1e-10)
+
+
+def test_unchanged_sources_are_not_reread(monkeypatch):
+    X = random_observations(20)
+    versions = {'lst': None, 'viirs': None, 'grace': None, 'archive': 1.0}
+    reads = []
+
+    def observations(city_name, source, layers, start_year=None):
+        reads.append(source)
+        return long_frame(X) if source == 'archive' else long_frame(X[:0])
+
+    monkeypatch.setattr(correlation, 'source_versions', lambda city_name: dict(versions))
+    monkeypatch.setattr(correlation, 'source_observations', observations)
+    engine = CorrelationEngine(LAYERS)
+    assert engine.update_city('City') == len(X)
+    assert sorted(reads) == sorted(versions)
+
+    reads.clear()
+    assert engine.update_city('City') == 0
+    assert reads == []
+
+    versions['archive'] = 2.0
+    engine.update_city('City')
+    assert reads == ['archive']
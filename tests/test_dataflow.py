@@ -0,0 +1,91 @@
+import pytest
+
+from dataflow import Dataflow
+
+
+@pytest.fixture
+def flow():
+    flow = Dataflow({})
+    calls = {'table': 0, 'chart': 0, 'summary': 0}
+
+    @flow.artifact('table', deps=['city', 'period'])
+    def table(city, period):
+        calls['table'] += 1
+        return [city, period]
+
+    @flow.artifact('chart', deps=['table', 'width'])
+    def chart(table, width):
+        calls['chart'] += 1
+        return (tuple(table), width)
+
+    @flow.artifact('summary', deps=['table'])
+    def summary(table):
+        calls['summary'] += 1
+        return len(table)
+
+    flow.calls = calls
+    flow.set_inputs(city='Bangalore', period='2014-2024', width=800)
+    return flow
+
+
+def test_unchanged_inputs_reuse_every_artifact(flow):
+    flow.get('chart')
+    flow.get('summary')
+    flow.set_inputs(city='Bangalore', period='2014-2024', width=800)
+    flow.get('chart')
+    flow.get('summary')
+    assert flow.calls == {'table': 1, 'chart': 1, 'summary': 1}
+
+
+def test_an_input_change_recomputes_only_its_dependents(flow):
+    flow.get('chart')
+    flow.get('summary')
+    flow.set_inputs(width=1200)
+    assert flow.get('chart') == (('Bangalore', '2014-2024'), 1200)
+    flow.get('summary')
+    assert flow.calls == {'table': 1, 'chart': 2, 'summary': 1}
+
+
+def test_an_upstream_recompute_cascades_through_its_version(flow):
+    flow.get('chart')
+    version = flow.memo['table']['version']
+    flow.set_inputs(city='Mumbai')
+    assert flow.get('chart') == (('Mumbai', '2014-2024'), 800)
+    assert flow.memo['table']['version'] == version + 1
+    assert flow.calls == {'table': 2, 'chart': 2, 'summary': 0}
+
+
+def test_invalidation_recomputes_the_artifact_and_its_dependents(flow):
+    flow.get('chart')
+    flow.get('summary')
+    flow.invalidate('table')
+    assert flow.memo['table']['value'] is None
+    flow.get('chart')
+    flow.get('summary')
+    assert flow.calls == {'table': 2, 'chart': 2, 'summary': 2}
+
+
+def test_invalidating_a_leaf_leaves_upstream_alone(flow):
+    flow.get('chart')
+    flow.invalidate('chart')
+    flow.get('chart')
+    assert flow.calls == {'table': 1, 'chart': 2, 'summary': 0}
+
+
+def test_widget_values_are_frozen_into_hashable_keys(flow):
+    flow.set_inputs(city=['Bangalore', 'Mumbai'])
+    flow.get('table')
+    flow.set_inputs(city=['Bangalore', 'Mumbai'])
+    flow.get('table')
+    assert flow.calls['table'] == 1
+
+
+def test_unknown_dependencies_are_reported():
+    flow = Dataflow({})
+
+    @flow.artifact('orphan', deps=['missing'])
+    def orphan(missing):
+        return missing
+
+    with pytest.raises(KeyError):
+        flow.get('orphan')
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from downsample import downsample, lttb, minmax
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(0)
+    x = np.arange(10_000, dtype=np.float64)
+    y = np.sin(x / 300) + rng.normal(0, 0.05, len(x))
+    y[4321] = 25.0
+    y[7654] = -25.0
+    return x, y
+
+
+def test_lttb_keeps_the_endpoints_and_extremes(series):
+    x, y = series
+    xs, ys = lttb(x, y, 200)
+    assert len(xs) == 200
+    assert (xs[0], ys[0]) == (x[0], y[0])
+    assert (xs[-1], ys[-1]) == (x[-1], y[-1])
+    assert np.all(np.diff(xs) > 0)
+    assert ys.max() == 25.0 and ys.min() == -25.0
+
+
+def test_lttb_returns_short_series_unchanged():
+    x, y = np.arange(5.0), np.arange(5.0) ** 2
+    xs, ys = lttb(x, y, 10)
+    assert np.array_equal(xs, x) and np.array_equal(ys, y)
+
+
+def test_minmax_keeps_every_bucket_extreme(series):
+    x, y = series
+    xs, ys = minmax(x, y, 100)
+    assert len(xs) <= 200
+    buckets = np.minimum((x / x[-1] * 100).astype(int), 99)
+    for bucket in range(100):
+        in_bucket = buckets == bucket
+        kept = ys[np.isin(xs, x[in_bucket])]
+        assert kept.max() == y[in_bucket].max() and kept.min() == y[in_bucket].min()
+
+
+def test_zoom_slices_before_downsampling(series):
+    x, y = series
+    xs, _ = downsample(x, y, width=50, x_range=(1000, 2000))
+    assert xs[0] == 1000 and xs[-1] == 2000
+    assert len(xs) == 50
@@ -0,0 +1,186 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+import endpoints
+from endpoints import ExternalDataClient, MicroBatcher, MockEndpointServer, SingleFlight, TokenBucket
+
+POINTS = [(12.9716, 77.5946), (13.0216, 77.6446), (12.9216, 77.5446), (13.0016, 77.5646), (12.9717, 77.5947)]
+
+
+@pytest.fixture
+def mock_server():
+    servers = []
+
+    def start(**options):
+        server = MockEndpointServer(**options).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def make_client(mock, batch=False, **options):
+    return ExternalDataClient(
+        {'fires': f"{mock.url}/fires/", 'air_quality': f"{mock.url}/air_quality"},
+        air_quality_batch_url=f"{mock.url}/air_quality/batch" if batch else None,
+        **options
+    )
+
+
+def run_concurrently(sessions, func):
+    """Call func from `sessions` threads released together"""
+    barrier = threading.Barrier(sessions)
+
+    def session(index):
+        barrier.wait()
+        return func(index)
+
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        return list(pool.map(session, range(sessions)))
+
+
+def test_single_flight_merges_concurrent_calls():
+    flights = SingleFlight()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return 'value'
+
+    results = run_concurrently(8, lambda _: flights.do('key', slow))
+    assert results == ['value'] * 8
+    assert len(calls) == 1
+    assert flights.merged == 7
+    assert not flights.calls
+
+
+def test_single_flight_shares_the_leader_error():
+    flights = SingleFlight()
+
+    def failing():
+        time.sleep(0.2)
+        raise ValueError('upstream down')
+
+    def call(_):
+        try:
+            flights.do('key', failing)
+        except ValueError as exc:
+            return str(exc)
+
+    assert run_concurrently(4, call) == ['upstream down'] * 4
+    # The failed call is not cached: the next one runs again
+    assert flights.do('key', lambda: 'recovered') == 'recovered'
+
+
+def test_micro_batcher_resolves_unique_keys_once():
+    batches = []
+
+    def resolve_many(keys):
+        batches.append(sorted(keys))
+        time.sleep(0.1)
+        return {key: key * 10 for key in keys}
+
+    batcher = MicroBatcher(resolve_many, window=0.05)
+    results = run_concurrently(6, lambda _: batcher.get_many([1, 2, 3]))
+    assert results == [[10, 20, 30]] * 6
+    assert batches == [[1, 2, 3]]
+    assert batcher.batches == 1
+    assert batcher.merged == 15
+
+
+def test_micro_batcher_flushes_full_batches_without_waiting():
+    batcher = MicroBatcher(lambda keys: {key: key for key in keys}, window=10, max_batch=3)
+    started = time.perf_counter()
+    assert batcher.get_many([1, 2, 3]) == [1, 2, 3]
+    assert time.perf_counter() - started < 1
+
+
+def test_concurrent_fire_downloads_share_one_request(mock_server):
+    mock = mock_server(latency=0.2)
+    client = make_client(mock, rate=100, burst=100)
+    url = f"{mock.url}/fires/KEY/VIIRS_SNPP_NRT/77.3,12.7,77.8,13.2/1"
+
+    texts = run_concurrently(10, lambda _: client.fires_csv(url))
+    assert len(set(texts)) == 1
+    assert mock.counts['GET fires'] == 1
+    assert client.stats()['fires_requests'] == 10
+    assert client.flights.merged == 9
+
+
+def test_air_quality_points_are_batched_into_one_upstream_call(mock_server):
+    mock = mock_server(latency=0.2)
+    client = make_client(mock, batch=True, rate=100, burst=100)
+
+    answers = run_concurrently(10, lambda _: [endpoints.local_aqi(result) for result in client.air_quality_many(POINTS)])
+    assert all(answer == answers[0] for answer in answers)
+    assert None not in answers[0]
+    # The first and last points round to the same 0.01° cell
+    assert mock.counts['POST air_quality'] == 1
+    assert client.stats()['air_quality_batches'] == 1
+    assert client.air_batcher.merged == 10 * len(POINTS) - 4
+
+
+def test_transient_failures_are_retried(mock_server, monkeypatch):
+    monkeypatch.setattr(endpoints, 'BACKOFF_BASE', 0.01)
+    mock = mock_server(latency=0, fail_first=2)
+    client = make_client(mock, rate=100, burst=100)
+
+    response = client.request('GET', f"{mock.url}/fires/KEY/1")
+    assert response.status_code == 200
+    assert mock.counts['GET fires'] == 3
+    stats = client.stats()
+    assert stats['http_attempts'] == 3
+    assert stats['retries'] == 2
+
+
+def test_retries_stop_after_max_retries(mock_server, monkeypatch):
+    monkeypatch.setattr(endpoints, 'BACKOFF_BASE', 0.01)
+    mock = mock_server(latency=0, fail_first=10)
+    client = make_client(mock, rate=100, burst=100, max_retries=2)
+
+    with pytest.raises(requests.HTTPError):
+        client.request('GET', f"{mock.url}/fires/KEY/1")
+    assert mock.counts['GET fires'] == 3
+
+
+def test_retry_after_header_sets_the_delay(mock_server):
+    mock = mock_server(latency=0, fail_first=1, retry_after=1)
+    client = make_client(mock, rate=100, burst=100)
+
+    started = time.perf_counter()
+    client.request('GET', f"{mock.url}/fires/KEY/1")
+    elapsed = time.perf_counter() - started
+    assert 1.0 <= elapsed < 2.0
+    assert mock.counts['GET fires'] == 2
+
+
+def test_token_bucket_allows_a_burst_then_paces():
+    bucket = TokenBucket(rate=20, capacity=5)
+    started = time.perf_counter()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.perf_counter() - started < 0.05
+    for _ in range(4):
+        bucket.acquire()
+    assert time.perf_counter() - started >= 4 / 20 * 0.9
+
+
+def test_token_bucket_paces_upstream_requests(mock_server):
+    mock = mock_server(latency=0)
+    client = make_client(mock, rate=20, burst=2)
+
+    started = time.perf_counter()
+    run_concurrently(5, lambda index: client.request('GET', f"{mock.url}/fires/KEY/{index}"))
+    for index in range(5, 10):
+        client.request('GET', f"{mock.url}/fires/KEY/{index}")
+    elapsed = time.perf_counter() - started
+    assert mock.counts['GET fires'] == 10
+    # Two requests ride the burst; the other eight wait for tokens at 20/s
+    assert elapsed >= 8 / 20 * 0.9
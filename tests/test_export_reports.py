@@ -0,0 +1,67 @@
+import json
+import math
+import zipfile
+
+import pytest
+
+from analytics import CITIES, FOCUS_AREAS, TIME_PERIODS
+from export_reports import ZipSink, build_report
+
+
+@pytest.fixture(scope='module')
+def report():
+    return build_report(CITIES[0], TIME_PERIODS[0], charts=False)
+
+
+def test_zip_sink_round_trips_every_file(report, tmp_path):
+    path = tmp_path / 'reports.zip'
+    sink = ZipSink(str(path))
+    sink.write(report)
+    sink.close()
+
+    with zipfile.ZipFile(path) as archive:
+        assert sorted(archive.namelist()) == sorted(report['files'])
+        for name, content in report['files'].items():
+            assert archive.read(name) == content
+    assert sink.bytes_written == sum(len(content) for content in report['files'].values())
+    assert len([name for name in report['files'] if name.endswith('metrics.json')]) == len(FOCUS_AREAS)
+
+
+def test_table_schemas_accept_real_rows(report):
+    pa = pytest.importorskip('pyarrow')
+    from export_reports import table_schemas
+
+    schemas = table_schemas()
+    assert set(schemas) == set(report['tables'])
+    for name, rows in report['tables'].items():
+        if rows:
+            table = pa.Table.from_pylist(rows, schema=schemas[name])
+            assert table.num_rows == len(rows)
+            # Every field of a row has a declared column
+            assert set(rows[0]) <= set(schemas[name].names)
+
+
+def test_parquet_sink_round_trips_the_tables(report, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    from export_reports import ParquetSink
+
+    sink = ParquetSink(str(tmp_path / 'dataset'))
+    sink.write(report)
+    sink.write(report)
+    sink.close()
+
+    for name, rows in report['tables'].items():
+        if not rows:
+            continue
+        read = pq.read_table(tmp_path / 'dataset' / f"{name}.parquet").to_pylist()
+        assert len(read) == 2 * len(rows)
+        for written, original in zip(read, rows):
+            for column, value in original.items():
+                if isinstance(value, float) and math.isnan(value):
+                    assert written[column] is None or math.isnan(written[column])
+                elif isinstance(value, float):
+                    assert written[column] == pytest.approx(value)
+                else:
+                    assert written[column] == value
+    zones = pq.read_table(tmp_path / 'dataset' / 'zones.parquet').to_pylist()
+    assert json.loads(zones[0]['attributes'])['Zone'] == zones[0]['zone']
@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+import pytest
+
+import analytics
+import firms
+from endpoints import ExternalDataClient, MockEndpointServer
+from firms import CityIndex, FirmsAggregateStore
+
+HEADER = "latitude,longitude,acq_date,frp\n"
+BANGALORE_ROWS = ["12.97,77.59,2024-01-01,5.0\n", "12.98,77.60,2024-01-01,7.0\n", "12.96,77.58,2024-01-02,3.0\n"]
+
+
+def write_csv(path, rows):
+    with open(path, 'w', encoding='utf-8') as handle:
+        handle.write(HEADER + ''.join(rows))
+
+
+def detections(store):
+    return int(store.aggregate['count'].sum()) if store.aggregate is not None else 0
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FirmsAggregateStore(str(tmp_path / 'firms.npz'))
+
+
+def test_unchanged_file_is_skipped(tmp_path, store):
+    path = str(tmp_path / 'fires.csv')
+    write_csv(path, BANGALORE_ROWS)
+    store.ingest(path, log=lambda message: None)
+    assert store.ingest(path, log=lambda message: None) == 0
+    assert detections(store) == 3
+
+
+def test_appended_rows_are_added_once(tmp_path, store):
+    path = str(tmp_path / 'fires.csv')
+    write_csv(path, BANGALORE_ROWS[:2])
+    store.ingest(path, log=lambda message: None)
+    write_csv(path, BANGALORE_ROWS)
+    assert store.ingest(path, log=lambda message: None) == 1
+    assert detections(store) == 3
+
+
+@pytest.mark.parametrize('rows', [BANGALORE_ROWS, BANGALORE_ROWS[:1]])
+def test_rewritten_file_replaces_its_rows(tmp_path, store, rows):
+    path = str(tmp_path / 'fires.csv')
+    other = str(tmp_path / 'other.csv')
+    write_csv(path, BANGALORE_ROWS)
+    write_csv(other, BANGALORE_ROWS[:1])
+    store.ingest(path, log=lambda message: None)
+    store.ingest(other, log=lambda message: None)
+
+    write_csv(path, rows)
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+    store.ingest(path, log=lambda message: None)
+    assert detections(store) == len(rows) + 1
+
+
+def test_parts_survive_save_and_load(tmp_path, store):
+    path = str(tmp_path / 'fires.csv')
+    write_csv(path, BANGALORE_ROWS)
+    store.ingest(path, log=lambda message: None)
+    store.save()
+    reloaded = FirmsAggregateStore(store.path)
+    assert detections(reloaded) == 3
+    assert reloaded.ingest(path, log=lambda message: None) == 0
+
+
+def test_url_feed_is_not_double_counted(store, monkeypatch):
+    mock = MockEndpointServer(latency=0).start()
+    try:
+        client = ExternalDataClient({'fires': f"{mock.url}/fires/", 'air_quality': f"{mock.url}/air_quality"}, rate=100)
+        monkeypatch.setattr(analytics.nasa_analyzer.nasa_fetcher, 'client', client)
+        url = f"{mock.url}/fires/KEY/VIIRS_SNPP_NRT/77.3,12.7,77.8,13.2/1"
+        store.ingest(url, log=lambda message: None)
+        assert store.ingest(url, log=lambda message: None) == 0
+        assert detections(store) == 1
+        assert mock.counts['GET fires'] == 2
+    finally:
+        mock.stop()
+
+
+def test_points_in_a_shared_lookup_cell_reach_every_city(monkeypatch):
+    # Two boxes inside the same 0.5° lookup cell
+    boxes = {'West': (77.05, 12.05, 77.2, 12.2), 'East': (77.3, 12.05, 77.45, 12.2)}
+    monkeypatch.setattr(firms, 'city_bounds', lambda city: boxes[city])
+    index = CityIndex(['West', 'East'])
+    city, _ = index.assign(np.array([12.1, 12.1, 12.1]), np.array([77.1, 77.4, 77.25]))
+    assert city.tolist() == [0, 1, -1]
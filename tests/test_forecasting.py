@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from forecasting import _student_t_quantile, fit_theil_sen
+
+
+@pytest.mark.parametrize('level, z', [(0.8, 1.2816), (0.9, 1.6449), (0.95, 1.96), (0.99, 2.5758)])
+def test_large_samples_approach_the_normal_quantile(level, z):
+    assert _student_t_quantile(np.array([1e6]), level)[0] == pytest.approx(z, abs=1e-3)
+
+
+def test_any_level_is_supported():
+    quantiles = [_student_t_quantile(np.array([10.0]), level)[0] for level in (0.5, 0.85, 0.975)]
+    assert np.all(np.diff(quantiles) > 0)
+    # Student-t with 10 degrees of freedom, two-sided 95% (table value 2.228)
+    assert _student_t_quantile(np.array([10.0]), 0.95)[0] == pytest.approx(2.228, abs=0.01)
+
+
+@pytest.mark.parametrize('level', [0, 1, 1.5, -0.2])
+def test_invalid_levels_are_rejected(level):
+    with pytest.raises(ValueError):
+        _student_t_quantile(np.array([10.0]), level)
+
+
+@pytest.mark.parametrize('df, level, table', [
+    (1, 0.95, 12.706), (2, 0.95, 4.303), (3, 0.95, 3.182), (4, 0.95, 2.776), (5, 0.95, 2.571),
+    (1, 0.99, 63.657), (3, 0.99, 5.841), (4, 0.8, 1.533)
+])
+def test_small_samples_match_the_t_table(df, level, table):
+    assert _student_t_quantile(np.array([float(df)]), level)[0] == pytest.approx(table, rel=2e-3)
+
+
+def test_theil_sen_samples_pairs_of_long_series():
+    rng = np.random.default_rng(1)
+    t = np.arange(5000, dtype=np.float64)
+    Y = 3.0 + 0.5 * t + rng.normal(0, 1, size=(2, len(t)))
+    Y[:, ::50] += 1000  # outliers
+    fit = fit_theil_sen(t, Y, max_pairs=2000)
+    assert fit['slope'] == pytest.approx([0.5, 0.5], abs=5e-3)
+
+
+def test_theil_sen_spread_is_measured_around_the_robust_line():
+    t = np.arange(10, dtype=np.float64)
+    Y = (2.0 * t)[None, :].copy()
+    Y[0, -1] += 50  # one outlier pulls an OLS line but not the Theil-Sen one
+    fit = fit_theil_sen(t, Y)
+    assert fit['slope'][0] == pytest.approx(2.0)
+    assert fit['resid_std'][0] == pytest.approx(np.sqrt(50**2 / 8))
@@ -0,0 +1,54 @@
+import os
+
+import numpy as np
+import pytest
+
+from analytics import CITIES
+from forecasting import seasonal_decompose
+from grace import REGION_NAMES, process_stack, stack_paths
+
+MONTHS = 60
+
+
+def synthetic(t):
+    """Linear storage decline with a 3 cm annual cycle"""
+    return 5.0 - 0.1 * t + 3.0 * np.sin(2 * np.pi * t / 12)
+
+
+def test_decomposition_recovers_trend_and_season():
+    t = np.arange(MONTHS, dtype=np.float64)
+    Y = np.stack([synthetic(t), 2 * synthetic(t)])
+    parts = seasonal_decompose(Y, period=12)
+
+    interior = slice(6, MONTHS - 6)
+    assert np.all(np.isnan(parts['trend'][:, :6])) and np.all(np.isnan(parts['trend'][:, -6:]))
+    assert parts['trend'][0, interior] == pytest.approx(5.0 - 0.1 * t[interior])
+    assert parts['seasonal'][0] == pytest.approx(3.0 * np.sin(2 * np.pi * t / 12), abs=1e-9)
+    assert parts['seasonal'][1] == pytest.approx(2 * parts['seasonal'][0])
+    assert np.nanmax(np.abs(parts['residual'])) < 1e-9
+
+
+def test_decomposition_needs_more_than_one_period():
+    with pytest.raises(ValueError):
+        seasonal_decompose(np.ones((1, 12)), period=12)
+
+
+def test_stack_summary_and_cached_rerun(tmp_path):
+    t = np.arange(MONTHS, dtype=np.float64)
+    stack = np.broadcast_to(synthetic(t)[:, None, None], (MONTHS, 4, 4)).astype(np.float32)
+    path = stack_paths(CITIES[0], str(tmp_path))[0]
+    os.makedirs(os.path.dirname(path))
+    np.save(path, stack)
+
+    messages = []
+    summary = process_stack(CITIES[0], str(tmp_path), log=messages.append)
+    assert set(summary['regions']) == set(REGION_NAMES)
+    city = summary['regions']['city']
+    trend = np.array([np.nan if value is None else value for value in city['trend']])
+    assert np.nanmedian(np.diff(trend)) == pytest.approx(-0.1, abs=2e-3)
+    # The stack starts in April: calendar month m sits at t = m - 3 (mod 12)
+    expected = 3.0 * np.sin(2 * np.pi * (np.arange(12) - 3) / 12)
+    assert city['seasonal'] == pytest.approx(expected, abs=1e-2)
+
+    process_stack(CITIES[0], str(tmp_path), log=messages.append)
+    assert any('reusing' in message for message in messages)
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from analytics import CITIES
+from hexgrid import HexGrid, HexRollup
+
+
+@pytest.fixture
+def grid():
+    return HexGrid(CITIES[0])
+
+
+@pytest.fixture
+def points(grid):
+    rng = np.random.default_rng(0)
+    lat = grid.lat0 + rng.uniform(-0.2, 0.2, 5000)
+    lng = grid.lng0 + rng.uniform(-0.2, 0.2, 5000)
+    return lat, lng
+
+
+def test_cell_ids_round_trip_negative_axial_coordinates(grid):
+    res, q, r = np.array([3, 0, 2]), np.array([-5, 7, 0]), np.array([4, -9, -1])
+    unpacked = HexGrid._unpack(HexGrid._pack(res, q, r))
+    assert all(np.array_equal(a, b) for a, b in zip(unpacked, (res, q, r)))
+
+
+def test_cell_centres_fall_in_their_own_cell(grid, points):
+    cells = grid.cells(*points, grid.finest)
+    assert np.array_equal(grid.cells(*grid.centres(cells), grid.finest), cells)
+
+
+def test_every_child_has_the_parent_containing_its_centre(grid, points):
+    children = np.unique(grid.cells(*points, grid.finest))
+    parents = grid.parent(children)
+    assert np.array_equal(grid.cells(*grid.centres(children), grid.finest - 1), parents)
+    assert set(HexGrid._unpack(parents)[0]) == {grid.finest - 1}
+    # Aperture 4: a parent has about four children
+    assert 3 <= len(children) / len(np.unique(parents)) <= 5
+
+
+def test_rollups_conserve_points_and_match_direct_aggregation(grid, points):
+    values = np.random.default_rng(1).uniform(0, 10, len(points[0]))
+    values[::7] = np.nan
+    finest = grid.cells(*points, grid.finest)
+    rollup = HexRollup.build(grid, finest, {'metric': values})
+
+    # Follow each point's chain of parents and aggregate the raw points directly
+    ancestors = finest
+    for res in range(grid.finest, -1, -1):
+        level = rollup.level(res).set_index('cell')
+        assert level['points'].sum() == len(values)
+        for cell in np.unique(ancestors)[:20]:
+            members = values[ancestors == cell]
+            assert level.loc[cell, 'points'] == len(members)
+            expected = np.nanmean(members) if np.isfinite(members).any() else np.nan
+            assert level.loc[cell, 'metric'] == pytest.approx(expected, nan_ok=True)
+        if res:
+            ancestors = grid.parent(ancestors)
+
+
+def test_geojson_rings_are_closed(grid, points):
+    rollup = HexRollup.build(grid, grid.cells(*points, grid.finest), {'metric': np.ones(len(points[0]))})
+    features = rollup.geojson(0, 'metric')['features']
+    assert len(features) == len(rollup.level(0))
+    ring = features[0]['geometry']['coordinates'][0]
+    assert len(ring) == 7 and ring[0] == ring[-1]
@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pytest
+
+from analytics import CITIES, CITY_COORDINATES, ZONE_NAMES
+from lst import REGION_NAMES, load_region_matrix, regional_means, region_matrix, stack_paths
+
+CITY = CITIES[0]
+SHAPE = (60, 60)
+
+
+@pytest.fixture
+def bounds():
+    lat, lng = CITY_COORDINATES[CITY]
+    # Wide enough to hold the 15-25 km rural ring
+    return (lng - 0.3, lat - 0.3, lng + 0.3, lat + 0.3)
+
+
+def test_masks_partition_the_city_and_separate_core_from_ring(bounds):
+    matrix = region_matrix(CITY, SHAPE, bounds)
+    zones = matrix[:, :len(ZONE_NAMES)]
+    core = matrix[:, REGION_NAMES.index('urban_core')].astype(bool)
+    ring = matrix[:, REGION_NAMES.index('rural_ring')].astype(bool)
+
+    assert set(np.unique(zones.sum(axis=1))) <= {0, 1}
+    assert core.any() and ring.any()
+    assert not (core & ring).any()
+    assert not matrix.flags.writeable
+
+
+def test_regional_means_match_masked_means(tmp_path, bounds):
+    matrix = region_matrix(CITY, SHAPE, bounds)
+    rng = np.random.default_rng(0)
+    stack = rng.uniform(25, 45, size=(10, *SHAPE)).astype(np.float32)
+    stack[3, :10] = np.nan
+    stack[5] = -999
+    path = tmp_path / 'lst.npy'
+    np.save(path, stack)
+    meta = {'fill': -999, 'scale': 1.0, 'offset': 0.0, 'units': 'C'}
+
+    means = regional_means(str(path), meta, matrix, max_chunk_mb=0.05)
+    flat = stack.reshape(len(stack), -1).astype(np.float64)
+    for region in range(len(REGION_NAMES)):
+        mask = matrix[:, region].astype(bool)
+        if not mask.any():
+            continue
+        for step in (0, 3):
+            values = flat[step, mask]
+            assert means[step, region] == pytest.approx(np.nanmean(values), rel=1e-5, nan_ok=True)
+        # Every pixel of step 5 is the fill value
+        assert np.isnan(means[5, region])
+
+
+def test_masks_are_cached_until_the_grid_changes(tmp_path, bounds):
+    os.makedirs(os.path.dirname(stack_paths(CITY, str(tmp_path))[2]))
+    first = load_region_matrix(CITY, SHAPE, bounds, str(tmp_path))
+    assert os.path.exists(stack_paths(CITY, str(tmp_path))[2])
+    assert np.array_equal(load_region_matrix(CITY, SHAPE, bounds, str(tmp_path)), first)
+    assert load_region_matrix(CITY, (30, 30), bounds, str(tmp_path)).shape == (900, len(REGION_NAMES))
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from analytics import FOCUS_AREAS, TIME_PERIODS, build_zones_df, zone_metrics_df
+from prioritization import prioritize, priority_labels, priority_scores, rank_zones, top_k
+
+
+def reference_topsis(X, weights, directions):
+    """Textbook TOPSIS, one alternative at a time"""
+    weights = np.asarray(weights) / np.sum(weights)
+    V = X / np.sqrt((X ** 2).sum(axis=0)) * weights
+    ideal = [V[:, c].max() if directions[c] > 0 else V[:, c].min() for c in range(X.shape[1])]
+    anti = [V[:, c].min() if directions[c] > 0 else V[:, c].max() for c in range(X.shape[1])]
+    scores = []
+    for row in V:
+        d_ideal = np.sqrt(((row - ideal) ** 2).sum())
+        d_anti = np.sqrt(((row - anti) ** 2).sum())
+        scores.append(d_anti / (d_ideal + d_anti))
+    return np.array(scores)
+
+
+def test_topsis_ranks_the_ideal_zone_first():
+    X = np.array([[1.0, 5.0], [3.0, 3.0], [5.0, 1.0]])
+    scores = priority_scores(X, [0.5, 0.5], [1, -1])
+    assert scores == pytest.approx([0.0, 0.5, 1.0])
+    assert list(priority_labels(scores)) == ['Low', 'Medium', 'Critical']
+
+
+def test_topsis_matches_the_reference_implementation():
+    rng = np.random.default_rng(3)
+    X = rng.uniform(1, 100, size=(40, 4))
+    weights, directions = [0.4, 0.3, 0.2, 0.1], [1, -1, 1, -1]
+    assert priority_scores(X, weights, directions) == pytest.approx(reference_topsis(X, weights, directions))
+
+
+def test_missing_criteria_do_not_move_the_score():
+    X = np.array([[1.0, 5.0], [3.0, np.nan], [5.0, 1.0]])
+    scores = priority_scores(X, [0.5, 0.5], [1, -1])
+    assert np.all(np.isfinite(scores))
+    assert scores[0] < scores[1] < scores[2]
+
+
+@pytest.mark.parametrize('k', [1, 5, 37, 100, 500])
+def test_top_k_matches_a_full_sort(k):
+    scores = np.random.default_rng(k).random(100)
+    expected = np.argsort(-scores, kind='stable')[:k]
+    assert np.array_equal(top_k(scores, k), expected)
+
+
+def test_top_k_of_nothing_is_empty():
+    assert len(top_k(np.array([0.3, 0.1]), 0)) == 0
+
+
+def test_zone_tables_are_scored_once():
+    focus, period = FOCUS_AREAS[0], TIME_PERIODS[0]
+    raw = zone_metrics_df(focus, period)
+    assert 'Priority_Score' not in raw.columns
+    assert build_zones_df(focus, period)['Priority_Score'].tolist() == prioritize(raw, focus)['Priority_Score'].tolist()
+
+
+def test_rank_zones_returns_the_best_k_across_tables():
+    focus = FOCUS_AREAS[0]
+    tables = {city: zone_metrics_df(focus, TIME_PERIODS[0]) for city in ('A', 'B')}
+    ranking = rank_zones(tables, focus, k=3)
+    assert len(ranking) == 3
+    assert ranking['Priority_Score'].is_monotonic_decreasing
@@ -0,0 +1,20 @@
+import analytics
+from analytics import CITIES, FOCUS_AREAS, TIME_PERIODS, get_trend_projections, metrics_cache, trend_forecaster
+from refresh import RefreshScheduler
+
+
+def test_modelled_temperatures_do_not_change_between_regenerations(monkeypatch):
+    monkeypatch.setattr(analytics.nasa_analyzer.nasa_fetcher, 'archive', None)
+    first = analytics.nasa_analyzer.get_temperature_data(CITIES[0], TIME_PERIODS[0])
+    second = analytics.nasa_analyzer.get_temperature_data(CITIES[0], TIME_PERIODS[0])
+    other = analytics.nasa_analyzer.get_temperature_data(CITIES[1], TIME_PERIODS[0])
+    assert first == second
+    assert first != other
+
+
+def test_refresh_drops_projections_and_fitted_parameters():
+    get_trend_projections(CITIES[0], FOCUS_AREAS[0], TIME_PERIODS[0])
+    assert trend_forecaster.params
+    RefreshScheduler(cadences={}).refresh_metrics()
+    assert not trend_forecaster.params
+    assert not [key for key in metrics_cache.entries if key[0] == 'trend_projections']
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from scenarios import (
+    POPULATION_SHARE, project_built_up, project_heat, project_population, project_transit, scenario_baseline,
+    simulate
+)
+
+YEARS = np.arange(2014, 2025)
+
+
+@pytest.fixture
+def metrics():
+    return {
+        'growth_data': {
+            'years': YEARS,
+            'population': np.linspace(8.0, 10.0, len(YEARS)),
+            'built_up_area': np.linspace(100.0, 150.0, len(YEARS)),
+            'vegetation_loss': np.linspace(0.0, -15.0, len(YEARS))
+        },
+        'temperature_data': {'years': YEARS, 'temperatures': 25.0 + 0.05 * (YEARS - 2014)},
+        'growth_rate': 2.5
+    }
+
+
+@pytest.fixture
+def baseline(metrics):
+    return scenario_baseline(metrics, end_year=2050)
+
+
+def test_baseline_starts_at_the_last_observed_year(baseline):
+    assert baseline['years'][0] == 2024 and baseline['years'][-1] == 2050
+    assert baseline['population'].sum() == pytest.approx(10.0)
+    assert baseline['built_up'].sum() == pytest.approx(150.0)
+    # Warming is the fitted temperature trend
+    assert baseline['warming'] == pytest.approx(0.05)
+    assert baseline['temperature'] == pytest.approx(25.0 + 0.05 * 9)
+
+
+def test_zone_growth_adds_up_to_the_city_wide_rate(baseline):
+    population = project_population(baseline, 3.0)
+    assert population[:, 1].sum() == pytest.approx(10.0 * 1.03)
+    assert np.all(np.diff(population, axis=1) > 0)
+    # The outer city absorbs more growth than the CBD
+    growth = population[:, -1] / population[:, 0]
+    assert growth[-1] > growth[0]
+    assert population[:, 0] == pytest.approx(10.0 * POPULATION_SHARE)
+
+
+def test_full_densification_needs_no_new_land(baseline):
+    population = project_population(baseline, 3.0)
+    assert project_built_up(baseline, population, 1.0) == pytest.approx(np.repeat(baseline['built_up'][:, None], len(baseline['t']), axis=1))
+    assert np.all(project_built_up(baseline, population, 0.0)[:, -1] > baseline['built_up'])
+
+
+def test_without_growth_only_background_warming_remains(baseline):
+    population = project_population(baseline, 0.0)
+    built_up = project_built_up(baseline, population, 0.3)
+    heat = project_heat(baseline, built_up, 0)
+    assert heat == pytest.approx(np.broadcast_to(baseline['temperature'] + 0.05 * baseline['t'], heat.shape))
+
+
+def test_interventions_cool_and_offset_vegetation_loss(metrics):
+    idle = simulate(metrics, adoption=0)
+    adopted = simulate(metrics, adoption=100)
+    assert np.all(adopted['temperature'][1:] < idle['temperature'][1:])
+    assert adopted['vegetation'][-1] > idle['vegetation'][-1]
+    assert adopted['population'] == pytest.approx(idle['population'])
+
+
+def test_transit_coverage_is_capped(baseline):
+    transit = project_transit(baseline, 1.0)
+    assert transit[0] == pytest.approx(45.0)
+    assert transit.max() == 100.0
+
+
+def test_simulate_defaults_to_the_observed_growth_rate(metrics, baseline):
+    result = simulate(metrics)
+    expected = project_population(baseline, 2.5).sum(axis=0)
+    assert result['population'] == pytest.approx(expected)
+    assert set(result['zones']) == set(baseline['zones'])
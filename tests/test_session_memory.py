@@ -0,0 +1,71 @@
+import threading
+
+import numpy as np
+
+from dataflow import Dataflow
+from session_memory import SharedArtifactStore
+
+
+def array(mb):
+    return np.zeros(int(mb * 1e6), dtype=np.uint8)
+
+
+def test_shared_store_evicts_least_recently_used_over_the_byte_budget():
+    store = SharedArtifactStore(max_bytes=3e6)
+    for key in 'abc':
+        store.get_or_compute(key, lambda: array(1))
+    store.get_or_compute('a', lambda: array(1))
+    store.get_or_compute('d', lambda: array(1))
+
+    assert set(store.entries) == {'a', 'c', 'd'}
+    assert set(store.sizes) == set(store.entries)
+    assert store.nbytes() == sum(store.sizes.values()) <= 3e6
+
+
+def test_shared_store_keeps_an_oversized_newest_entry():
+    store = SharedArtifactStore(max_bytes=1e6)
+    store.get_or_compute('small', lambda: array(0.5))
+    store.get_or_compute('large', lambda: array(2))
+    assert list(store.entries) == ['large']
+    assert store.nbytes() == store.nbytes('large')
+
+
+def test_shared_store_sizes_match_entries_under_concurrent_builds():
+    store = SharedArtifactStore(maxsize=8, max_bytes=5e6)
+    barrier = threading.Barrier(8)
+
+    def worker(index):
+        barrier.wait()
+        for key in range(index, index + 40):
+            store.get_or_compute(key, lambda: array(0.5))
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert set(store.sizes) == set(store.entries)
+    assert store.nbytes() == sum(store.sizes.values()) <= 5e6
+    assert not store.pending_sizes
+
+
+def test_sessions_are_charged_for_shared_values_the_store_evicted():
+    store = SharedArtifactStore(max_bytes=1.5e6)
+    flow = Dataflow({}, shared_store=store)
+
+    @flow.artifact('raster', ['city'], shared=True)
+    def raster(city):
+        return array(1)
+
+    flow.set_inputs(city='Bangalore')
+    flow.get('raster')
+    assert flow.session_nbytes() == 0
+
+    # Another session fills the store and pushes this session's raster out
+    store.get_or_compute('other', lambda: array(1))
+    assert flow.session_nbytes() == 1e6
+    assert flow.memory_report()[0]['session_bytes'] == 1e6
+
+    assert flow.enforce_cap(0.5e6) == 0
+    assert flow.memo['raster']['value'] is None
@@ -0,0 +1,21 @@
+import pytest
+
+pytest.importorskip('plotly')
+
+from analytics import CITIES
+from timeline import timeline_html
+
+
+def test_the_cdn_bundle_is_referenced_not_inlined():
+    html = timeline_html(CITIES[0])
+    assert 'https://cdn.plot.ly/plotly-' in html
+    assert len(html) < 500_000
+
+
+def test_the_bundle_can_be_inlined_for_offline_use():
+    assert len(timeline_html(CITIES[0], plotlyjs='inline')) > 1_000_000
+
+
+def test_unknown_modes_are_rejected():
+    with pytest.raises(ValueError):
+        timeline_html(CITIES[0], plotlyjs='local')
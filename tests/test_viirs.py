@@ -0,0 +1,33 @@
+import os
+
+import numpy as np
+import pytest
+
+from analytics import CITIES, ZONE_NAMES
+from viirs import process_stack, stack_paths, tile_windows
+
+
+def write_stack(root, stack):
+    path = stack_paths(CITIES[0], str(root))[0]
+    os.makedirs(os.path.dirname(path))
+    np.save(path, stack)
+
+
+def test_a_raster_smaller_than_one_tile_is_one_window():
+    assert tile_windows(3, 4, 24) == [(0, 3, 0, 4)]
+
+
+@pytest.mark.parametrize('shape', [(24, 0, 5), (24, 5, 0), (0, 5, 5)])
+def test_empty_rasters_give_empty_summaries(tmp_path, shape):
+    write_stack(tmp_path, np.zeros(shape, dtype=np.float32))
+    activity = process_stack(CITIES[0], str(tmp_path), workers=1, log=lambda message: None)
+    assert activity['city']['pixels'] == 0
+    assert set(activity['zones']) == set(ZONE_NAMES)
+
+
+def test_a_small_raster_is_summarized(tmp_path):
+    write_stack(tmp_path, np.full((24, 3, 4), 2.0, dtype=np.float32))
+    activity = process_stack(CITIES[0], str(tmp_path), workers=1, log=lambda message: None)
+    assert activity['years'] == [2014, 2015]
+    assert 0 < activity['city']['pixels'] <= 12
+    assert activity['city']['mean_radiance'] == [2.0, 2.0]
@@ -0,0 +1,143 @@
+import base64
+import json
+import os
+
+import numpy as np
+
+from analytics import FOCUS_AREAS, PERIOD_YEARS, TIME_PERIODS, get_city_metrics
+
+try:
+    from plotly.offline import get_plotlyjs, get_plotlyjs_version
+except ImportError:  # plotly is a dashboard requirement; without it the explorer cannot render
+    get_plotlyjs = get_plotlyjs_version = None
+
+# 'cdn' references the bundle matching the installed plotly (the browser caches it across cities);
+# 'inline' embeds the ~3.5 MB bundle in every city's chart so it also works offline
+PLOTLYJS_MODE = os.environ.get('URBANPULSE_PLOTLYJS', 'cdn')
+
+# Period shown first (it spans every other one)
+FULL_PERIOD = "2000-2024 (Long-term)"
+# (key, label, colour, axis): the top panel shares x with the bottom one
+TIMELINE_SERIES = [
+    ('built_up_area', 'Built-up Area (km²)', '#FC3D21', 'y'),
+    ('population', 'Population (Millions)', '#0B3D91', 'y2'),
+    ('temperatures', 'Temperature (°C)', '#FF6B6B', 'y3'),
+    ('vegetation_loss', 'Vegetation Index Change', '#2E8B57', 'y4')
+]
+
+
+def _typed(values, dtype):
+    """Base64 of a little-endian array, decoded into a JS typed array in the browser"""
+    return base64.b64encode(np.ascontiguousarray(values, dtype=dtype).tobytes()).decode('ascii')
+
+
+def timeline_payload(city_name):
+    """Every period's series (as the server-rendered charts fit them) as compact typed arrays
+
+    Each period has its own fitted series, so the same year can differ between periods;
+    shipping them all keeps the explorer identical to the Trends charts for any period.
+    """
+    periods = []
+    for period in [FULL_PERIOD] + [period for period in TIME_PERIODS if period != FULL_PERIOD]:
+        metrics = get_city_metrics(city_name, FOCUS_AREAS[0], period)
+        growth, temperature = metrics['growth_data'], metrics['temperature_data']
+        columns = {
+            'built_up_area': growth['built_up_area'], 'population': growth['population'],
+            'vegetation_loss': growth['vegetation_loss'], 'temperatures': temperature['temperatures']
+        }
+        periods.append({
+            'label': period,
+            'range': PERIOD_YEARS[period],
+            'years': _typed(growth['years'], '<i2'),
+            'values': [_typed(columns[key], '<f4') for key, _, _, _ in TIMELINE_SERIES],
+            'growth_rate': round(float(metrics['growth_rate']), 2),
+            'heat_intensity': float(temperature['heat_island_intensity']),
+            'water_stress': int(metrics['water_data']['stress_level'])
+        })
+    return {
+        'city': city_name,
+        'series': [{'label': label, 'color': color, 'axis': axis} for _, label, color, axis in TIMELINE_SERIES],
+        'periods': periods
+    }
+
+
+# Frames are built in the browser from the typed arrays (subarray views, no copies), so the
+# payload holds each value once however many years are animated. Switching period redraws
+# the chart from that period's own arrays.
+_TEMPLATE = """<select id="timeline-period" style="font:inherit;margin-bottom:4px;"></select>
+<div id="timeline" style="width:100%;height:__HEIGHT__px;"></div>
+<script>
+const payload = __PAYLOAD__;
+function decode(b64, Type) {
+  const bytes = Uint8Array.from(atob(b64), c => c.charCodeAt(0));
+  return new Type(bytes.buffer);
+}
+const xaxisFor = axis => (axis === 'y3' || axis === 'y4') ? 'x2' : 'x';
+const periods = payload.periods.map(p => Object.assign({}, p, {
+  years: decode(p.years, Int16Array), values: p.values.map(v => decode(v, Float32Array))
+}));
+
+function figure(p) {
+  const years = p.years;
+  const title = payload.city + ' — ' + p.label + ': growth ' + p.growth_rate + '%/yr, heat +' +
+                p.heat_intensity + '°C/yr, water stress ' + p.water_stress + '%';
+  const traces = payload.series.map((s, k) => ({
+    x: years, y: p.values[k], name: s.label, yaxis: s.axis, xaxis: xaxisFor(s.axis),
+    mode: 'lines+markers', line: {color: s.color, width: 3}, marker: {size: 5}
+  }));
+  const frames = Array.from(years, (year, i) => ({
+    name: String(year),
+    data: p.values.map(values => ({x: years.subarray(0, i + 1), y: values.subarray(0, i + 1)})),
+    layout: {title: {text: title + ' — through ' + year}}
+  }));
+  const range = [p.range[0] - 0.5, p.range[1] + 0.5];
+  const layout = {
+    title: {text: title},
+    xaxis: {anchor: 'y', domain: [0, 0.92], matches: 'x2', showticklabels: false, range: range},
+    xaxis2: {anchor: 'y3', domain: [0, 0.92], title: 'Year', range: range},
+    yaxis: {domain: [0.58, 1], title: 'Built-up Area (km²)'},
+    yaxis2: {overlaying: 'y', side: 'right', title: 'Population (M)'},
+    yaxis3: {domain: [0, 0.42], title: 'Temperature (°C)'},
+    yaxis4: {overlaying: 'y3', side: 'right', title: 'Vegetation Change'},
+    legend: {orientation: 'h', y: -0.3},
+    margin: {t: 90, b: 150},
+    updatemenus: [
+      {type: 'buttons', direction: 'left', x: 0, y: 1.18, xanchor: 'left', showactive: false, buttons: [
+        {label: '▶ Play', method: 'animate', args: [null, {frame: {duration: 400, redraw: false}, transition: {duration: 150}, fromcurrent: true}]},
+        {label: '⏸ Pause', method: 'animate', args: [[null], {mode: 'immediate', frame: {duration: 0, redraw: false}, transition: {duration: 0}}]}
+      ]}
+    ],
+    sliders: [{
+      active: years.length - 1, y: -0.12, currentvalue: {prefix: 'Year: '},
+      steps: Array.from(years, year => ({label: String(year), method: 'animate',
+        args: [[String(year)], {mode: 'immediate', frame: {duration: 0, redraw: false}, transition: {duration: 0}}]}))
+    }]
+  };
+  return {data: traces, layout: layout, frames: frames, config: {responsive: true}};
+}
+
+const select = document.getElementById('timeline-period');
+periods.forEach((p, i) => select.add(new Option(p.label, i)));
+select.onchange = () => Plotly.react('timeline', figure(periods[select.value]));
+Plotly.newPlot('timeline', figure(periods[0]));
+</script>
+"""
+
+
+def plotlyjs_tag(mode=PLOTLYJS_MODE):
+    """Script tag loading Plotly's JS from the CDN or inlined from the installed package"""
+    if get_plotlyjs is None:
+        raise RuntimeError("The year explorer requires plotly")
+    if mode == 'inline':
+        return f'<script type="text/javascript">{get_plotlyjs()}</script>'
+    if mode != 'cdn':
+        raise ValueError(f"Unknown Plotly JS mode: {mode} (expected 'cdn' or 'inline')")
+    return f'<script src="https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js" charset="utf-8"></script>'
+
+
+def timeline_html(city_name, height=560, plotlyjs=PLOTLYJS_MODE):
+    """Animated chart: after loading, year and period changes run in the browser"""
+    chart = (_TEMPLATE
+             .replace('__HEIGHT__', str(int(height)))
+             .replace('__PAYLOAD__', json.dumps(timeline_payload(city_name))))
+    return plotlyjs_tag(plotlyjs) + '\n' + chart
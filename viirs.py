@@ -0,0 +1,221 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from analytics import CITIES, VIIRS_DIR, ZONE_NAMES, city_bounds, slugify, viirs_activity_path
+from firms import CityIndex
+
+DEFAULT_TILE_MB = 256
+# Monthly composites with fewer valid months than this give no annual mean for the pixel
+MIN_VALID_MONTHS = 6
+# Radiance (nW/cm²/sr) above which a pixel counts as lit
+LIT_RADIANCE = 0.5
+# Brightening rate (log ratio per year between a pixel's first and last valid year) that marks
+# it as changed: +50% over a decade
+CHANGE_LOG_RATE = np.log(1.5) / 10
+
+
+def stack_paths(city_name, root=VIIRS_DIR):
+    """(radiance stack, metadata) paths for a city"""
+    directory = os.path.join(root, slugify(city_name))
+    return os.path.join(directory, 'radiance.npy'), os.path.join(directory, 'meta.json')
+
+
+def load_meta(city_name, root=VIIRS_DIR):
+    """Stack georeference and start month; defaults to the city box starting January 2014"""
+    meta = {'bounds': list(city_bounds(city_name)), 'start': '2014-01'}
+    meta_path = stack_paths(city_name, root)[1]
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding='utf-8') as handle:
+            meta.update(json.load(handle))
+    return meta
+
+
+def tile_windows(height, width, months, max_tile_mb=DEFAULT_TILE_MB):
+    """(row0, row1, col0, col1) windows whose working set stays under max_tile_mb
+
+    A tile needs roughly four float32 copies of its (months, rows, cols) block: the read,
+    the year-padded copy and the masks/sums derived from it.
+    """
+    pixels = max(int(max_tile_mb * 1e6 / (max(months, 1) * 4 * 4)), 1)
+    side = max(int(np.sqrt(pixels)), 1)
+    return [
+        (row, min(row + side, height), col, min(col + side, width))
+        for row in range(0, height, side)
+        for col in range(0, width, side)
+    ]
+
+
+def process_tile(path, window, bounds, city_name, start):
+    """Per-zone annual radiance sums and change counts for one spatial tile
+
+    Runs in a worker process: only the tile's window of the memory-mapped stack is read.
+    """
+    stack = np.load(path, mmap_mode='r')
+    months, height, width = stack.shape
+    row0, row1, col0, col1 = window
+    tile = np.array(stack[:, row0:row1, col0:col1], dtype=np.float32)
+    pixels = tile.shape[1] * tile.shape[2]
+
+    # Pixel centres -> zone index (pixels outside the city box are dropped)
+    west, south, east, north = bounds
+    lat = north - (np.arange(row0, row1) + 0.5) * (north - south) / height
+    lng = west + (np.arange(col0, col1) + 0.5) * (east - west) / width
+    lat_grid, lng_grid = np.meshgrid(lat, lng, indexing='ij')
+    city, zone = CityIndex([city_name]).assign(lat_grid.ravel(), lng_grid.ravel())
+    inside = city >= 0
+
+    # Calendar-year means: pad to whole years so months line up, negative fill values are invalid
+    lead = int(start[5:7]) - 1
+    years = _calendar_years(start, months)
+    padded = np.zeros((years * 12, pixels), dtype=np.float32)
+    counts = np.zeros((years * 12, pixels), dtype=bool)
+    block = tile.reshape(months, pixels)
+    valid = np.isfinite(block) & (block >= 0)
+    padded[lead:lead + months] = np.where(valid, block, 0)
+    counts[lead:lead + months] = valid
+    del tile, block, valid
+    month_sums = padded.reshape(years, 12, pixels).sum(axis=1, dtype=np.float64)
+    month_counts = counts.reshape(years, 12, pixels).sum(axis=1)
+    annual = np.where(month_counts >= MIN_VALID_MONTHS, month_sums / np.maximum(month_counts, 1), np.nan)
+
+    # Brightening between each pixel's own first and last year with enough data (a partial
+    # current year or a late-starting pixel has NaN at the stack's ends)
+    has_year = np.isfinite(annual)
+    first_year = has_year.argmax(axis=0)
+    last_year = years - 1 - has_year[::-1].argmax(axis=0)
+    columns = np.arange(pixels)
+    first = annual[first_year, columns]
+    last = annual[last_year, columns]
+    span = last_year - first_year
+    lit = inside & has_year.any(axis=0) & (last >= LIT_RADIANCE)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = np.log((last + 0.1) / (first + 0.1)) / span
+    changed = lit & (span > 0) & (rate >= CHANGE_LOG_RATE)
+
+    # (zone, year) sums in one bincount over zone * years + year
+    zones = len(ZONE_NAMES)
+    finite = np.isfinite(annual) & inside[None, :]
+    year_index = np.broadcast_to(np.arange(years)[:, None], annual.shape)
+    flat = (zone[None, :].astype(np.int64) * years + year_index)[finite]
+    return {
+        'radiance_sum': np.bincount(flat, weights=annual[finite], minlength=zones * years).reshape(zones, years),
+        'radiance_count': np.bincount(flat, minlength=zones * years).reshape(zones, years),
+        'pixels': np.bincount(zone[inside], minlength=zones),
+        'lit_pixels': np.bincount(zone[lit], minlength=zones),
+        'changed_pixels': np.bincount(zone[changed], minlength=zones)
+    }
+
+
+def _calendar_years(start, months):
+    """Calendar years touched by a stack of `months` monthly composites starting at `start`"""
+    lead = int(start[5:7]) - 1
+    return -(-(lead + months) // 12)
+
+
+def _empty_total(years):
+    """Zero sums to merge tiles into (also the result for a raster with no pixels)"""
+    zones = len(ZONE_NAMES)
+    return {
+        'radiance_sum': np.zeros((zones, years)),
+        'radiance_count': np.zeros((zones, years), dtype=np.int64),
+        'pixels': np.zeros(zones, dtype=np.int64),
+        'lit_pixels': np.zeros(zones, dtype=np.int64),
+        'changed_pixels': np.zeros(zones, dtype=np.int64)
+    }
+
+
+def _merge(total, part):
+    return {name: total[name] + part[name] for name in total}
+
+
+def _summary(radiance_sum, radiance_count, pixels, lit_pixels, changed_pixels):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = radiance_sum / radiance_count
+    return {
+        'pixels': int(pixels),
+        'lit_pixels': int(lit_pixels),
+        'changed_pixels': int(changed_pixels),
+        'mean_radiance': [None if np.isnan(value) else round(float(value), 4) for value in mean]
+    }
+
+
+def process_stack(city_name, root=VIIRS_DIR, workers=None, max_tile_mb=DEFAULT_TILE_MB, log=print):
+    """Run change detection over a city's (months, rows, cols) stack and write activity.json"""
+    path = stack_paths(city_name, root)[0]
+    meta = load_meta(city_name, root)
+    stack = np.load(path, mmap_mode='r')
+    if stack.ndim != 3:
+        raise ValueError(f"{path}: expected a (months, rows, cols) stack, got shape {stack.shape}")
+    months, height, width = stack.shape
+    del stack
+
+    # No months means nothing to detect; skip the tiles rather than reduce empty year axes
+    windows = tile_windows(height, width, months, max_tile_mb) if months else []
+    workers = workers or os.cpu_count() or 1
+    # Bound the number of finished tiles waiting to be merged
+    max_in_flight = workers * 2
+
+    started = time.perf_counter()
+    # A zero-sized raster has no windows and yields empty zone summaries
+    total = _empty_total(_calendar_years(meta['start'], months))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for window in windows:
+            pending.add(pool.submit(process_tile, path, window, meta['bounds'], city_name, meta['start']))
+            if len(pending) < max_in_flight:
+                continue
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                total = _merge(total, future.result())
+        for future in pending:
+            total = _merge(total, future.result())
+
+    first_year = int(meta['start'][:4])
+    years = list(range(first_year, first_year + total['radiance_sum'].shape[1]))
+    activity = {
+        'city_name': city_name,
+        'start': meta['start'],
+        'months': months,
+        'years': years,
+        'zones': {
+            name: _summary(*(total[key][index] for key in ('radiance_sum', 'radiance_count', 'pixels', 'lit_pixels', 'changed_pixels')))
+            for index, name in enumerate(ZONE_NAMES)
+        },
+        'city': _summary(*(total[key].sum(axis=0) for key in ('radiance_sum', 'radiance_count', 'pixels', 'lit_pixels', 'changed_pixels')))
+    }
+
+    output = viirs_activity_path(city_name, root)
+    temp_path = output + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as handle:
+        json.dump(activity, handle, indent=2)
+    # Atomic replace so the dashboard never reads a half-written file
+    os.replace(temp_path, output)
+
+    elapsed = time.perf_counter() - started
+    log(f"{city_name}: {months} months x {height}x{width} px in {len(windows)} tiles, "
+        f"{months * height * width / elapsed if elapsed else 0:,.0f} px-months/s -> {output}")
+    return activity
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VIIRS nighttime-lights change detection over monthly radiance stacks")
+    parser.add_argument('cities', nargs='*', help="Cities to process (defaults to every city with a stack)")
+    parser.add_argument('--root', default=VIIRS_DIR, help="Directory holding <city-slug>/radiance.npy stacks")
+    parser.add_argument('--workers', type=int, help="Worker processes (defaults to the CPU count)")
+    parser.add_argument('--max-tile-mb', type=float, default=DEFAULT_TILE_MB, help="Working-set budget per tile")
+    args = parser.parse_args()
+
+    cities = args.cities or [city for city in CITIES if os.path.exists(stack_paths(city, args.root)[0])]
+    if not cities:
+        raise SystemExit(f"No radiance stacks found under {args.root}")
+    for city in cities:
+        process_stack(city, args.root, args.workers, args.max_tile_mb)
+
+
+if __name__ == "__main__":
+    main()